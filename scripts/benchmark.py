@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+性能基准测试脚本
+
+使用合成的合同文本评估各项性能相关功能。
+
+使用方法:
+    python scripts/benchmark.py worker-pool [--processes N] [--docs N]
+    python scripts/benchmark.py llm-chunking [--repeat N] [--concurrency N] [--latency-ms N]
+    python scripts/benchmark.py llm-refine [--repeat N] [--ms-per-char N]
+    python scripts/benchmark.py spans [--repeat N]
+    python scripts/benchmark.py prefilter [--repeat N] [--window N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from contract_deid import DeidentificationConfig
+
+SAMPLE_CONTRACT = """
+甲方：腾讯科技（深圳）有限公司
+统一社会信用代码：91440300MA5D123456
+法定代表人：马化腾
+联系电话：13800138000
+乙方：阿里巴巴网络技术有限公司
+联系邮箱：contact@example.com
+合同金额：人民币 1,000,000 元（大写：壹佰万元整）
+项目地址：深圳市南山区科技园
+第一条 双方应当遵守本合同约定的各项条款，任何一方不得擅自变更或解除本合同。
+第二条 本合同未尽事宜，由双方另行协商并签订补充协议，补充协议与本合同具有同等法律效力。
+"""
+
+
+def build_corpus(num_docs: int, repeat: int = 1) -> list:
+    """
+    生成合成合同语料
+
+    Args:
+        num_docs: 文档数量
+        repeat: 每份文档中样例合同重复的次数
+
+    Returns:
+        文本列表
+    """
+    return [SAMPLE_CONTRACT * repeat for _ in range(num_docs)]
+
+
+def _mb(num_bytes: int) -> str:
+    """格式化字节数为 MB"""
+    return f"{num_bytes / 1024 / 1024:.1f} MB"
+
+
+def bench_worker_pool(args):
+    """基准：fork 工作进程池的吞吐量与每个工作进程的内存开销"""
+    from contract_deid.core.worker_pool import ForkWorkerPool, read_memory_usage
+
+    config = DeidentificationConfig(enable_ner=not args.disable_ner)
+    corpus = build_corpus(args.docs)
+
+    start = time.perf_counter()
+    pool = ForkWorkerPool(config, processes=args.processes, freeze_gc=not args.no_freeze)
+    pool.start()
+    startup = time.perf_counter() - start
+    parent = read_memory_usage()
+
+    with pool:
+        start = time.perf_counter()
+        pool.map(corpus)
+        elapsed = time.perf_counter() - start
+        report = pool.memory_report()
+
+    print(f"startup:    {startup:.2f}s")
+    print(f"throughput: {len(corpus) / elapsed:.1f} docs/s ({args.processes} workers)")
+    print(f"parent:     rss={_mb(parent['rss'])}")
+    for item in report:
+        print(
+            f"worker {item.pid}: rss={_mb(item.rss)} pss={_mb(item.pss)} "
+            f"private(overhead)={_mb(item.private)}"
+        )
+
+
+def fake_llm(latency: float):
+    """
+    构造模拟 LLM：固定延迟，按关键字返回实体，偏移故意给错
+
+    Args:
+        latency: 每次调用的延迟（秒）
+
+    Returns:
+        LLM 调用函数
+    """
+    import json
+
+    keywords = {"组织机构": ["腾讯科技（深圳）有限公司", "阿里巴巴网络技术有限公司"], "人名": ["马化腾"]}
+
+    def call(text: str, prompt: str) -> str:
+        time.sleep(latency)
+        result = {
+            entity_type: [
+                {"text": name, "start": 0, "end": len(name)}
+                for name in names
+                for _ in range(text.count(name))
+            ]
+            for entity_type, names in keywords.items()
+        }
+        return json.dumps(result, ensure_ascii=False)
+
+    return call
+
+
+def bench_llm_chunking(args):
+    """基准：LLM 实体抽取的分块并发与偏移校正"""
+    from contract_deid.core.ner_adapters import LLMNERAdapter
+
+    text = build_corpus(1, repeat=args.repeat)[0]
+    for concurrency in sorted({1, args.concurrency}):
+        adapter = LLMNERAdapter(
+            llm_call_func=fake_llm(args.latency_ms / 1000),
+            chunk_size=args.chunk_size,
+            max_concurrency=concurrency,
+            requests_per_second=args.rps,
+        )
+        start = time.perf_counter()
+        results = adapter.analyze(text)
+        elapsed = time.perf_counter() - start
+        correct = sum(1 for r in results if text[r.start:r.end] in SAMPLE_CONTRACT)
+        print(
+            f"concurrency={concurrency}: {elapsed:.2f}s, {len(results)} entities "
+            f"({correct} aligned), {len(text)} chars"
+        )
+
+
+def bench_llm_refine(args):
+    """基准：LLM 润色 edits 模式与逐段重写模式的输出量与耗时"""
+    import json
+
+    from contract_deid.core.llm_refine import LLMRefiner
+
+    # 模拟前三层遗漏了条款中的联系人"张先生"，其余实体均已替换为虚拟值
+    clause = "第一条 双方应当遵守本合同约定的各项条款，任何一方不得擅自变更或解除本合同。"
+    text = build_corpus(1, repeat=args.repeat)[0].replace(
+        clause, clause + "乙方指定张先生为本项目联系人，负责合同履行过程中的沟通协调事宜。"
+    )
+    mapping = {
+        "ORGANIZATION": {"甲方": "腾讯科技（深圳）有限公司", "乙方": "阿里巴巴网络技术有限公司"},
+        "PERSON": {"法人": "马化腾"},
+    }
+    per_char = args.ms_per_char / 1000
+
+    def fake_backend(mode):
+        def call(paragraph: str, prompt: str) -> str:
+            if mode == "edits":
+                response = json.dumps(
+                    [{"original": "张先生", "type": "人名", "replacement": "李先生"}], ensure_ascii=False
+                )
+            else:
+                response = paragraph.replace("张先生", "李先生")
+            # 解码耗时与输出长度成正比
+            time.sleep(per_char * len(response))
+            return response
+
+        return call
+
+    for mode in ("text", "edits"):
+        refiner = LLMRefiner(backend=fake_backend(mode), mode=mode)
+        refined = refiner.refine(text, {k: dict(v) for k, v in mapping.items()})
+        stats = refiner.stats
+        print(
+            f"{mode:>5}: {stats.seconds:.2f}s, output {stats.output_chars} chars, "
+            f"sent {stats.sent_ratio:.0%} of text, residual={'张先生' in refined}"
+        )
+
+
+def bench_spans(args):
+    """基准：规则层在数字密集文本上产出 Span 与 RecognizerResult 的分配数量和内存峰值"""
+    import gc
+    import tracemalloc
+
+    from contract_deid.core.span import to_recognizer_results
+    from contract_deid.recognizers.amount import AmountRecognizer
+    from contract_deid.recognizers.phone import PhoneRecognizer
+
+    # 数字密集的付款明细表
+    row = "第{0}期 付款 {0},000.00 元，经办人电话 1380013{0:04d}，对账电话 0755-8{0:07d}\n"
+    text = "".join(row.format(i) for i in range(args.repeat))
+    recognizers = [PhoneRecognizer(), AmountRecognizer()]
+
+    def run(name, analyze):
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        results = [item for recognizer in recognizers for item in analyze(recognizer)]
+        seconds = time.perf_counter() - started
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+        print(
+            f"{name:>16}: {len(results)} results, {blocks} live blocks, "
+            f"retained {_mb(current)}, peak {_mb(peak)}, {seconds * 1000:.0f} ms"
+        )
+
+    run("RecognizerResult", lambda recognizer: to_recognizer_results(recognizer.find_spans(text)))
+    run("Span", lambda recognizer: recognizer.find_spans(text))
+
+
+def bench_prefilter(args):
+    """基准：叙述性段落为主的合同上，第一层前置过滤跳过的识别器比例与耗时对比"""
+    from contract_deid import create_engine
+
+    # 以条款叙述为主，只有少量段落含号码和金额
+    clause = "第{0}条 双方应当遵守本合同约定的各项条款，任何一方不得擅自变更或解除本合同，违约方应承担相应责任。\n"
+    text = "".join(clause.format("十") for _ in range(args.repeat)) + SAMPLE_CONTRACT
+
+    for enabled in (False, True):
+        config = DeidentificationConfig(enable_ner=False, layer_window_size=args.window, rule_prefilter=enabled)
+        engine = create_engine(config)
+        started = time.perf_counter()
+        spans = engine.analyze(text)
+        seconds = time.perf_counter() - started
+        print(f"prefilter={'on ' if enabled else 'off'}: {len(spans)} spans, {seconds * 1000:.0f} ms")
+        if enabled:
+            print(engine.prefilter_stats.summary())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合同脱敏性能基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pool_parser = subparsers.add_parser("worker-pool", help="fork 工作进程池")
+    pool_parser.add_argument("--processes", type=int, default=4)
+    pool_parser.add_argument("--docs", type=int, default=200)
+    pool_parser.add_argument("--disable-ner", action="store_true")
+    pool_parser.add_argument("--no-freeze", action="store_true", help="不执行 gc.freeze()")
+    pool_parser.set_defaults(func=bench_worker_pool)
+
+    llm_parser = subparsers.add_parser("llm-chunking", help="LLM 分块并发抽取")
+    llm_parser.add_argument("--repeat", type=int, default=20, help="样例合同重复次数")
+    llm_parser.add_argument("--chunk-size", type=int, default=1000)
+    llm_parser.add_argument("--concurrency", type=int, default=8)
+    llm_parser.add_argument("--latency-ms", type=float, default=200)
+    llm_parser.add_argument("--rps", type=float, default=None, help="每秒最大请求数")
+    llm_parser.set_defaults(func=bench_llm_chunking)
+
+    refine_parser = subparsers.add_parser("llm-refine", help="LLM 润色 edits 模式与重写模式对比")
+    refine_parser.add_argument("--repeat", type=int, default=20, help="样例合同重复次数")
+    refine_parser.add_argument("--ms-per-char", type=float, default=0.5, help="模拟每个输出字符的解码耗时")
+    refine_parser.set_defaults(func=bench_llm_refine)
+
+    spans_parser = subparsers.add_parser("spans", help="Span 与 RecognizerResult 的分配开销对比")
+    spans_parser.add_argument("--repeat", type=int, default=5000, help="付款明细行数")
+    spans_parser.set_defaults(func=bench_spans)
+
+    prefilter_parser = subparsers.add_parser("prefilter", help="第一层前置过滤开启与关闭对比")
+    prefilter_parser.add_argument("--repeat", type=int, default=2000, help="叙述性条款行数")
+    prefilter_parser.add_argument("--window", type=int, default=512, help="规则层窗口大小（字符数）")
+    prefilter_parser.set_defaults(func=bench_prefilter)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+词典构建脚本
+
+从名称列表构建词典识别器使用的自动机文件。
+
+输入文件格式（每行一条）：
+    - 纯名称：使用 --entity-type 指定的类型
+    - entity_type<TAB>name：逐行指定类型（ORGANIZATION 或 PERSON）
+
+使用方法:
+    python scripts/build_gazetteer.py companies.txt --entity-type ORGANIZATION -o models/gazetteer.bin
+    python scripts/build_gazetteer.py companies.txt signatories.txt -o models/gazetteer.bin
+    python scripts/build_gazetteer.py --add new_names.txt -o models/gazetteer.bin   # 增量添加
+"""
+
+import argparse
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from contract_deid.recognizers.gazetteer import ENTITY_LABELS, GazetteerRecognizer, build_gazetteer
+
+
+def read_entries(paths, default_type):
+    """读取名称列表文件"""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entity_type, sep, name = line.partition("\t")
+                if sep and entity_type in ENTITY_LABELS:
+                    yield entity_type, name
+                else:
+                    yield default_type, line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="构建词典识别器的自动机文件")
+    parser.add_argument("inputs", nargs="*", help="名称列表文件")
+    parser.add_argument("-o", "--output", required=True, help="输出的自动机文件路径")
+    parser.add_argument(
+        "--entity-type",
+        choices=ENTITY_LABELS,
+        default="ORGANIZATION",
+        help="纯名称行使用的实体类型（默认：ORGANIZATION）",
+    )
+    parser.add_argument("--add", nargs="+", help="增量添加名称列表文件（不全量重建）")
+    parser.add_argument("--remove", nargs="+", help="增量移除名称列表文件（不全量重建）")
+    parser.add_argument("--compact", action="store_true", help="将增量日志合并进主词典")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.inputs:
+        automaton = build_gazetteer(read_entries(args.inputs, args.entity_type), args.output)
+        print(f"Built {automaton.num_patterns} names, {automaton.num_states} states")
+
+    if args.add or args.remove or args.compact:
+        recognizer = GazetteerRecognizer(args.output)
+        # 按实体类型分组，每组只重建一次增量自动机、追加一次日志
+        additions = defaultdict(list)
+        for entity_type, name in read_entries(args.add or [], args.entity_type):
+            additions[entity_type].append(name)
+        for entity_type, names in additions.items():
+            recognizer.add(names, entity_type=entity_type)
+        if args.remove:
+            recognizer.remove(name for _, name in read_entries(args.remove, args.entity_type))
+        if args.compact:
+            recognizer.compact()
+
+    print(f"Done in {time.perf_counter() - start:.2f}s: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,15 @@ def _get_engine_and_provider():
     return DeidentificationEngine, ConsistencyProvider
 
 __version__ = "0.1.0"
-__all__ = ["deidentify", "DeidentificationConfig", "DeidentificationResult"]
+__all__ = [
+    "deidentify",
+    "deidentify_in_place",
+    "deidentify_iter",
+    "deidentify_stream",
+    "create_engine",
+    "DeidentificationConfig",
+    "DeidentificationResult",
+]
 
 
 def deidentify(
@@ -43,6 +51,128 @@ def deidentify(
     if config is None:
         config = DeidentificationConfig()
 
+    engine = create_engine(config)
+
+    # 执行脱敏
+    result = engine.process(text)
+
+    return result
+
+
+def deidentify_in_place(
+    path: str,
+    output_path: str | None = None,
+    config: DeidentificationConfig | None = None,
+) -> DeidentificationResult:
+    """
+    原地脱敏文件：虚拟值与原文等长，直接改写文件，原文与输出的坐标完全一致
+
+    Args:
+        path: 输入文件路径（UTF-8）
+        output_path: 输出文件路径，为 None 时直接改写输入文件
+        config: 脱敏配置选项，为 None 时使用按 UTF-8 字节等长的默认配置
+
+    Returns:
+        DeidentificationResult: 脱敏结果（anonymized_text 为空，脱敏文本已写入文件）
+
+    Example:
+        >>> from contract_deid import deidentify_in_place, DeidentificationConfig
+        >>> config = DeidentificationConfig(preserve_offsets=True, offset_unit="byte")
+        >>> result = deidentify_in_place("contract.txt", "contract.deid.txt", config=config)
+    """
+    if config is None:
+        config = DeidentificationConfig(preserve_offsets=True, offset_unit="byte")
+
+    engine = create_engine(config)
+    return engine.process_in_place(path, output_path)
+
+
+def deidentify_stream(
+    source,
+    config: DeidentificationConfig | None = None,
+    window_size: int | None = None,
+    overlap: int | None = None,
+    verify_leaks: bool = False,
+):
+    """
+    流式脱敏超大文档：按窗口读取并逐块输出，峰值内存与窗口大小成正比
+
+    Args:
+        source: 字符串、文本文件对象或文本块迭代器
+        config: 脱敏配置选项，如果为 None 则使用默认配置
+        window_size: 每次输出的最大字符数
+        overlap: 窗口之后额外参与识别的字符数（不小于最长实体的长度）
+        verify_leaks: 是否逐块校验输出中的残留原始值
+
+    Returns:
+        DeidentificationStream: 迭代得到脱敏后的文本块，结束后 result 为包含完整映射表的结果
+
+    Example:
+        >>> from contract_deid import deidentify_stream
+        >>> with open("archive.txt", encoding="utf-8") as src, open("out.txt", "w", encoding="utf-8") as dst:
+        ...     stream = deidentify_stream(src)
+        ...     dst.writelines(stream)
+        >>> print(stream.result.mapping)
+    """
+    if config is None:
+        config = DeidentificationConfig()
+
+    engine = create_engine(config)
+    return engine.process_stream(source, window_size=window_size, overlap=overlap, verify_leaks=verify_leaks)
+
+
+def deidentify_iter(
+    records,
+    config: DeidentificationConfig | None = None,
+    batch_size: int | None = None,
+    read_ahead: int | None = None,
+):
+    """
+    惰性脱敏 (id, text) 记录流，适用于 ETL 管道
+
+    后台有界预读记录，每批记录的 NER 合并推理，按输入顺序产出结果。
+    单条记录出错时该条结果的 error 字段记录异常，不中断后续记录。
+
+    Args:
+        records: (id, text) 记录迭代器
+        config: 脱敏配置选项，如果为 None 则使用默认配置
+        batch_size: 每批合并推理的记录数
+        read_ahead: 后台预读的最大记录数
+
+    Yields:
+        RecordResult: 包含 id、result（DeidentificationResult）和 error
+
+    Example:
+        >>> from contract_deid import deidentify_iter
+        >>> for record in deidentify_iter(((row.id, row.text) for row in rows)):
+        ...     if record.ok:
+        ...         save(record.id, record.result.anonymized_text)
+        ...     else:
+        ...         log_error(record.id, record.error)
+    """
+    if config is None:
+        config = DeidentificationConfig()
+
+    engine = create_engine(config)
+    yield from engine.process_records(records, batch_size=batch_size, read_ahead=read_ahead)
+
+
+def create_engine(config: DeidentificationConfig):
+    """
+    创建脱敏引擎（配置了快照路径时从快照恢复），供需要复用引擎或读取统计信息的调用方使用
+
+    Args:
+        config: 脱敏配置
+
+    Returns:
+        DeidentificationEngine
+    """
+    if config.engine_snapshot_path:
+        # 从快照恢复已预热的引擎（快照失效时自动重建）
+        from contract_deid.core.snapshot import load_or_create_engine
+
+        return load_or_create_engine(config)
+
     # 延迟导入
     DeidentificationEngine, ConsistencyProvider = _get_engine_and_provider()
 
@@ -50,9 +180,4 @@ def deidentify(
     consistency_provider = ConsistencyProvider()
 
     # 创建脱敏引擎
-    engine = DeidentificationEngine(config=config, consistency_provider=consistency_provider)
-
-    # 执行脱敏
-    result = engine.process(text)
-
-    return result
+    return DeidentificationEngine(config=config, consistency_provider=consistency_provider)
@@ -0,0 +1,208 @@
+"""
+金额按比例改写
+
+同一文档中的所有金额乘以同一个噪声系数（来自 AmountRecognizer.noise_factor），
+保持金额之间的比例关系，并保留原文的书写格式：货币符号、千分位逗号、小数位数、
+万/亿单位、大写/小写中文数字。数值相同的金额（如 "1,000,000 元（大写：壹佰万元整）"
+中的小写与大写）先统一计算出同一个新数值，再分别按各自的格式输出，保证前后一致。
+"""
+
+import re
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from contract_deid.utils.chinese_numerals import (
+    UPPERCASE_CHARS,
+    DIGITS,
+    SMALL_UNITS,
+    format_chinese_amount,
+    parse_chinese_amount,
+)
+
+# 阿拉伯数字金额：前缀（货币符号等）+ 数字 + 可选的万/亿单位 + 后缀
+_ARABIC_AMOUNT = re.compile(
+    r"^(?P<prefix>\D*?)(?P<number>\d[\d,]*(?:\.\d+)?)(?P<space>\s*)(?P<unit>[千百]?[万亿]?)(?P<suffix>\D*)$"
+)
+
+_CHINESE_DIGITS = set(DIGITS) | set(SMALL_UNITS)
+
+# 带单位的金额保留的最多小数位（如 "1.58亿元"）
+_UNIT_DECIMALS = 2
+
+
+def _unit_value(unit: str) -> Decimal:
+    """单位对应的数值，如 "千万" -> 10^7"""
+    return parse_chinese_amount("1" + unit) if unit else Decimal(1)
+
+
+def _is_chinese(text: str) -> bool:
+    """是否为纯中文数字金额（与阿拉伯数字混写的按阿拉伯数字格式处理）"""
+    return not any(ch.isdigit() and ch.isascii() for ch in text) and any(ch in _CHINESE_DIGITS for ch in text)
+
+
+def _decimals(number: str) -> int:
+    """数字字符串中的小数位数"""
+    return len(number.split(".", 1)[1]) if "." in number else 0
+
+
+class AmountRewriter:
+    """
+    金额改写器
+
+    Example:
+        >>> rewriter = AmountRewriter(1.05)
+        >>> rewriter.rewrite(["1,000,000 元", "壹佰万元整"])
+        {'1,000,000 元': '1,050,000 元', '壹佰万元整': '壹佰零伍万元整'}
+    """
+
+    def __init__(self, noise_factor: float):
+        """
+        初始化改写器
+
+        Args:
+            noise_factor: 噪声系数，文档内所有金额乘以同一系数
+        """
+        self.noise_factor = Decimal(str(noise_factor))
+
+    def parse(self, original: str) -> Optional[Tuple[Decimal, int]]:
+        """
+        解析金额文本
+
+        Args:
+            original: 金额文本
+
+        Returns:
+            (数值, 数值精度即需要保留的小数位数)；无法解析时返回 None
+        """
+        text = original.strip().lstrip("¥￥").strip()
+        if _is_chinese(text):
+            value = parse_chinese_amount(text)
+            if value is None:
+                return None
+            # 中文金额可以表示到分
+            return value, 2 if value != value.to_integral_value() else 0
+
+        match = _ARABIC_AMOUNT.match(original.strip())
+        if not match:
+            return None
+        number = match.group("number").replace(",", "")
+        value = Decimal(number) * _unit_value(match.group("unit"))
+        exponent = value.normalize().as_tuple().exponent
+        return value, max(0, -exponent)
+
+    def rewrite(
+        self, originals: Iterable[str], fits: Optional[Callable[[str, str], bool]] = None
+    ) -> Dict[str, str]:
+        """
+        一次性改写一批金额
+
+        先解析出所有数值并按数值去重，对每个不同的数值计算一次新值（按该数值所有写法中最粗的粒度取整），
+        再按各自的原始格式输出，各写法解析回来是同一个数。
+
+        Args:
+            originals: 金额文本（通常是同一文档中的全部金额）
+            fits: 改写结果的约束 fits(原文, 改写后)，如保持偏移模式下不超过原文长度；给定时每个数值从最细的
+                粒度起逐级放粗，取所有写法都满足约束的第一个结果
+
+        Returns:
+            {原文: 改写后的文本}；无法解析的金额保持不变。给定 fits 时，无法解析或任何粒度下都不满足约束的金额
+            不出现在结果中
+        """
+        parsed: List[Tuple[str, Optional[Tuple[Decimal, int]]]] = [
+            (original, self.parse(original)) for original in dict.fromkeys(originals)
+        ]
+
+        # 同一数值的所有写法取最粗的粒度，只取整一次：否则 "1.5亿元" 按 0.01 亿取整，
+        # 大写却保留到元，两种写法会对应不同的数值
+        quantum: Dict[Decimal, Decimal] = {}
+        forms: Dict[Decimal, List[str]] = {}
+        for original, item in parsed:
+            if item is not None:
+                value, places = item
+                granularity = self.granularity(original, places)
+                quantum[value] = max(quantum.get(value, granularity), granularity)
+                forms.setdefault(value, []).append(original)
+
+        rewritten: Dict[str, str] = {}
+        for value, step in quantum.items():
+            for step in self._steps(value, step) if fits else (step,):
+                scaled = (value * self.noise_factor).quantize(step, rounding=ROUND_HALF_UP)
+                texts = {original: self.format(original, scaled) for original in forms[value]}
+                if fits is None or all(fits(original, text) for original, text in texts.items()):
+                    rewritten.update(texts)
+                    break
+
+        if fits is not None:
+            return {original: rewritten[original] for original, _ in parsed if original in rewritten}
+        return {original: rewritten.get(original, original) for original, _ in parsed}
+
+    def _steps(self, value: Decimal, step: Decimal) -> Iterator[Decimal]:
+        """从 step 起逐级放大 10 倍的取整步长，最粗到新数值的最高位"""
+        coarsest = Decimal(1).scaleb((value * self.noise_factor).adjusted())
+        while True:
+            yield step
+            if step >= coarsest:
+                return
+            step = step.scaleb(1)
+
+    @staticmethod
+    def granularity(original: str, places: int) -> Decimal:
+        """
+        金额写法能精确表示的最小步长
+
+        带万/亿单位的阿拉伯数字最多保留 _UNIT_DECIMALS 位小数，步长为单位的百分之一（如 "万" 为 100）；
+        其余写法的步长由数值精度决定。
+
+        Args:
+            original: 金额文本
+            places: parse 得到的数值精度
+
+        Returns:
+            10 的整数次幂
+        """
+        step = Decimal(1).scaleb(-places)
+        body = original.strip()
+        if not _is_chinese(body):
+            match = _ARABIC_AMOUNT.match(body)
+            if match and match.group("unit"):
+                unit_step = (_unit_value(match.group("unit")) / 10**_UNIT_DECIMALS).normalize()
+                step = max(step, unit_step)
+        return step
+
+    def format(self, original: str, value: Decimal) -> str:
+        """
+        按原文格式输出新数值
+
+        Args:
+            original: 原始金额文本（决定格式）
+            value: 新数值
+
+        Returns:
+            改写后的金额文本
+        """
+        leading = original[: len(original) - len(original.lstrip())]
+        trailing = original[len(original.rstrip()):]
+        body = original.strip()
+
+        if _is_chinese(body):
+            prefix = body[: len(body) - len(body.lstrip("¥￥"))]
+            uppercase = any(ch in UPPERCASE_CHARS for ch in body)
+            has_yuan = "元" in body or "圆" in body or "角" in body or "分" in body
+            text = format_chinese_amount(value, uppercase=uppercase, yuan=has_yuan, zheng=body.endswith("整"))
+            return leading + prefix + text + trailing
+
+        match = _ARABIC_AMOUNT.match(body)
+        number, unit = match.group("number"), match.group("unit")
+        amount = value / _unit_value(unit)
+        places = _decimals(number)
+        if unit:
+            # 带单位时补足精度，避免 "100万" 改写后只剩整数万
+            places = min(max(places, -amount.normalize().as_tuple().exponent, 0), _UNIT_DECIMALS)
+        else:
+            places = max(places, -value.as_tuple().exponent, 0)
+        amount = amount.quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP)
+        formatted = f"{amount:,.{places}f}" if "," in number else f"{amount:.{places}f}"
+        return (
+            leading + match.group("prefix") + formatted + match.group("space") + unit
+            + match.group("suffix") + trailing
+        )
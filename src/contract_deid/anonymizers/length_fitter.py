@@ -0,0 +1,168 @@
+"""
+等长替换
+
+保持偏移模式下，每个虚拟值与原文片段等长（按字符数，或按 UTF-8 字节数），
+原文与脱敏后文本的坐标完全一致，可以直接在 bytearray / mmap 上原地改写。
+
+- 人名、组织机构、地址：多次生成候选值，取长度恰好相等者；都不相等时取最接近的候选补齐或截断
+- 金额：按比例改写的结果已约束为不超过原文长度（见 fits），较短时补齐，保留数值与比例
+- 号码等格式化实体：候选值长度不等时按原文逐字符替换为不同的同类字符（数字换数字、字母换字母、
+  大写中文数字换大写中文数字），保留分隔符与单位
+"""
+
+import random
+import string
+from typing import Callable, Optional
+
+# 候选值长度不等时按原文形状替换字符的实体类型
+SHAPED_TYPES = frozenset(
+    {"CREDIT_CODE", "ID_CARD", "PHONE_NUMBER", "EMAIL", "BANK_ACCOUNT", "AMOUNT"}
+)
+
+# 形状替换的字符类
+_CHAR_CLASSES = (
+    string.digits,
+    string.ascii_uppercase,
+    string.ascii_lowercase,
+    "壹贰叁肆伍陆柒捌玖",
+    "一二三四五六七八九",
+)
+_CLASS_OF = {ch: chars for chars in _CHAR_CLASSES for ch in chars}
+
+# 补齐字符：全角空格（UTF-8 3 字节）与半角空格
+_WIDE_PAD = "　"
+_NARROW_PAD = " "
+
+
+class LengthFitter:
+    """
+    等长替换器
+
+    Example:
+        >>> fitter = LengthFitter(unit="byte")
+        >>> fitter.fit("张三", "PERSON", faker_provider.generate_name)
+        '李四'
+    """
+
+    def __init__(self, unit: str = "char", attempts: int = 8):
+        """
+        初始化等长替换器
+
+        Args:
+            unit: 长度单位，"char"（字符数）或 "byte"（UTF-8 字节数）
+            attempts: 每个实体最多生成的候选值个数
+        """
+        if unit not in ("char", "byte"):
+            raise ValueError(f"Unknown offset unit: {unit}")
+        self.unit = unit
+        self.attempts = attempts
+
+    def measure(self, text: str) -> int:
+        """
+        按当前单位计算长度
+
+        Args:
+            text: 文本
+
+        Returns:
+            字符数或 UTF-8 字节数
+        """
+        return len(text.encode("utf-8")) if self.unit == "byte" else len(text)
+
+    def fit(self, original: str, entity_type: str, generate: Callable[[], str], first: Optional[str] = None) -> str:
+        """
+        生成与原文等长的虚拟值
+
+        Args:
+            original: 原文片段
+            entity_type: 实体类型
+            generate: 候选值生成函数
+            first: 已生成的第一个候选值（如批量改写的金额），为 None 时调用 generate
+
+        Returns:
+            与原文等长的虚拟值
+        """
+        target = self.measure(original)
+        candidate = generate() if first is None else first
+        if self.fits(original, candidate) and self.measure(candidate) == target:
+            return candidate
+        if entity_type in SHAPED_TYPES:
+            # 较短的金额补齐即可保留改写后的数值；与原文相同的候选值不能使用
+            if entity_type == "AMOUNT" and self.fits(original, candidate):
+                return self.pad_or_truncate(candidate, target)
+            return self.reshape(original)
+
+        best = candidate
+        for _ in range(self.attempts - 1):
+            candidate = generate()
+            if candidate != original and self.measure(candidate) == target:
+                return candidate
+            # 优先选择不超过目标长度的最长候选（补齐比截断保留更多信息）
+            if self._closeness(candidate, target) < self._closeness(best, target):
+                best = candidate
+        return self.pad_or_truncate(best, target)
+
+    def fits(self, original: str, candidate: str) -> bool:
+        """
+        候选值是否可以补齐为等长的虚拟值：与原文不同且不超过原文长度
+
+        Args:
+            original: 原文片段
+            candidate: 候选值
+
+        Returns:
+            可以使用时为 True
+        """
+        return candidate != original and self.measure(candidate) <= self.measure(original)
+
+    def _closeness(self, candidate: str, target: int) -> tuple:
+        """候选值与目标长度的接近程度，越小越好"""
+        length = self.measure(candidate)
+        return (length > target, abs(length - target))
+
+    def reshape(self, original: str) -> str:
+        """
+        按原文形状逐字符替换同类字符
+
+        可替换字符都换成不同的同类字符（数字串首位的 0 除外，如区号），数字串的首位保持零/非零不变，
+        其余字符（分隔符、"@"、"零"、单位、汉字）原样保留。
+
+        Args:
+            original: 原文片段
+
+        Returns:
+            等长（字符数与字节数都相等）的替换值
+        """
+        out = []
+        in_number = False
+        for ch in original:
+            chars = _CLASS_OF.get(ch)
+            if chars is None:
+                out.append(ch)
+            elif chars is string.digits and not in_number:
+                # 首位 0（如区号）保留，非零首位仍取非零
+                out.append(ch if ch == "0" else random.choice(chars[1:].replace(ch, "")))
+            else:
+                out.append(random.choice(chars.replace(ch, "")))
+            in_number = chars is string.digits
+        return "".join(out)
+
+    def pad_or_truncate(self, value: str, target: int) -> str:
+        """
+        补齐或截断到目标长度
+
+        Args:
+            value: 候选值
+            target: 目标长度
+
+        Returns:
+            等长的值
+        """
+        while value and self.measure(value) > target:
+            value = value[:-1]
+        missing = target - self.measure(value)
+        if self.unit == "byte":
+            wide, narrow = divmod(missing, len(_WIDE_PAD.encode("utf-8")))
+            return value + _WIDE_PAD * wide + _NARROW_PAD * narrow
+        pad = _WIDE_PAD if value and not value.isascii() else _NARROW_PAD
+        return value + pad * missing
@@ -7,10 +7,12 @@
 import argparse
 import json
 import sys
+from collections import Counter
+from dataclasses import replace
 from pathlib import Path
 from typing import List
 
-from contract_deid import deidentify, DeidentificationConfig
+from contract_deid import create_engine, deidentify, deidentify_in_place, deidentify_stream, DeidentificationConfig
 
 
 def main():
@@ -55,6 +57,16 @@ def main():
         type=str,
         help="批量处理映射表保存目录",
     )
+    parser.add_argument(
+        "--mapping-stream",
+        type=str,
+        help="语料级映射表路径（.csv/.jsonl，可加 .gz/.zst），每个文档的映射追加写入并带 document 列",
+    )
+    parser.add_argument(
+        "--mapping-store",
+        type=str,
+        help="批量处理时写入按实体类型分区的 Parquet 映射表目录（需要 pyarrow）",
+    )
 
     # 配置选项
     parser.add_argument(
@@ -77,6 +89,64 @@ def main():
         dest="enable_ner",
         help="禁用 NER 识别（仅使用规则引擎）",
     )
+    parser.add_argument(
+        "--ner-gating",
+        action="store_true",
+        help="启用 NER 触发词门控（只对可能包含实体的片段运行模型）",
+    )
+    parser.add_argument(
+        "--ner-gate-margin",
+        type=int,
+        default=64,
+        help="门控召回安全余量，触发词前后保留的字符数（默认：64）",
+    )
+    parser.add_argument(
+        "--gazetteer",
+        type=str,
+        help="已知组织机构/人名词典文件（由 scripts/build_gazetteer.py 生成）",
+    )
+    parser.add_argument(
+        "--no-entity-propagation",
+        action="store_false",
+        dest="enable_entity_propagation",
+        help="不将已识别实体传播到全文其他出现位置",
+    )
+    parser.add_argument(
+        "--ner-max-chars",
+        type=int,
+        help="NER 只处理文档前 N 个字符，其余位置依靠实体传播覆盖",
+    )
+    parser.add_argument(
+        "--no-rule-prefilter",
+        action="store_false",
+        dest="rule_prefilter",
+        help="不按字符类画像跳过识别器（所有规则识别器在每个窗口上运行）",
+    )
+    parser.add_argument(
+        "--concurrent-layers",
+        action="store_true",
+        help="规则引擎与 NER 并发执行",
+    )
+    parser.add_argument(
+        "--layer-window-size",
+        type=int,
+        help="按窗口处理第一层和第二层（字符数）",
+    )
+    parser.add_argument(
+        "--preserve-offsets",
+        choices=["char", "byte"],
+        help="等长替换：虚拟值与原文等长（按字符数或 UTF-8 字节数），原文与输出坐标一致",
+    )
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="原地改写输入文件（指定 -o 时改写其副本），需要 --preserve-offsets byte",
+    )
+    parser.add_argument(
+        "--stream-window",
+        type=int,
+        help="单文件流式处理的窗口大小（字符数，默认 65536），峰值内存与窗口大小成正比",
+    )
     parser.add_argument(
         "--enable-llm",
         action="store_true",
@@ -87,6 +157,32 @@ def main():
         type=str,
         help="LLM 模型路径（启用 LLM 润色时必需）",
     )
+    parser.add_argument(
+        "--llm-refine-mode",
+        choices=["edits", "text"],
+        default="edits",
+        help="LLM 润色输出模式：edits 只返回编辑列表（默认），text 逐段重写",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        type=str,
+        help="LLM 响应缓存文件路径（SQLite），LLM 实体抽取与润色共享",
+    )
+    parser.add_argument(
+        "--llm-cache-ttl",
+        type=float,
+        help="LLM 响应缓存过期时间（秒）",
+    )
+    parser.add_argument(
+        "--verify-leaks",
+        action="store_true",
+        help="脱敏后校验输出中是否残留原始值，发现残留时报告位置",
+    )
+    parser.add_argument(
+        "--engine-snapshot",
+        type=str,
+        help="引擎快照路径（存在且有效时直接恢复，否则构建后写入）",
+    )
 
     args = parser.parse_args()
 
@@ -95,18 +191,108 @@ def main():
         amount_noise_range=tuple(args.amount_noise_range),
         location_preserve_level=args.location_preserve_level,
         enable_ner=args.enable_ner,
+        ner_gating=args.ner_gating,
+        ner_gate_margin=args.ner_gate_margin,
+        gazetteer_path=args.gazetteer,
+        enable_entity_propagation=args.enable_entity_propagation,
+        ner_max_chars=args.ner_max_chars,
+        rule_prefilter=args.rule_prefilter,
+        concurrent_layers=args.concurrent_layers,
+        layer_window_size=args.layer_window_size,
+        preserve_offsets=args.preserve_offsets is not None,
+        offset_unit=args.preserve_offsets or "char",
         enable_llm_refinement=args.enable_llm,
         llm_model_path=args.llm_model_path,
+        llm_refine_mode=args.llm_refine_mode,
+        llm_cache_path=args.llm_cache,
+        llm_cache_ttl=args.llm_cache_ttl,
         export_mapping_csv=True,
         mapping_file_path=args.mapping,
+        mapping_stream_path=args.mapping_stream,
+        document_id=Path(args.input).name if args.input and Path(args.input).is_file() else None,
+        engine_snapshot_path=args.engine_snapshot,
     )
 
     # 批量处理模式
     if args.batch:
-        batch_process(args.batch, args.output_dir, args.mappings_dir, config)
+        batch_process(
+            args.batch,
+            args.output_dir,
+            args.mappings_dir,
+            config,
+            verify_leaks=args.verify_leaks,
+            mapping_store_dir=args.mapping_store,
+        )
+        return
+
+    # 原地改写模式：不读入整段输出文本，直接改写 mmap 映射的文件
+    if args.in_place:
+        if not args.input or not Path(args.input).is_file():
+            print("Error: --in-place requires an input file", file=sys.stderr)
+            sys.exit(1)
+        if config.offset_unit != "byte":
+            print("Error: --in-place requires --preserve-offsets byte", file=sys.stderr)
+            sys.exit(1)
+        try:
+            result = deidentify_in_place(args.input, args.output, config=config)
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.mapping and not config.mapping_file_path:
+            result.save_mapping(args.mapping)
         return
 
     # 单文件处理模式
+    # LLM 润色需要完整文档，其余情况按窗口流式处理，不把整个文件读入内存
+    if config.enable_llm_refinement:
+        _process_whole(args, config)
+    else:
+        _process_stream(args, config)
+
+
+def _process_stream(args, config: DeidentificationConfig):
+    """流式处理单个文件、直接输入的文本或标准输入"""
+    is_file = bool(args.input) and Path(args.input).is_file()
+    if is_file:
+        source = open(args.input, "r", encoding="utf-8")
+    elif args.input:
+        # 直接作为文本处理
+        source = args.input
+    else:
+        # 从标准输入读取
+        source = sys.stdin
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+
+    try:
+        stream = deidentify_stream(
+            source, config=config, window_size=args.stream_window, verify_leaks=args.verify_leaks
+        )
+        for chunk in stream:
+            output.write(chunk)
+        if not args.output:
+            output.write("\n")
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if is_file:
+            source.close()
+        if args.output:
+            output.close()
+
+    # 输出映射表（如果指定了路径但不在配置中）
+    if args.mapping and not config.mapping_file_path:
+        stream.result.save_mapping(args.mapping)
+
+    # 泄漏校验：发现残留时以非零状态码退出
+    if args.verify_leaks:
+        _print_leak_report(stream.leak_report, args.input if is_file else "<input>")
+        if stream.leak_report.leaked:
+            sys.exit(2)
+
+
+def _process_whole(args, config: DeidentificationConfig):
+    """读入完整文档处理（LLM 润色需要完整上下文）"""
     # 读取输入
     if args.input:
         if Path(args.input).is_file():
@@ -137,12 +323,49 @@ def main():
     if args.mapping and not config.mapping_file_path:
         result.save_mapping(args.mapping)
 
+    # 泄漏校验：发现残留时以非零状态码退出
+    if args.verify_leaks:
+        report = result.verify_leaks()
+        _print_leak_report(report, args.input if args.input and Path(args.input).is_file() else "<input>")
+        if report.leaked:
+            sys.exit(2)
+
+
+def _print_leak_report(report, name: str):
+    """输出泄漏校验结果（stderr，只输出位置和类型，不把敏感值写入日志）"""
+    for hit in report.hits:
+        print(f"Leak: {name}:{hit.start}-{hit.end} {hit.entity_type}", file=sys.stderr)
+
+
+def _read_files(paths: List[Path]):
+    """
+    逐个读取文本文件，产出 (文件名, 文本) 记录；读取失败的文件报告后跳过
+
+    文件名作为记录标识，同时写入语料级映射表的 document 列。
+
+    Args:
+        paths: 文件路径列表
+
+    Yields:
+        (str, str)
+    """
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error reading {path.name}: {e}", file=sys.stderr)
+            continue
+        yield path.name, text
+
 
 def batch_process(
     input_dir: str,
     output_dir: str | None,
     mappings_dir: str | None,
     config: DeidentificationConfig,
+    verify_leaks: bool = False,
+    mapping_store_dir: str | None = None,
 ):
     """
     批量处理目录中的文件
@@ -152,6 +375,8 @@ def batch_process(
         output_dir: 输出目录
         mappings_dir: 映射表保存目录
         config: 脱敏配置
+        verify_leaks: 是否对每个输出执行泄漏校验
+        mapping_store_dir: Parquet 映射表存储目录（可选）
     """
     input_path = Path(input_dir)
     if not input_path.is_dir():
@@ -178,23 +403,48 @@ def batch_process(
         print(f"Warning: No text files found in {input_dir}", file=sys.stderr)
         return
 
-    # 处理每个文件
+    # 语料级 Parquet 映射表存储：逐文档追加，按行组写出
+    store = None
+    if mapping_store_dir:
+        from contract_deid.utils.mapping_store import ParquetMappingStore
+
+        try:
+            store = ParquetMappingStore(mapping_store_dir)
+        except ImportError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    # 处理每个文件：同一个引擎惰性处理文件流，每批文件的 NER 合并推理，单个文件出错不中断
+    # 汇总结果只在需要写出 batch_summary.json 时保留，避免内存随文件数增长
     results = []
-    for file_path in text_files:
+    processed = 0
+    failed = 0
+    conflicts: Counter = Counter()
+    leaked_files = 0
+    leak_hits = 0
+    # 每个文件的映射表在拿到结果后单独保存；使用配置副本，不修改调用方的配置
+    config = replace(config, mapping_file_path=None)
+    paths = {file_path.name: file_path for file_path in text_files}
+    engine = create_engine(config)
+    for record in engine.process_records(_read_files(text_files)):
+        file_path = paths[record.id]
         print(f"Processing: {file_path.name}", file=sys.stderr)
+        if not record.ok:
+            failed += 1
+            print(f"Error processing {file_path.name}: {record.error}", file=sys.stderr)
+            continue
+        result = record.result
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-
-            # 更新配置中的映射表路径
             if mappings_path:
-                config.mapping_file_path = str(mappings_path / f"{file_path.stem}_mapping.json")
-            else:
-                config.mapping_file_path = None
+                result.save_mapping(str(mappings_path / f"{file_path.stem}_mapping.json"))
 
-            # 执行脱敏
-            result = deidentify(text, config=config)
+            if verify_leaks:
+                report = result.verify_leaks()
+                if report.leaked:
+                    leaked_files += 1
+                    leak_hits += len(report.hits)
+                    _print_leak_report(report, file_path.name)
 
             # 保存输出文件
             if output_path:
@@ -202,6 +452,16 @@ def batch_process(
                 with open(output_file, "w", encoding="utf-8") as f:
                     f.write(result.anonymized_text)
 
+            if store:
+                store.add(file_path.name, result)
+        except Exception as e:
+            failed += 1
+            print(f"Error processing {file_path.name}: {e}", file=sys.stderr)
+            continue
+
+        processed += 1
+        conflicts.update(result.conflicts)
+        if mappings_path:
             results.append(
                 {
                     "file": file_path.name,
@@ -210,9 +470,9 @@ def batch_process(
                 }
             )
 
-        except Exception as e:
-            print(f"Error processing {file_path.name}: {e}", file=sys.stderr)
-            continue
+    if store:
+        store.close()
+        print(f"Mapping store: {store.rows} rows written to {mapping_store_dir}", file=sys.stderr)
 
     # 保存汇总结果
     if mappings_path:
@@ -220,7 +480,23 @@ def batch_process(
         with open(summary_file, "w", encoding="utf-8") as f:
             json.dump(results, f, ensure_ascii=False, indent=2)
 
-    print(f"\nProcessed {len(results)} files", file=sys.stderr)
+    print(f"\nProcessed {processed} files" + (f", {failed} failed" if failed else ""), file=sys.stderr)
+    if conflicts:
+        details = ", ".join(f"{reason}={count}" for reason, count in conflicts.most_common())
+        print(f"Conflicts resolved: {sum(conflicts.values())} ({details})", file=sys.stderr)
+    if config.rule_prefilter:
+        print(engine.prefilter_stats.summary(), file=sys.stderr)
+    if verify_leaks:
+        print(f"Leak check: {leak_hits} residual hits in {leaked_files} files", file=sys.stderr)
+    if config.llm_cache_path:
+        from contract_deid.core.llm_cache import get_shared_cache
+
+        cache = get_shared_cache(
+            config.llm_cache_path,
+            ttl_seconds=config.llm_cache_ttl,
+            max_entries=config.llm_cache_max_entries,
+        )
+        print(cache.stats.summary(), file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -124,6 +124,84 @@ class NERConfig:
         """
         return os.getenv("LLM_CALL_FUNC_MODULE") or None
 
+    @staticmethod
+    def get_llm_chunk_size() -> int:
+        """
+        获取 LLM 实体抽取的分块大小
+
+        Returns:
+            每个分块的最大字符数，默认为 1000
+        """
+        return int(os.getenv("LLM_CHUNK_SIZE", "1000"))
+
+    @staticmethod
+    def get_llm_max_concurrency() -> int:
+        """
+        获取 LLM 实体抽取的最大并发请求数
+
+        Returns:
+            最大并发数，默认为 4
+        """
+        return int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+
+    @staticmethod
+    def get_llm_requests_per_second() -> Optional[float]:
+        """
+        获取 LLM 请求速率限制
+
+        Returns:
+            每秒最大请求数，如果未设置则不限速
+        """
+        rate = os.getenv("LLM_REQUESTS_PER_SECOND")
+        return float(rate) if rate else None
+
+    @staticmethod
+    def get_llm_cache_path() -> Optional[str]:
+        """
+        获取 LLM 响应缓存文件路径
+
+        Returns:
+            SQLite 文件路径，如果未设置则不启用缓存
+        """
+        path = os.getenv("LLM_CACHE_PATH")
+        if path:
+            return str(Path(path).expanduser().resolve())
+        return None
+
+    @staticmethod
+    def get_server_address() -> Optional[str]:
+        """
+        获取本地 NER 推理服务地址
+
+        Returns:
+            Unix socket 路径或 "host:port"，如果未设置则返回 None
+        """
+        return os.getenv("NER_SERVER_ADDRESS") or None
+
+    @staticmethod
+    def get_server_authkey() -> Optional[bytes]:
+        """
+        获取本地 NER 推理服务的认证密钥
+
+        Returns:
+            认证密钥，如果未设置则返回 None
+        """
+        authkey = os.getenv("NER_SERVER_AUTHKEY")
+        return authkey.encode("utf-8") if authkey else None
+
+    @staticmethod
+    def get_server_authkey_file() -> Optional[str]:
+        """
+        获取本地 NER 推理服务认证密钥文件路径
+
+        Returns:
+            密钥文件路径，如果未设置则返回 None（Unix socket 默认使用 "<socket 路径>.key"）
+        """
+        path = os.getenv("NER_SERVER_AUTHKEY_FILE")
+        if path:
+            return str(Path(path).expanduser().resolve())
+        return None
+
 
 class ModelConfig:
     """模型相关配置"""
@@ -5,18 +5,33 @@
 包括：统一社会信用代码、身份证号、电话/手机/邮箱、银行账号、金额等
 """
 
-from typing import List, Dict, Any
-from presidio_analyzer import AnalyzerEngine, RecognizerRegistry, RecognizerResult
+import mmap
+import random
+import shutil
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+from presidio_analyzer import AnalyzerEngine, RecognizerRegistry
 
 from contract_deid.recognizers.credit_code import CreditCodeRecognizer
 from contract_deid.recognizers.id_card import IdCardRecognizer
 from contract_deid.recognizers.phone import PhoneRecognizer
 from contract_deid.recognizers.bank_account import BankAccountRecognizer
 from contract_deid.recognizers.amount import AmountRecognizer
+from contract_deid.recognizers.gazetteer import GazetteerRecognizer
 from contract_deid.core.ner_engine import NEREngine
+from contract_deid.core.ner_gate import NERGate
+from contract_deid.core.propagation import EntityPropagator
+from contract_deid.core.conflict import ConflictResolver
 from contract_deid.core.consistency import ConsistencyProvider
+from contract_deid.core.span import Span
+from contract_deid.core.text_profile import PrefilterStats, TextProfile
 from contract_deid.core.llm_refine import LLMRefiner
+from contract_deid.core.llm_cache import get_shared_cache
+from contract_deid.utils.inplace import encode_replacements, patch_in_place
 from contract_deid.utils.mapping_export import DeidentificationConfig, DeidentificationResult
+from contract_deid.utils.text_windows import split_windows
 
 
 class DeidentificationEngine:
@@ -39,15 +54,59 @@ class DeidentificationEngine:
         self.config = config
         self.consistency_provider = consistency_provider
 
-        # 初始化 Presidio Analyzer
+        # 高频识别器直接产出 Span，不经过 Presidio（避免为每处匹配创建 RecognizerResult）
+        self.amount_recognizer = AmountRecognizer(self.config.amount_noise_range)
+        self.span_recognizers = [PhoneRecognizer(), self.amount_recognizer]
+        # 词典识别器：与规则层一起运行，识别已知的组织机构和人名
+        if self.config.gazetteer_path:
+            self.span_recognizers.append(GazetteerRecognizer(self.config.gazetteer_path))
+
+        # 初始化 Presidio Analyzer（其余规则识别器）
+        self.presidio_recognizers = [CreditCodeRecognizer(), IdCardRecognizer(), BankAccountRecognizer()]
         self.analyzer = self._create_analyzer()
 
+        # 前置过滤：按文本字符类画像跳过不可能命中的识别器
+        self.prefilter_stats = PrefilterStats()
+
+        # LLM 响应缓存（可选），LLM 实体抽取与润色共享
+        self.llm_cache = (
+            get_shared_cache(
+                config.llm_cache_path,
+                ttl_seconds=config.llm_cache_ttl,
+                max_entries=config.llm_cache_max_entries,
+            )
+            if config.llm_cache_path
+            else None
+        )
+
         # 初始化 NER 引擎（第二层）
-        self.ner_engine = NEREngine() if config.enable_ner else None
+        ner_kwargs = {"llm_cache": self.llm_cache} if self.llm_cache else {}
+        self.ner_engine = (
+            NEREngine(
+                gate=NERGate(margin=config.ner_gate_margin) if config.ner_gating else None,
+                **ner_kwargs
+            )
+            if config.enable_ner
+            else None
+        )
+
+        # 跨层冲突消解：替换前得到互不重叠的区间列表
+        self.conflict_resolver = ConflictResolver(
+            type_priority=config.conflict_type_priority,
+            layer_priority=config.conflict_layer_priority,
+        )
+
+        # 初始化实体传播器（NER 结果传播到全文）
+        self.propagator = EntityPropagator() if config.enable_entity_propagation else None
 
         # 初始化 LLM 润色器（第四层，可选）
+        # 润色会改变文本长度，保持偏移模式下不启用
+        if config.enable_llm_refinement and config.preserve_offsets:
+            print("Warning: LLM refinement changes offsets and is disabled when preserve_offsets is set")
         self.llm_refiner = (
-            LLMRefiner(config.llm_model_path) if config.enable_llm_refinement else None
+            LLMRefiner(config.llm_model_path, cache=self.llm_cache, mode=config.llm_refine_mode)
+            if config.enable_llm_refinement and not config.preserve_offsets
+            else None
         )
 
     def _create_analyzer(self) -> AnalyzerEngine:
@@ -66,16 +125,198 @@ class DeidentificationEngine:
             pass  # 如果不存在则忽略
 
         # 注册自定义识别器（第一层）
-        registry.add_recognizer(CreditCodeRecognizer())
-        registry.add_recognizer(IdCardRecognizer())
-        registry.add_recognizer(PhoneRecognizer())
-        registry.add_recognizer(BankAccountRecognizer())
-        registry.add_recognizer(AmountRecognizer(self.config.amount_noise_range))
+        # 电话、金额与词典识别器由 span_recognizers 直接调用
+        for recognizer in self.presidio_recognizers:
+            registry.add_recognizer(recognizer)
 
         # 创建分析引擎
         analyzer = AnalyzerEngine(registry=registry)
         return analyzer
 
+    def warm_up(self):
+        """
+        预热引擎：完成所有懒加载的初始化（如 NER 模型加载）
+
+        在保存快照或 fork 工作进程之前调用，确保后续处理不再触发加载。
+        """
+        if self.ner_engine:
+            # 访问 model 属性即触发懒加载
+            _ = self.ner_engine.adapter.model
+
+    def reseed(self):
+        """
+        重新初始化随机状态：random 模块种子、Faker 种子与金额噪声系数
+
+        从快照恢复、fork 出工作进程后调用，避免各进程复用同一个噪声系数和同一组虚拟值。
+        """
+        random.seed()
+        self.consistency_provider.reseed()
+        self.amount_recognizer.reset_noise_factor()
+
+    def analyze(self, text: str, known_entities: Optional[Dict[str, tuple]] = None) -> List[Span]:
+        """
+        执行第一层（规则引擎）和第二层（NER）识别
+
+        根据配置按窗口处理，并可让两层并发执行：NER 在后台线程中依次处理各窗口，
+        主线程同时进行规则扫描，端到端耗时接近 max(规则, NER) 而不是两者之和。
+        无论执行顺序如何，返回结果都按"规则结果在前、NER 结果在后、窗口从前到后"排列。
+        启用实体传播时，传播得到的结果追加在最后。
+        每个结果的 layer 属性记录来源层（rule / ner / propagation）。
+
+        Args:
+            text: 待识别的文本
+            known_entities: 文本之外已识别的软实体 {表面形式: (实体类型, 置信度)}，参与实体传播
+
+        Returns:
+            List[Span]: 两层识别结果
+        """
+        windows, ner_windows = self._layer_windows(text)
+
+        if self.ner_engine and self.config.concurrent_layers:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # 提前提交所有窗口，单个后台线程按顺序推理，与主线程的规则扫描重叠
+                ner_futures = [
+                    executor.submit(self.ner_engine.analyze_spans, text[start:end])
+                    for start, end in ner_windows
+                ]
+                rule_results = self._analyze_rules(text, windows)
+                ner_batches = [future.result() for future in ner_futures]
+        else:
+            rule_results = self._analyze_rules(text, windows)
+            ner_batches = (
+                [self.ner_engine.analyze_spans(text[start:end]) for start, end in ner_windows]
+                if self.ner_engine
+                else []
+            )
+
+        # 合并结果：顺序只由窗口顺序决定，与线程完成顺序无关
+        results = rule_results
+        for (start, _), batch in zip(ner_windows, ner_batches):
+            results.extend(self._shift_results(batch, start))
+
+        # 实体传播：一次线性扫描标注已识别实体在全文中的其他出现位置
+        if self.propagator:
+            results.extend(self.propagator.propagate(text, results, known=known_entities))
+        return results
+
+    def analyze_batch(self, texts: List[str]) -> List[List[Span]]:
+        """
+        批量执行第一层和第二层识别
+
+        规则层逐条处理；所有文本的 NER 窗口合并为一个批次推理，减少模型调用次数。
+        每条文本的结果与 analyze 的输出相同（不含并发执行）。
+
+        Args:
+            texts: 待识别的文本列表
+
+        Returns:
+            与输入一一对应的识别结果列表
+        """
+        plans = [self._layer_windows(text) for text in texts]
+        batches = [self._analyze_rules(text, windows) for text, (windows, _) in zip(texts, plans)]
+
+        if self.ner_engine:
+            pieces = []
+            owners = []
+            for index, (text, (_, ner_windows)) in enumerate(zip(texts, plans)):
+                for start, end in ner_windows:
+                    pieces.append(text[start:end])
+                    owners.append((index, start))
+            for (index, start), spans in zip(owners, self.ner_engine.analyze_spans_batch(pieces)):
+                batches[index].extend(self._shift_results(spans, start))
+
+        if self.propagator:
+            for text, results in zip(texts, batches):
+                results.extend(self.propagator.propagate(text, results))
+        return batches
+
+    def _layer_windows(self, text: str) -> tuple:
+        """
+        计算规则层窗口与 NER 窗口
+
+        Returns:
+            tuple: (规则层窗口列表, NER 窗口列表)
+        """
+        if self.config.layer_window_size:
+            windows = split_windows(text, self.config.layer_window_size)
+        else:
+            windows = [(0, len(text))]
+
+        # NER 可以只处理文档开头部分，其余位置依靠实体传播覆盖
+        ner_limit = self.config.ner_max_chars or len(text)
+        ner_windows = [(start, min(end, ner_limit)) for start, end in windows if start < ner_limit]
+        return windows, ner_windows
+
+    def _analyze_rules(self, text: str, windows: List[tuple]) -> List[Span]:
+        """
+        按窗口执行第一层规则识别
+
+        Args:
+            text: 完整文本
+            windows: 窗口列表 [(start, end), ...]
+
+        Returns:
+            偏移量已换算到完整文本的识别结果
+        """
+        results = []
+        for start, end in windows:
+            window = text[start:end]
+            profile = self._profile(window)
+
+            # Presidio 边界：RecognizerResult 转换为 Span
+            entities = self._presidio_entities(profile)
+            window_results = (
+                [
+                    Span.from_recognizer_result(result, "rule")
+                    for result in self.analyzer.analyze(text=window, language="zh", entities=entities)
+                ]
+                if entities != []
+                else []
+            )
+            for recognizer in self.span_recognizers:
+                if self._should_run(recognizer, profile):
+                    window_results.extend(recognizer.find_spans(window))
+            results.extend(self._shift_results(window_results, start))
+        return results
+
+    def _profile(self, window: str) -> Optional[TextProfile]:
+        """计算窗口的字符类画像；未启用前置过滤时返回 None"""
+        if not self.config.rule_prefilter:
+            return None
+        self.prefilter_stats.segments += 1
+        return TextProfile.from_text(window)
+
+    def _should_run(self, recognizer, profile: Optional[TextProfile]) -> bool:
+        """按识别器声明的前置条件判断是否需要运行，并记录统计"""
+        if profile is None:
+            return True
+        run = profile.satisfies(getattr(recognizer, "PREREQUISITES", None))
+        self.prefilter_stats.record(type(recognizer).__name__, skipped=not run)
+        return run
+
+    def _presidio_entities(self, profile: Optional[TextProfile]) -> Optional[List[str]]:
+        """
+        Presidio 需要识别的实体类型
+
+        Returns:
+            None 表示全部识别；空列表表示所有识别器都被跳过，不需要调用 Presidio
+        """
+        if profile is None:
+            return None
+        selected = [recognizer for recognizer in self.presidio_recognizers if self._should_run(recognizer, profile)]
+        if len(selected) == len(self.presidio_recognizers):
+            return None
+        return [entity for recognizer in selected for entity in recognizer.supported_entities]
+
+    @staticmethod
+    def _shift_results(results: List[Span], offset: int) -> List[Span]:
+        """将窗口内的识别结果偏移到完整文本坐标"""
+        if offset:
+            for result in results:
+                result.start += offset
+                result.end += offset
+        return results
+
     def process(self, text: str) -> DeidentificationResult:
         """
         执行完整的脱敏流程
@@ -86,30 +327,178 @@ class DeidentificationEngine:
         Returns:
             DeidentificationResult: 脱敏结果
         """
-        # 第一层：规则引擎识别
-        analyzer_results = self.analyzer.analyze(text=text, language="zh")
+        # 第一层 + 第二层：规则引擎识别与 NER 识别
+        return self.process_spans(text, self.analyze(text))
 
-        # 第二层：NER 识别（如果启用）
-        if self.ner_engine:
-            ner_results = self.ner_engine.analyze(text)
-            analyzer_results.extend(ner_results)
+    def process_spans(self, text: str, spans: List[Span]) -> DeidentificationResult:
+        """
+        对已完成识别的文本执行冲突消解、替换与润色
+
+        Args:
+            text: 待脱敏的文本
+            spans: 第一层与第二层的识别结果（如 analyze_batch 的输出）
+
+        Returns:
+            DeidentificationResult: 脱敏结果
+        """
+        # 消解跨层重叠
+        analyzer_results, conflicts = self._resolve(spans)
 
         # 第三层：使用一致性映射进行替换
-        anonymized_text, mapping = self.consistency_provider.anonymize(
+        anonymized_text, mapping, spans = self.consistency_provider.anonymize(
             text=text,
             analyzer_results=analyzer_results,
             config=self.config,
+            amount_noise_factor=self.amount_recognizer.get_noise_factor(),
         )
 
         # 第四层：LLM 润色（如果启用）
         if self.llm_refiner:
-            anonymized_text = self.llm_refiner.refine(anonymized_text, mapping)
+            # 模型发现的遗漏实体复用第三层的一致性映射生成虚拟值
+            changes = []
+            anonymized_text = self.llm_refiner.refine(
+                anonymized_text,
+                mapping,
+                value_provider=lambda original, entity_type: self.consistency_provider.get_value(
+                    original, entity_type, self.config
+                ),
+                changes=changes,
+            )
+            # 润色修改了文本，同步实体位置表中的脱敏后坐标
+            spans.apply_changes(changes)
 
         # 构建结果对象
         result = DeidentificationResult(
             anonymized_text=anonymized_text,
             mapping=mapping,
             config=self.config,
+            spans=spans,
+            conflicts=conflicts,
         )
 
         return result
+
+    def process_in_place(
+        self,
+        path: Union[str, Path],
+        output_path: Optional[Union[str, Path]] = None,
+        encoding: str = "utf-8",
+        window_size: Optional[int] = None,
+    ) -> DeidentificationResult:
+        """
+        原地脱敏文件：虚拟值与原文等长，直接改写 mmap 映射的文件，不重新拼接文本
+
+        需要 preserve_offsets=True 且 offset_unit="byte"。文件按窗口流式读取和识别（见 DeidentificationStream），
+        每个窗口只编码该窗口的原文并把替换值写回 mmap，峰值内存与窗口大小成正比，与文件大小无关。
+        替换值长度按窗口校验后再写入。
+
+        Args:
+            path: 输入文件
+            output_path: 输出文件（可选）。指定时先复制输入文件再改写副本，否则直接改写输入文件
+            encoding: 文件编码
+            window_size: 每个窗口的字符数（默认 streaming.DEFAULT_WINDOW_SIZE）
+
+        Returns:
+            DeidentificationResult: 脱敏结果（anonymized_text 为空字符串，脱敏文本已写入文件；
+            原文与脱敏后文本的字节偏移相同，实体位置表中为字符偏移）
+        """
+        if not self.config.preserve_offsets or self.config.offset_unit != "byte":
+            raise ValueError(
+                "process_in_place requires DeidentificationConfig.preserve_offsets=True with offset_unit='byte'"
+            )
+
+        target = Path(path)
+        if output_path is not None:
+            shutil.copyfile(path, output_path)
+            target = Path(output_path)
+
+        if target.stat().st_size == 0:
+            return DeidentificationResult(anonymized_text="", mapping={}, config=self.config)
+
+        # newline="" 保留原始换行符，字符与文件字节一一对应
+        with open(target, "r", encoding=encoding, newline="") as reader, open(target, "r+b") as f:
+            stream = self.process_stream(reader, window_size=window_size)
+            with mmap.mmap(f.fileno(), 0) as buffer:
+                position = 0
+                # 只改写已读过的窗口，读取端尚未读到的内容不受影响
+                for original, _, replacements in stream.windows():
+                    patch_in_place(
+                        buffer,
+                        (
+                            (position + start, position + end, value)
+                            for start, end, value in encode_replacements(original, replacements, encoding)
+                        ),
+                    )
+                    position += len(original.encode(encoding))
+                buffer.flush()
+        return stream.result
+
+    def process_stream(
+        self,
+        source,
+        window_size: Optional[int] = None,
+        overlap: Optional[int] = None,
+        verify_leaks: bool = False,
+    ):
+        """
+        流式脱敏：按窗口读取文本并逐块输出，峰值内存与窗口大小成正比
+
+        Args:
+            source: 字符串、文本文件对象或文本块迭代器
+            window_size: 每次输出的最大字符数（默认 streaming.DEFAULT_WINDOW_SIZE）
+            overlap: 窗口之后额外参与识别的字符数（默认 streaming.DEFAULT_OVERLAP）
+            verify_leaks: 是否逐块校验输出中的残留原始值
+
+        Returns:
+            DeidentificationStream: 迭代得到脱敏后的文本块，结束后 result 为完整结果
+        """
+        from contract_deid.core.streaming import DEFAULT_OVERLAP, DEFAULT_WINDOW_SIZE, DeidentificationStream
+
+        return DeidentificationStream(
+            self,
+            source,
+            window_size=window_size or DEFAULT_WINDOW_SIZE,
+            overlap=DEFAULT_OVERLAP if overlap is None else overlap,
+            verify_leaks=verify_leaks,
+        )
+
+    def process_records(self, records, batch_size: Optional[int] = None, read_ahead: Optional[int] = None):
+        """
+        按输入顺序惰性脱敏 (id, text) 记录，每批记录的 NER 合并推理，单条记录出错不中断
+
+        Args:
+            records: (id, text) 记录迭代器
+            batch_size: 每批合并推理的记录数（默认 record_iter.DEFAULT_BATCH_SIZE）
+            read_ahead: 后台预读的最大记录数（默认 record_iter.DEFAULT_READ_AHEAD）
+
+        Returns:
+            Iterator[RecordResult]: 与输入一一对应且顺序相同的结果
+        """
+        from contract_deid.core.record_iter import DEFAULT_BATCH_SIZE, DEFAULT_READ_AHEAD, deidentify_records
+
+        return deidentify_records(
+            self,
+            records,
+            batch_size=batch_size or DEFAULT_BATCH_SIZE,
+            read_ahead=read_ahead or DEFAULT_READ_AHEAD,
+        )
+
+    def analyze_resolved(self, text: str, known_entities: Optional[Dict[str, tuple]] = None) -> tuple:
+        """
+        识别并消解跨层重叠
+
+        Args:
+            text: 待分析文本
+            known_entities: 文本之外已识别的软实体，参与实体传播
+
+        Returns:
+            tuple: (互不重叠的识别结果, 本文档冲突消解计数)
+        """
+        return self._resolve(self.analyze(text, known_entities))
+
+    def _resolve(self, spans: List[Span]) -> tuple:
+        """消解跨层重叠，返回 (互不重叠的识别结果, 本次冲突消解计数)"""
+        resolved_before = Counter(self.conflict_resolver.stats.resolved)
+        analyzer_results = self.conflict_resolver.resolve(spans)
+        conflicts = dict(self.conflict_resolver.stats.resolved - resolved_before)
+        return analyzer_results, conflicts
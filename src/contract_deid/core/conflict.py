@@ -0,0 +1,247 @@
+"""
+跨层冲突消解（Conflict Resolution）
+
+规则层、NER 层和实体传播的结果会相互重叠：银行账号与身份证号、包含地名的组织机构、
+电话号码中被误识别的金额片段等。替换之前由本阶段显式消解，输出互不重叠的区间列表。
+
+消解规则：
+1. 同类型且相互重叠的区间合并为并集（如 NER 分窗边界处被切开的实体）
+2. 不同类型的重叠区间按 (类型优先级, 来源层优先级, 长度, 置信度) 排序依次接受；
+   与已接受区间部分重叠的文本类区间（组织机构、人名、地名等）裁剪为未被覆盖的部分
+   （丢弃整个区间会让重叠之外的文字原样泄漏），完全被覆盖的区间才丢弃
+3. 结构化标识（信用代码、身份证号、账号、电话、邮箱、金额）不裁剪成片段：严格包含所有与之重叠的
+   已接受区间时替换这些区间（如 19 位账号的前 18 位被识别为身份证号），否则整体丢弃
+
+按起始位置排序后一次扫描划分重叠簇，整体复杂度 O(n log n)。
+"""
+
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from contract_deid.core.span import Span
+
+# 默认实体类型优先级：格式严格、校验可靠的类型优先；金额最低（电话、账号中的数字片段常被误识别为金额）
+# 身份证号验证校验位，信用代码目前只验证格式，纯数字的 18 位身份证号也能匹配信用代码的格式
+DEFAULT_TYPE_PRIORITY: Dict[str, int] = {
+    "ID_CARD": 100,
+    "CREDIT_CODE": 90,
+    "BANK_ACCOUNT": 80,
+    "PHONE_NUMBER": 70,
+    "EMAIL": 70,
+    "ORGANIZATION": 60,
+    "PERSON": 50,
+    "LOCATION": 40,
+    "AMOUNT": 10,
+}
+
+# 默认来源层优先级：规则 > NER > 实体传播
+DEFAULT_LAYER_PRIORITY: Dict[str, int] = {
+    "rule": 3,
+    "ner": 2,
+    "propagation": 1,
+}
+
+# 结构化标识：裁剪后的片段既不是有效值也无法生成对应的虚拟值，只整体接受或丢弃
+STRUCTURED_TYPES = frozenset(
+    {"CREDIT_CODE", "ID_CARD", "BANK_ACCOUNT", "PHONE_NUMBER", "EMAIL", "AMOUNT"}
+)
+
+# 排序键各分量对应的消解方式名称
+_REASONS = ("type_priority", "layer_priority", "length", "score")
+
+
+@dataclass
+class ConflictStats:
+    """冲突消解统计信息"""
+
+    spans_in: int = 0
+    spans_out: int = 0
+    # 含有多个区间的重叠簇数量
+    clusters: int = 0
+    # 被丢弃、合并或裁剪的区间数，按消解方式计数：
+    # duplicate / merged / trimmed / contained / type_priority / layer_priority / length / score / position
+    resolved: Counter = field(default_factory=Counter)
+    # 被丢弃的区间按实体类型计数
+    dropped_types: Counter = field(default_factory=Counter)
+
+    @property
+    def conflicts(self) -> int:
+        """消解的冲突总数"""
+        return sum(self.resolved.values())
+
+    def summary(self) -> str:
+        """单行摘要"""
+        details = ", ".join(f"{reason}={count}" for reason, count in self.resolved.most_common())
+        return f"Conflicts: {self.conflicts} resolved in {self.clusters} clusters ({details or 'none'})"
+
+
+class ConflictResolver:
+    """
+    跨层冲突消解器
+
+    Example:
+        >>> resolver = ConflictResolver(type_priority={"ORGANIZATION": 95})
+        >>> spans = resolver.resolve(rule_spans + ner_spans)
+        >>> print(resolver.stats.summary())
+    """
+
+    def __init__(
+        self,
+        type_priority: Optional[Dict[str, int]] = None,
+        layer_priority: Optional[Dict[str, int]] = None,
+    ):
+        """
+        初始化消解器
+
+        Args:
+            type_priority: 实体类型优先级（覆盖默认值中的对应项），数值越大越优先
+            layer_priority: 来源层优先级（覆盖默认值中的对应项），数值越大越优先
+        """
+        self.type_priority = {**DEFAULT_TYPE_PRIORITY, **(type_priority or {})}
+        self.layer_priority = {**DEFAULT_LAYER_PRIORITY, **(layer_priority or {})}
+        self.stats = ConflictStats()
+
+    def rank(self, span: Span) -> Tuple[int, int, int, float]:
+        """
+        区间的排序键
+
+        Args:
+            span: 区间
+
+        Returns:
+            (类型优先级, 来源层优先级, 长度, 置信度)
+        """
+        return (
+            self.type_priority.get(span.entity_type, 0),
+            self.layer_priority.get(span.layer, 0),
+            span.end - span.start,
+            span.score,
+        )
+
+    def resolve(self, spans: List[Span]) -> List[Span]:
+        """
+        消解重叠，返回按起始位置排序、互不重叠的区间列表
+
+        Args:
+            spans: 各层识别结果
+
+        Returns:
+            互不重叠的区间列表
+        """
+        self.stats.spans_in += len(spans)
+        resolved: List[Span] = []
+        cluster: List[Span] = []
+        cluster_end = -1
+        for span in sorted(spans, key=lambda s: (s.start, -s.end)):
+            if span.end <= span.start:
+                continue
+            if cluster and span.start >= cluster_end:
+                resolved.extend(self._resolve_cluster(cluster))
+                cluster = []
+            cluster.append(span)
+            cluster_end = max(cluster_end, span.end) if len(cluster) > 1 else span.end
+        if cluster:
+            resolved.extend(self._resolve_cluster(cluster))
+
+        self.stats.spans_out += len(resolved)
+        return resolved
+
+    def _resolve_cluster(self, cluster: List[Span]) -> List[Span]:
+        """消解一个重叠簇（簇内区间已按起始位置排序）"""
+        if len(cluster) == 1:
+            return cluster
+        self.stats.clusters += 1
+
+        # 1. 去重并合并同类型的重叠区间
+        merged: List[Span] = []
+        open_by_type: Dict[str, Span] = {}
+        for span in cluster:
+            current = open_by_type.get(span.entity_type)
+            if current is None or span.start >= current.end:
+                open_by_type[span.entity_type] = span
+                merged.append(span)
+                continue
+            if span.start == current.start and span.end == current.end:
+                self.stats.resolved["duplicate"] += 1
+                if self.rank(span) > self.rank(current):
+                    current.score, current.layer = span.score, span.layer
+                continue
+            self.stats.resolved["merged"] += 1
+            current.end = max(current.end, span.end)
+            current.score = max(current.score, span.score)
+            if self.layer_priority.get(span.layer, 0) > self.layer_priority.get(current.layer, 0):
+                current.layer = span.layer
+
+        # 2. 不同类型的重叠按优先级依次接受；部分重叠的文本类区间裁剪为未被覆盖的部分，
+        #    结构化标识严格包含所有重叠区间时替换它们，否则整体丢弃
+        accepted_starts: List[int] = []
+        accepted: List[Span] = []
+        for span in sorted(merged, key=self.rank, reverse=True):
+            index = bisect_left(accepted_starts, span.start)
+            if index > 0 and accepted[index - 1].end > span.start:
+                index -= 1
+            blockers = []
+            while index + len(blockers) < len(accepted) and accepted[index + len(blockers)].start < span.end:
+                blockers.append(accepted[index + len(blockers)])
+
+            if span.entity_type in STRUCTURED_TYPES and blockers:
+                length = span.end - span.start
+                if (
+                    span.start <= blockers[0].start
+                    and blockers[-1].end <= span.end
+                    and all(blocker.end - blocker.start < length for blocker in blockers)
+                ):
+                    for blocker in blockers:
+                        self.stats.resolved["contained"] += 1
+                        self.stats.dropped_types[blocker.entity_type] += 1
+                    del accepted_starts[index : index + len(blockers)]
+                    del accepted[index : index + len(blockers)]
+                    pieces = [span]
+                else:
+                    pieces = []
+            else:
+                pieces = self._uncovered(span, blockers)
+            if not pieces:
+                self.stats.resolved[self._reason(blockers[0], span)] += 1
+                self.stats.dropped_types[span.entity_type] += 1
+                continue
+            if blockers and pieces[0] is not span:
+                self.stats.resolved["trimmed"] += 1
+            for piece in pieces:
+                position = bisect_left(accepted_starts, piece.start)
+                accepted_starts.insert(position, piece.start)
+                accepted.insert(position, piece)
+        return accepted
+
+    @staticmethod
+    def _uncovered(span: Span, blockers: List[Span]) -> List[Span]:
+        """
+        区间中未被已接受区间覆盖的部分
+
+        Args:
+            span: 待接受的区间
+            blockers: 与之重叠的已接受区间（按起始位置排序，互不重叠）
+
+        Returns:
+            未被覆盖的片段；没有重叠时为区间本身
+        """
+        if not blockers:
+            return [span]
+        pieces = []
+        cursor = span.start
+        for blocker in blockers:
+            if blocker.start > cursor:
+                pieces.append(Span(span.entity_type, cursor, blocker.start, span.score, span.layer))
+            cursor = max(cursor, blocker.end)
+        if cursor < span.end:
+            pieces.append(Span(span.entity_type, cursor, span.end, span.score, span.layer))
+        return pieces
+
+    def _reason(self, winner: Span, loser: Span) -> str:
+        """胜出区间与被丢弃区间第一个不同的排序分量即消解方式"""
+        for reason, won, lost in zip(_REASONS, self.rank(winner), self.rank(loser)):
+            if won != lost:
+                return reason
+        return "position"
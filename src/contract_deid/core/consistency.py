@@ -5,15 +5,21 @@
 确保同一实体在整个文档中始终映射到同一个虚拟值。
 """
 
-from typing import Dict, List
-from presidio_analyzer import RecognizerResult
-from presidio_anonymizer import AnonymizerEngine
-from presidio_anonymizer.entities import OperatorConfig
+import random
+from typing import Callable, Dict, List, Optional, Tuple
 
+from contract_deid.anonymizers.amount_rewriter import AmountRewriter
 from contract_deid.anonymizers.faker_provider import FakerProvider
 from contract_deid.anonymizers.entity_library import EntityLibrary
+from contract_deid.anonymizers.length_fitter import LengthFitter
+from contract_deid.core.span import Span
 from contract_deid.utils.location_mapper import LocationMapper
 from contract_deid.utils.mapping_export import DeidentificationConfig
+from contract_deid.utils.span_table import SpanTable
+
+# 保持偏移模式下寻找使全部金额都能等长改写的噪声系数：先在配置范围内抽样，再逐级放宽范围
+_AMOUNT_FACTOR_ATTEMPTS = 16
+_AMOUNT_RANGE_WIDENING = (1, 2, 5)
 
 
 class ConsistencyProvider:
@@ -32,47 +38,116 @@ class ConsistencyProvider:
         self.entity_library = EntityLibrary()
         self.location_mapper = LocationMapper()
 
-        # 初始化 Presidio Anonymizer
-        self.anonymizer = AnonymizerEngine()
+        # 当前文档的金额改写器（由 anonymize 按噪声系数创建）
+        self.amount_rewriter: Optional[AmountRewriter] = None
+        # 保持偏移模式下的等长替换器（按需创建）
+        self.length_fitter: Optional[LengthFitter] = None
 
     def anonymize(
         self,
         text: str,
-        analyzer_results: List[RecognizerResult],
+        analyzer_results: List[Span],
         config: DeidentificationConfig,
-    ) -> tuple[str, Dict[str, Dict[str, str]]]:
+        amount_noise_factor: Optional[float] = None,
+    ) -> tuple[str, Dict[str, Dict[str, str]], SpanTable]:
         """
         使用一致性映射进行匿名化
 
+        识别结果按位置排序后一次拼接完成替换，同时记录每处替换在原文和输出中的坐标。
+
         Args:
             text: 原始文本
             analyzer_results: 识别结果列表
             config: 脱敏配置
+            amount_noise_factor: 金额噪声系数（通常取自 AmountRecognizer），为 None 时按配置范围随机生成
 
         Returns:
-            tuple: (匿名化后的文本, 映射表字典)
+            tuple: (匿名化后的文本, 映射表字典, 实体位置表)
+        """
+        spans = SpanTable()
+        pieces = []
+        last = 0
+        length = 0
+        for result, anonymized in self.plan_replacements(text, analyzer_results, config, amount_noise_factor):
+            pieces.append(text[last : result.start])
+            length += result.start - last
+            pieces.append(anonymized)
+            spans.append(
+                result.entity_type, text[result.start : result.end], result.start, result.end,
+                length, length + len(anonymized), result.score, result.layer,
+            )
+            length += len(anonymized)
+            last = result.end
+        pieces.append(text[last:])
+
+        return "".join(pieces), self.mapping, spans
+
+    def plan_replacements(
+        self,
+        text: str,
+        analyzer_results: List[Span],
+        config: DeidentificationConfig,
+        amount_noise_factor: Optional[float] = None,
+    ) -> List[Tuple[Span, str]]:
         """
-        # 构建自定义操作符字典
-        operators = {}
+        计算每处替换的虚拟值（不拼接文本），供 anonymize 和原地改写复用
+
+        输入应已由 ConflictResolver 消解重叠；残留的重叠结果只保留起始位置最靠前的一个。
+        文档中的全部金额在替换前一次性按同一噪声系数改写，保持比例关系和书写格式；
+        保持偏移模式下改用使全部金额都不超过原文长度的噪声系数（见 _fit_amounts）。
+
+        Args:
+            text: 原始文本
+            analyzer_results: 识别结果列表
+            config: 脱敏配置
+            amount_noise_factor: 金额噪声系数，为 None 时按配置范围随机生成
 
-        for entity_type in set(r.entity_type for r in analyzer_results):
-            operators[entity_type] = OperatorConfig(
-                "custom",
-                {
-                    "lambda": lambda x, et=entity_type: self._get_consistent_value(
-                        x.entity_text, et, config
+        Returns:
+            按位置排序、互不重叠的 [(识别结果, 虚拟值)]
+        """
+        if amount_noise_factor is None:
+            amount_noise_factor = random.uniform(*config.amount_noise_range)
+        self.amount_rewriter = AmountRewriter(amount_noise_factor)
+        amounts = [
+            text[result.start : result.end] for result in analyzer_results if result.entity_type == "AMOUNT"
+        ]
+        if amounts:
+            amount_mapping = self.mapping.setdefault("AMOUNT", {})
+            if config.preserve_offsets:
+                rewritten_amounts = self._fit_amounts(amounts, amount_noise_factor, config)
+            else:
+                rewritten_amounts = self.amount_rewriter.rewrite(amounts)
+            for original, rewritten in rewritten_amounts.items():
+                if original not in amount_mapping:
+                    amount_mapping[original] = self._fit_length(
+                        original, "AMOUNT", config, lambda: rewritten, first=rewritten
                     )
-                },
-            )
 
-        # 执行匿名化
-        anonymized_result = self.anonymizer.anonymize(
-            text=text,
-            analyzer_results=analyzer_results,
-            operators=operators,
-        )
+        replacements = []
+        last = 0
+        for result in sorted(analyzer_results, key=lambda r: (r.start, -r.end, -r.score)):
+            if result.start < last or result.end <= result.start:
+                continue
+            original = text[result.start : result.end]
+            replacements.append((result, self._get_consistent_value(original, result.entity_type, config)))
+            last = result.end
+        return replacements
+
+    def get_value(
+        self, original_value: str, entity_type: str, config: DeidentificationConfig
+    ) -> str:
+        """
+        获取一致性映射值（不存在时生成并记录），供第四层润色复用
+
+        Args:
+            original_value: 原始值
+            entity_type: 实体类型
+            config: 脱敏配置
 
-        return anonymized_result.text, self.mapping
+        Returns:
+            映射后的值
+        """
+        return self._get_consistent_value(original_value, entity_type, config)
 
     def _get_consistent_value(
         self, original_value: str, entity_type: str, config: DeidentificationConfig
@@ -96,9 +171,12 @@ class ConsistencyProvider:
         if original_value in self.mapping[entity_type]:
             return self.mapping[entity_type][original_value]
 
-        # 生成新的映射值
-        anonymized_value = self._generate_anonymized_value(
-            original_value, entity_type, config
+        # 生成新的映射值（保持偏移模式下与原文等长）
+        anonymized_value = self._fit_length(
+            original_value,
+            entity_type,
+            config,
+            lambda: self._generate_anonymized_value(original_value, entity_type, config),
         )
 
         # 保存映射
@@ -106,6 +184,94 @@ class ConsistencyProvider:
 
         return anonymized_value
 
+    def _fit_length(
+        self,
+        original_value: str,
+        entity_type: str,
+        config: DeidentificationConfig,
+        generate: Callable[[], str],
+        first: Optional[str] = None,
+    ) -> str:
+        """
+        保持偏移模式下生成与原文等长的虚拟值，否则直接生成
+
+        Args:
+            original_value: 原始值
+            entity_type: 实体类型
+            config: 脱敏配置
+            generate: 候选值生成函数
+            first: 已生成的候选值
+
+        Returns:
+            虚拟值
+        """
+        if not config.preserve_offsets:
+            return generate() if first is None else first
+        return self._get_length_fitter(config).fit(original_value, entity_type, generate, first=first)
+
+    def _get_length_fitter(self, config: DeidentificationConfig) -> LengthFitter:
+        """按配置的长度单位获取等长替换器"""
+        if self.length_fitter is None or self.length_fitter.unit != config.offset_unit:
+            self.length_fitter = LengthFitter(config.offset_unit)
+        return self.length_fitter
+
+    def _fit_amounts(
+        self, amounts: List[str], amount_noise_factor: float, config: DeidentificationConfig
+    ) -> Dict[str, str]:
+        """
+        保持偏移模式下按比例改写金额，改写结果都不超过原文长度（之后补齐）
+
+        中文大写金额的长度随数值变化，如 "壹佰万元整" 乘以 1.05 得到 "壹佰零伍万元整"，取整放粗也只能
+        回到原值，所以从给定的噪声系数起依次尝试其他系数，必要时超出配置范围；所有金额共用最终选定的系数，
+        比例关系与大小写对应保持不变。取整最粗的金额决定了实际比例时，再按该比例重新改写一次。
+
+        Args:
+            amounts: 文档中的全部金额
+            amount_noise_factor: 首先尝试的噪声系数
+            config: 脱敏配置
+
+        Returns:
+            {原文: 改写后的文本}；所有系数下都无法容纳的金额不在其中，由等长替换器按形状替换
+        """
+        fits = self._get_length_fitter(config).fits
+        parseable = sum(self.amount_rewriter.parse(original) is not None for original in dict.fromkeys(amounts))
+        best: Dict[str, str] = {}
+        for factor in self._amount_factors(amount_noise_factor, config.amount_noise_range):
+            rewriter = AmountRewriter(factor)
+            rewritten = rewriter.rewrite(amounts, fits=fits)
+            if len(rewritten) == parseable:
+                actual = self._actual_factor(rewriter, rewritten)
+                if actual != rewriter.noise_factor:
+                    refined = AmountRewriter(actual)
+                    again = refined.rewrite(amounts, fits=fits)
+                    if len(again) == parseable:
+                        rewriter, rewritten = refined, again
+            if len(rewritten) > len(best) or not best:
+                best = rewritten
+                self.amount_rewriter = rewriter
+            if len(best) == parseable:
+                break
+        return best
+
+    @staticmethod
+    def _amount_factors(first: float, noise_range: Tuple[float, float]):
+        """依次产生待尝试的噪声系数：给定值、配置范围内的随机值、逐级放宽范围的随机值"""
+        yield first
+        low, high = noise_range
+        for widening in _AMOUNT_RANGE_WIDENING:
+            for _ in range(_AMOUNT_FACTOR_ATTEMPTS):
+                yield random.uniform(low / widening, high * widening)
+
+    @staticmethod
+    def _actual_factor(rewriter: AmountRewriter, rewritten: Dict[str, str]):
+        """改写结果中偏离噪声系数最多的实际比例（取整最粗的金额）"""
+        ratios = []
+        for original, text in rewritten.items():
+            value = rewriter.parse(original)[0]
+            if value:
+                ratios.append(rewriter.parse(text)[0] / value)
+        return max(ratios, key=lambda ratio: abs(ratio - rewriter.noise_factor), default=rewriter.noise_factor)
+
     def _generate_anonymized_value(
         self, original_value: str, entity_type: str, config: DeidentificationConfig
     ) -> str:
@@ -151,13 +317,27 @@ class ConsistencyProvider:
             return self.faker_provider.generate_bank_account()
 
         elif entity_type == "AMOUNT":
-            # 金额处理在 AmountRecognizer 中完成，这里直接返回
-            return original_value
+            # 文档中的金额通常已在 anonymize 中批量改写，这里处理零散补充的金额（如第四层发现的遗漏）
+            if self.amount_rewriter is None:
+                self.amount_rewriter = AmountRewriter(random.uniform(*config.amount_noise_range))
+            # 保持偏移模式下无法容纳时返回原文，由等长替换器按形状替换
+            fits = self._get_length_fitter(config).fits if config.preserve_offsets else None
+            return self.amount_rewriter.rewrite([original_value], fits=fits).get(original_value, original_value)
 
         else:
             # 默认使用 Faker 生成
             return self.faker_provider.generate_default(original_value)
 
+    def reseed(self):
+        """
+        重新播种 Faker 生成器
+
+        从快照恢复或 fork 出的副本带有相同的随机状态，会在各进程中生成相同的虚拟值序列。
+        """
+        for fake in (self.faker_provider.fake, self.location_mapper.fake):
+            fake.seed_instance(random.getrandbits(64))
+
     def clear(self):
         """清空映射表（处理完一份合同后调用）"""
-        self.mapping.clear()
+        # 重新绑定而不是原地清空：已返回的 DeidentificationResult 仍持有上一份合同的映射表
+        self.mapping = {}
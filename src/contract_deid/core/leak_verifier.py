@@ -0,0 +1,170 @@
+"""
+泄漏校验（Leak Verification）
+
+脱敏完成后确认原始值没有以任何形式残留在输出文本中。
+逐个实体在全文中查找的代价是 O(实体数 × 文本长度)；校验器把映射表中的所有原始值
+（及其规范化变体）编译为 Aho-Corasick 自动机，对输出文本只做一次线性扫描。
+
+检查的形式：
+- 原始值本身
+- 组织机构的核心字号（去掉地区括注和"有限公司"等后缀，如"腾讯科技"）
+- 数字类实体去掉分隔符后的数字串，在输出文本的数字投影上匹配
+  （可以发现 "138 0013 8000" 这类改变了格式的残留）
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from contract_deid.utils.aho_corasick import AhoCorasick
+
+# 组织机构后缀（按长度从长到短尝试）
+ORGANIZATION_SUFFIXES = (
+    "股份有限公司", "有限责任公司", "有限公司", "集团公司", "集团", "公司",
+)
+
+# 地区括注，如 "（深圳）"、"(北京)"
+_REGION_NOTE = re.compile(r"[（(][^）)]{1,8}[）)]")
+
+# 数字类变体的最小长度，过短的数字串（如年份）误报太多
+MIN_DIGIT_LENGTH = 6
+
+
+@dataclass
+class LeakHit:
+    """一处残留"""
+
+    entity_type: str
+    original: str
+    matched: str
+    start: int
+    end: int
+
+
+@dataclass
+class LeakReport:
+    """泄漏校验报告"""
+
+    hits: List[LeakHit] = field(default_factory=list)
+    checked_values: int = 0
+
+    @property
+    def leaked(self) -> bool:
+        """是否存在残留"""
+        return bool(self.hits)
+
+    def summary(self) -> str:
+        """单行摘要"""
+        if not self.hits:
+            return f"Leak check passed ({self.checked_values} values)"
+        return f"Leak check found {len(self.hits)} residual hits ({self.checked_values} values)"
+
+
+def organization_core(name: str) -> str:
+    """
+    提取组织机构的核心字号
+
+    Args:
+        name: 组织机构全称
+
+    Returns:
+        去掉地区括注和公司后缀后的名称
+    """
+    core = _REGION_NOTE.sub("", name)
+    for suffix in ORGANIZATION_SUFFIXES:
+        if core.endswith(suffix):
+            return core[: -len(suffix)]
+    return core
+
+
+def _digits(value: str) -> str:
+    return "".join(ch for ch in value if ch.isdigit())
+
+
+class LeakVerifier:
+    """
+    泄漏校验器
+
+    Example:
+        >>> report = LeakVerifier().verify(result.anonymized_text, result.mapping)
+        >>> for hit in report.hits:
+        ...     print(hit.entity_type, hit.matched, hit.start)
+    """
+
+    def __init__(self, min_length: int = 2, skip_unchanged: bool = True):
+        """
+        初始化校验器
+
+        Args:
+            min_length: 参与校验的表面形式最小长度
+            skip_unchanged: 跳过原始值与替换值相同的条目（如按设计保留的金额）
+        """
+        self.min_length = min_length
+        self.skip_unchanged = skip_unchanged
+
+    def _variants(self, mapping: Dict[str, Dict[str, str]]) -> Tuple[Dict[str, Tuple[str, str]], Dict[str, Tuple[str, str]]]:
+        """
+        收集所有需要检查的表面形式
+
+        Returns:
+            (文本变体 {surface: (entity_type, original)}, 数字变体 {digits: (entity_type, original)})
+        """
+        surfaces: Dict[str, Tuple[str, str]] = {}
+        digits: Dict[str, Tuple[str, str]] = {}
+        for entity_type, values in mapping.items():
+            for original, anonymized in values.items():
+                if not original or (self.skip_unchanged and original == anonymized):
+                    continue
+                candidates = [original.strip()]
+                if entity_type == "ORGANIZATION":
+                    candidates.append(organization_core(original.strip()))
+                for candidate in candidates:
+                    # 虚拟值中本身包含的片段不视为泄漏
+                    if len(candidate) >= self.min_length and candidate not in anonymized:
+                        surfaces.setdefault(candidate, (entity_type, original))
+
+                number = _digits(original)
+                if len(number) >= MIN_DIGIT_LENGTH and number not in _digits(anonymized):
+                    digits.setdefault(number, (entity_type, original))
+        return surfaces, digits
+
+    def verify(self, text: str, mapping: Dict[str, Dict[str, str]]) -> LeakReport:
+        """
+        扫描输出文本中的残留原始值
+
+        Args:
+            text: 脱敏后的文本
+            mapping: 映射表 {entity_type: {original: anonymized}}
+
+        Returns:
+            LeakReport
+        """
+        surfaces, digits = self._variants(mapping)
+        report = LeakReport(checked_values=sum(len(values) for values in mapping.values()))
+
+        if surfaces:
+            patterns = list(surfaces)
+            automaton = AhoCorasick.build(patterns)
+            for start, end, pattern_id in automaton.longest_matches(text):
+                entity_type, original = surfaces[patterns[pattern_id]]
+                report.hits.append(LeakHit(entity_type, original, text[start:end], start, end))
+
+        if digits:
+            # 在输出文本的数字投影上匹配，再映射回原文偏移
+            positions = [i for i, ch in enumerate(text) if ch.isdigit()]
+            projection = "".join(text[i] for i in positions)
+            patterns = list(digits)
+            automaton = AhoCorasick.build(patterns)
+            covered = bytearray(len(text))
+            for hit in report.hits:
+                covered[hit.start : hit.end] = b"\x01" * (hit.end - hit.start)
+            for start, end, pattern_id in automaton.longest_matches(projection):
+                span = (positions[start], positions[end - 1] + 1)
+                # 数字之间只允许夹杂少量分隔符，避免跨越不相关的数字拼出误报
+                if covered.find(1, *span) != -1 or span[1] - span[0] > 2 * (end - start):
+                    continue
+                entity_type, original = digits[patterns[pattern_id]]
+                report.hits.append(LeakHit(entity_type, original, text[span[0]:span[1]], *span))
+
+        report.hits.sort(key=lambda hit: hit.start)
+        return report
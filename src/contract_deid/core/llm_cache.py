@@ -0,0 +1,327 @@
+"""
+LLM 响应缓存
+
+LLM 调用是整个流程中最昂贵的操作，而合同中的样板条款会在不同文档间产生完全相同的提示词。
+响应缓存以 (模型标识, 提示词模板版本, 输入哈希) 为键持久化到本地 SQLite 文件，
+支持过期时间（TTL）和按最近访问时间淘汰的容量上限，由 LLMNERAdapter 和 LLMRefiner 共享。
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+@dataclass
+class CacheStats:
+    """缓存统计信息"""
+
+    hits: int = 0
+    misses: int = 0
+    # 命中时节省的 LLM 调用耗时（按写入缓存时记录的耗时计算）
+    seconds_saved: float = 0.0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """命中率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        """单行摘要，用于运行结束时的汇总输出"""
+        return (
+            f"LLM cache: {self.hits} hits, {self.misses} misses "
+            f"({self.hit_rate:.0%} hit rate), {self.seconds_saved:.1f}s saved"
+        )
+
+
+class LLMResponseCache:
+    """
+    LLM 响应缓存（SQLite 持久化，线程安全）
+
+    Example:
+        >>> cache = get_shared_cache("~/.cache/contract-deid/llm.sqlite")
+        >>> response = cache.get_or_call("qwen-7b", "ner-v1", prompt, lambda: llm(prompt))
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: Optional[float] = None,
+        max_entries: int = 10000,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite 文件路径
+            ttl_seconds: 条目过期时间（秒），为 None 时永不过期
+            max_entries: 最大条目数，超出时淘汰最久未访问的条目
+        """
+        self.path = str(Path(path).expanduser())
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._count = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """数据库连接（懒加载；fork 后的子进程会重新连接）"""
+        if self._connection is None or self._pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_SCHEMA)
+            connection.commit()
+            self._connection = connection
+            self._pid = os.getpid()
+            self._count = connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return self._connection
+
+    @staticmethod
+    def make_key(model: str, template_version: str, payload: str) -> str:
+        """
+        计算缓存键
+
+        Args:
+            model: 模型标识（名称或路径）
+            template_version: 提示词模板版本，模板变化时应更新
+            payload: 变化的输入部分（分块文本等）
+
+        Returns:
+            十六进制哈希
+        """
+        payload_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{model}\0{template_version}\0{payload_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """
+        查询缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            (response, 原始调用耗时)；未命中或已过期时返回 None
+        """
+        now = time.time()
+        with self._lock:
+            connection = self.connection
+            row = connection.execute(
+                "SELECT response, seconds, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, seconds, created = row
+            if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                connection.commit()
+                self._count -= 1
+                return None
+            connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            connection.commit()
+            return response, seconds
+
+    def put(self, key: str, response: str, seconds: float = 0.0):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            response: LLM 响应
+            seconds: 本次调用耗时，用于统计命中时节省的时间
+        """
+        now = time.time()
+        with self._lock:
+            connection = self.connection
+            exists = connection.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, seconds, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, seconds, now, now),
+            )
+            # 覆盖已有条目不增加条目数
+            if exists is None:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict(connection)
+            connection.commit()
+
+    def _evict(self, connection: sqlite3.Connection):
+        """淘汰过期条目和最久未访问的条目，直到不超过容量上限"""
+        if self.ttl_seconds is not None:
+            cursor = connection.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,)
+            )
+            self.stats.evictions += max(cursor.rowcount, 0)
+        self._count = connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = self._count - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (excess,),
+            )
+            self.stats.evictions += excess
+            self._count = self.max_entries
+
+    def get_or_call(
+        self,
+        model: str,
+        template_version: str,
+        payload: str,
+        call: Callable[[], str],
+    ) -> str:
+        """
+        命中时直接返回缓存的响应，否则调用 LLM 并写入缓存
+
+        Args:
+            model: 模型标识
+            template_version: 提示词模板版本
+            payload: 变化的输入部分
+            call: 未命中时执行的 LLM 调用
+
+        Returns:
+            LLM 响应
+        """
+        key = self.make_key(model, template_version, payload)
+        cached = self.get(key)
+        if cached is not None:
+            self.stats.hits += 1
+            self.stats.seconds_saved += cached[1]
+            return cached[0]
+
+        self.stats.misses += 1
+        started = time.perf_counter()
+        response = call()
+        self.put(key, response, time.perf_counter() - started)
+        return response
+
+    def get_or_call_batch(
+        self,
+        model: str,
+        template_version: str,
+        payloads: List[str],
+        call_batch: Callable[[List[str]], List[str]],
+    ) -> List[str]:
+        """
+        批量版本的 get_or_call：未命中的输入合并为一次批量调用
+
+        Args:
+            model: 模型标识
+            template_version: 提示词模板版本
+            payloads: 变化的输入部分列表
+            call_batch: 对未命中输入执行的批量 LLM 调用
+
+        Returns:
+            与输入一一对应的 LLM 响应
+        """
+        keys = [self.make_key(model, template_version, payload) for payload in payloads]
+        responses: List[Optional[str]] = [None] * len(payloads)
+        missing = []
+        for index, key in enumerate(keys):
+            cached = self.get(key)
+            if cached is None:
+                missing.append(index)
+            else:
+                self.stats.hits += 1
+                self.stats.seconds_saved += cached[1]
+                responses[index] = cached[0]
+
+        if missing:
+            self.stats.misses += len(missing)
+            started = time.perf_counter()
+            generated = call_batch([payloads[index] for index in missing])
+            # 批量调用的耗时平摊到每条输入
+            seconds = (time.perf_counter() - started) / len(missing)
+            for index, response in zip(missing, generated):
+                self.put(keys[index], response, seconds)
+                responses[index] = response
+        return responses
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self.connection.execute("DELETE FROM responses")
+            self.connection.commit()
+            self._count = 0
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+    def __reduce__(self):
+        """序列化时只保留参数，恢复时复用同一路径的共享实例（如引擎快照）"""
+        return (get_shared_cache, (self.path, self.ttl_seconds, self.max_entries))
+
+
+# 按路径共享的缓存实例，使 NER 适配器与润色器共用同一份统计
+_SHARED_CACHES: Dict[str, LLMResponseCache] = {}
+_SHARED_LOCK = threading.Lock()
+
+# 未指定参数的标记（ttl_seconds=None 本身表示永不过期）
+_UNSET: Any = object()
+
+
+def get_shared_cache(
+    path: str,
+    ttl_seconds: Optional[float] = _UNSET,
+    max_entries: int = _UNSET,
+) -> LLMResponseCache:
+    """
+    获取指定路径的共享缓存实例
+
+    未指定的参数在首次创建时取默认值（永不过期、10000 条），之后沿用已有实例的设置。
+
+    Args:
+        path: SQLite 文件路径
+        ttl_seconds: 条目过期时间（秒）
+        max_entries: 最大条目数
+
+    Returns:
+        LLMResponseCache 实例（同一路径返回同一实例）
+
+    Raises:
+        ValueError: 显式指定的参数与该路径已有实例的设置不一致
+    """
+    resolved = str(Path(path).expanduser().resolve())
+    with _SHARED_LOCK:
+        cache = _SHARED_CACHES.get(resolved)
+        if cache is None:
+            cache = LLMResponseCache(
+                resolved,
+                ttl_seconds=None if ttl_seconds is _UNSET else ttl_seconds,
+                max_entries=10000 if max_entries is _UNSET else max_entries,
+            )
+            _SHARED_CACHES[resolved] = cache
+            return cache
+
+        requested = {"ttl_seconds": ttl_seconds, "max_entries": max_entries}
+        for name, value in requested.items():
+            if value is not _UNSET and value != getattr(cache, name):
+                raise ValueError(
+                    f"LLM cache {resolved} is already open with {name}={getattr(cache, name)!r}, "
+                    f"got {name}={value!r}"
+                )
+        return cache
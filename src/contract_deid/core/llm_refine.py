@@ -2,9 +2,83 @@
 第四层：大模型"润色"与逻辑修复（LLM Refinement）
 
 利用本地部署的 Teacher 模型做最后的兜底，处理前三层可能遗漏的实体。
+
+把整份合同和完整映射表交给模型代价过高。润色器先用残留风险规则逐段预扫描
+（拉丁字母人名、"某某"写法、姓氏 + 称谓、未脱敏的组织机构后缀），
+只把命中的段落连同与该段相关的映射条目送入模型。
+
+默认的 edits 模式只让模型返回 (原文 -> 替换值) 编辑列表，输出长度与文档长度无关，
+也不会意外改写其他内容；编辑经校验后复用一致性映射，一次扫描应用到全文。
+text 模式保留逐段重写的方式，用于对比。
 """
 
-from typing import Dict, Optional
+import importlib
+import json
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Literal, Optional, Tuple
+
+from contract_deid.config import NERConfig
+from contract_deid.core.llm_cache import LLMResponseCache
+from contract_deid.utils.aho_corasick import AhoCorasick
+
+# 常见姓氏（用于"姓氏 + 称谓"规则）
+COMMON_SURNAMES = (
+    "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程"
+    "苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝"
+    "龚邵万钱严覃武戴莫孔向汤"
+)
+
+# 残留风险规则：前三层处理后仍可能泄漏的写法
+RISK_PATTERNS: Dict[str, re.Pattern] = {
+    # 拉丁字母人名或外文公司名，如 "John Smith"、"Acme Holdings"
+    "LATIN_NAME": re.compile(r"\b[A-Z][a-zA-Z]+(?:[ \-][A-Z][a-zA-Z]+)+\b"),
+    # "某某"写法，如 "王某某"、"某某公司"
+    "MOUMOU": re.compile(r"[一-龥]?某某[一-龥]{0,4}"),
+    # 姓氏 + 称谓，如 "张先生"、"李经理"、"王总"
+    "TITLE_SURNAME": re.compile(
+        rf"[{COMMON_SURNAMES}](?:先生|女士|小姐|总经理|经理|董事长|总监|律师|老师|主任|总)"
+    ),
+    # 未脱敏的组织机构后缀
+    "ORG_SUFFIX": re.compile(
+        r"[一-龥A-Za-z0-9（）()]{2,30}?(?:有限责任公司|股份有限公司|有限公司|集团|事务所|研究院|合作社)"
+    ),
+}
+
+# 段落分隔符
+PARAGRAPH_SEPARATOR = "\n"
+
+# 编辑列表中的实体类型
+ENTITY_TYPE_MAPPING = {
+    "组织机构": "ORGANIZATION",
+    "人名": "PERSON",
+    "地点": "LOCATION",
+    "ORGANIZATION": "ORGANIZATION",
+    "PERSON": "PERSON",
+    "LOCATION": "LOCATION",
+}
+
+
+@dataclass
+class RefineStats:
+    """润色统计信息"""
+
+    documents: int = 0
+    paragraphs: int = 0
+    flagged_paragraphs: int = 0
+    total_chars: int = 0
+    sent_chars: int = 0
+    rejected: int = 0
+    applied_edits: int = 0
+    # 模型输出字符数（近似输出 token 数）与润色总耗时
+    output_chars: int = 0
+    seconds: float = 0.0
+
+    @property
+    def sent_ratio(self) -> float:
+        """送入模型的字符占比"""
+        return self.sent_chars / self.total_chars if self.total_chars else 0.0
 
 
 class LLMRefiner:
@@ -12,35 +86,188 @@ class LLMRefiner:
     LLM 润色器：使用本地部署的模型进行最终检查和修复
     """
 
-    def __init__(self, model_path: Optional[str] = None):
+    # 提示词模板版本，修改 _build_prompt 时需要更新（使缓存失效）
+    PROMPT_VERSION = "refine-v2"
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        cache: Optional[LLMResponseCache] = None,
+        backend: Optional[Callable[[str, str], str]] = None,
+        risk_patterns: Optional[Dict[str, re.Pattern]] = None,
+        max_new_tokens: int = 1024,
+        mode: Literal["edits", "text"] = "edits",
+    ):
         """
         初始化 LLM 润色器
 
         Args:
             model_path: 本地模型路径，如果为 None 则使用默认模型
+            cache: LLM 响应缓存（可选），与 LLMNERAdapter 共享
+            backend: 模型调用函数，签名：callable(paragraph: str, prompt: str) -> str
+                     为 None 时从环境变量 LLM_CALL_FUNC_MODULE 加载，或使用本地 transformers 模型
+            risk_patterns: 残留风险规则，默认使用 RISK_PATTERNS
+            max_new_tokens: 本地 transformers 后端每段生成的最大 token 数
+            mode: 输出模式，"edits"（编辑列表，默认）或 "text"（逐段重写）
         """
+        if mode not in ("edits", "text"):
+            raise ValueError(f"Unknown refinement mode: {mode}")
+        # 在构造时报告配置缺失：逐段调用时的异常会被捕获，润色器会静默地什么都不做
+        if backend is None and not model_path and not NERConfig.get_llm_call_func_module():
+            raise ValueError(
+                "No LLM refinement backend configured. "
+                "Please provide backend, set LLM_CALL_FUNC_MODULE or llm_model_path."
+            )
         self.model_path = model_path
-        self._model = None
+        self.cache = cache
+        self.risk_patterns = risk_patterns if risk_patterns is not None else RISK_PATTERNS
+        self.max_new_tokens = max_new_tokens
+        self.mode = mode
+        self.stats = RefineStats()
+        self._model = backend
 
     @property
-    def model(self):
-        """懒加载模型"""
+    def model(self) -> Callable[[str, str], str]:
+        """懒加载模型调用函数"""
         if self._model is None:
-            # TODO: 实现本地模型的加载逻辑
-            # 这里需要根据实际使用的模型框架（如 transformers, llama.cpp 等）进行实现
-            raise NotImplementedError(
-                "LLM model loading is not implemented yet. "
-                "Please implement according to your local model framework."
-            )
+            self._model = self._load_backend()
         return self._model
 
-    def refine(self, text: str, mapping: Dict[str, Dict[str, str]]) -> str:
+    def _load_backend(self) -> Callable[[str, str], str]:
+        """
+        加载模型调用函数
+
+        Returns:
+            模型调用函数
+        """
+        func_module = NERConfig.get_llm_call_func_module()
+        if func_module:
+            module_name, _, func_name = func_module.rpartition(":")
+            return getattr(importlib.import_module(module_name), func_name)
+
+        if self.model_path:
+            from transformers import AutoModelForCausalLM, AutoTokenizer  # type: ignore
+            import torch  # type: ignore
+
+            tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+            model = AutoModelForCausalLM.from_pretrained(self.model_path)
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            model.to(device)
+            model.eval()
+
+            def _call_local_llm(paragraph: str, prompt: str) -> str:
+                inputs = tokenizer(prompt, return_tensors="pt").to(device)
+                with torch.no_grad():
+                    outputs = model.generate(**inputs, max_new_tokens=self.max_new_tokens, do_sample=False)
+                return tokenizer.decode(
+                    outputs[0][inputs.input_ids.shape[1]:], skip_special_tokens=True
+                ).strip()
+
+            return _call_local_llm
+
+        raise ValueError(
+            "No LLM refinement backend configured. "
+            "Please provide backend, set LLM_CALL_FUNC_MODULE or llm_model_path."
+        )
+
+    def scan(self, paragraph: str, mapping: Dict[str, Dict[str, str]]) -> List[Tuple[str, str]]:
+        """
+        残留风险预扫描
+
+        与虚拟值重叠的命中不计入风险（如虚拟公司名本身带有的"有限公司"后缀）。
+
+        Args:
+            paragraph: 段落文本
+            mapping: 已有的映射表
+
+        Returns:
+            命中列表 [(规则名, 命中文本), ...]
+        """
+        covered = bytearray(len(paragraph))
+        for values in mapping.values():
+            for anonymized in values.values():
+                if not anonymized:
+                    continue
+                start = paragraph.find(anonymized)
+                while start != -1:
+                    covered[start : start + len(anonymized)] = b"\x01" * len(anonymized)
+                    start = paragraph.find(anonymized, start + 1)
+
+        hits = []
+        for name, pattern in self.risk_patterns.items():
+            for match in pattern.finditer(paragraph):
+                if covered.find(1, match.start(), match.end()) == -1:
+                    hits.append((name, match.group(0)))
+        return hits
+
+    @staticmethod
+    def relevant_mapping(
+        paragraph: str, mapping: Dict[str, Dict[str, str]], hits: List[Tuple[str, str]]
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        选出与段落相关的映射条目
+
+        虚拟值出现在段落中，或原始值与某个风险命中相互包含的条目被视为相关。
+
+        Args:
+            paragraph: 段落文本
+            mapping: 完整映射表
+            hits: 段落的风险命中
+
+        Returns:
+            相关映射条目 {entity_type: {original: anonymized}}
+        """
+        hit_texts = [text for _, text in hits]
+        relevant: Dict[str, Dict[str, str]] = {}
+        for entity_type, values in mapping.items():
+            for original, anonymized in values.items():
+                if (anonymized and anonymized in paragraph) or any(
+                    hit in original or original in hit for hit in hit_texts
+                ):
+                    relevant.setdefault(entity_type, {})[original] = anonymized
+        return relevant
+
+    @staticmethod
+    def split_paragraphs(text: str) -> List[Tuple[int, int]]:
+        """
+        按段落切分文本
+
+        Args:
+            text: 文本
+
+        Returns:
+            段落区间列表 [(start, end), ...]（不含分隔符）
+        """
+        paragraphs = []
+        start = 0
+        while start <= len(text):
+            end = text.find(PARAGRAPH_SEPARATOR, start)
+            if end == -1:
+                end = len(text)
+            paragraphs.append((start, end))
+            start = end + len(PARAGRAPH_SEPARATOR)
+        return paragraphs
+
+    def refine(
+        self,
+        text: str,
+        mapping: Dict[str, Dict[str, str]],
+        value_provider: Optional[Callable[[str, str], str]] = None,
+        changes: Optional[List[Tuple[int, int, int]]] = None,
+    ) -> str:
         """
         使用 LLM 对文本进行润色和修复
 
+        只有残留风险预扫描命中的段落会送入模型。edits 模式下模型只返回编辑列表，
+        经校验后一次扫描应用到全文；text 模式下模型重写段落并拼回原文。
+
         Args:
             text: 已经过前三层处理的文本
-            mapping: 已有的映射表
+            mapping: 已有的映射表（edits 模式下新发现的实体会写入该映射表）
+            value_provider: 生成虚拟值的函数 callable(original, entity_type) -> str（可选），
+                            通常复用第三层的一致性映射；为 None 时使用模型给出的替换值
+            changes: 修改记录列表（可选），按位置顺序追加每处修改 (start, end, 新长度)，
+                     用于同步实体位置表的坐标
 
         Returns:
             润色后的文本
@@ -48,33 +275,278 @@ class LLMRefiner:
         Note:
             这一步必须在本地部署的模型上运行，严禁调用公有云 API
         """
-        prompt = self._build_prompt(text, mapping)
+        self.stats.documents += 1
+        self.stats.total_chars += len(text)
+        started = time.perf_counter()
+
+        flagged = []
+        seen = set()
+        for start, end in self.split_paragraphs(text):
+            paragraph = text[start:end]
+            self.stats.paragraphs += 1
+            hits = self.scan(paragraph, mapping) if paragraph.strip() else []
+            if not hits:
+                continue
+            self.stats.flagged_paragraphs += 1
+            # edits 模式的编辑作用于全文，重复出现的段落只需请求一次
+            if self.mode == "edits" and paragraph in seen:
+                continue
+            seen.add(paragraph)
+            self.stats.sent_chars += len(paragraph)
+            flagged.append((start, end, self.relevant_mapping(paragraph, mapping, hits)))
+
+        if self.mode == "edits":
+            edits: Dict[str, Tuple[str, str]] = {}
+            for start, end, relevant in flagged:
+                for original, edit in self._request_edits(text[start:end], relevant, mapping).items():
+                    edits.setdefault(original, edit)
+            refined = self.apply_edits(text, edits, mapping, value_provider, changes)
+        else:
+            pieces = []
+            last = 0
+            for start, end, relevant in flagged:
+                paragraph = text[start:end]
+                rewritten = self._refine_paragraph(paragraph, relevant)
+                if rewritten != paragraph:
+                    pieces.append(text[last:start])
+                    pieces.append(rewritten)
+                    last = end
+                    if changes is not None:
+                        changes.append((start, end, len(rewritten)))
+            pieces.append(text[last:])
+            refined = "".join(pieces)
+
+        self.stats.seconds += time.perf_counter() - started
+        return refined
+
+    def _call_model(self, prompt: str, paragraph: str) -> Optional[str]:
+        """
+        调用模型（启用缓存时优先查询缓存）
+
+        Args:
+            prompt: 完整提示词
+            paragraph: 段落文本
+
+        Returns:
+            模型输出；调用失败时返回 None
+        """
+        try:
+            if self.cache is None:
+                response = self._generate(prompt, paragraph)
+            else:
+                # 提示词包含段落和相关映射，整体作为缓存输入
+                response = self.cache.get_or_call(
+                    str(self.model_path), f"{self.PROMPT_VERSION}:{self.mode}", prompt,
+                    lambda: self._generate(prompt, paragraph),
+                )
+        except Exception as e:
+            print(f"Warning: LLM refinement failed: {e}")
+            return None
+        self.stats.output_chars += len(response)
+        return response
+
+    def _refine_paragraph(self, paragraph: str, mapping: Dict[str, Dict[str, str]]) -> str:
+        """
+        润色单个段落（text 模式）
+
+        Args:
+            paragraph: 段落文本
+            mapping: 与该段相关的映射条目
+
+        Returns:
+            润色后的段落；模型输出不可用时返回原段落
+        """
+        response = self._call_model(self._build_prompt(paragraph, mapping), paragraph)
+        if response is None:
+            return paragraph
+
+        refined = response.strip().strip("\n")
+        # 输出为空、跨段或长度异常时视为不可用，保留原段落
+        if not refined or PARAGRAPH_SEPARATOR in refined or not (
+            0.5 * len(paragraph) <= len(refined) <= 2 * len(paragraph) + 20
+        ):
+            self.stats.rejected += 1
+            return paragraph
+        return refined
+
+    def _request_edits(
+        self,
+        paragraph: str,
+        relevant: Dict[str, Dict[str, str]],
+        mapping: Dict[str, Dict[str, str]],
+    ) -> Dict[str, Tuple[str, str]]:
+        """
+        请求并校验单个段落的编辑列表（edits 模式）
+
+        Args:
+            paragraph: 段落文本
+            relevant: 与该段相关的映射条目
+            mapping: 完整映射表
+
+        Returns:
+            校验通过的编辑 {original: (entity_type, replacement)}
+        """
+        response = self._call_model(self._build_edits_prompt(paragraph, relevant), paragraph)
+        if response is None:
+            return {}
+
+        try:
+            json_match = re.search(r"\[.*\]", response, re.DOTALL)
+            items = json.loads(json_match.group(0) if json_match else response)
+            if not isinstance(items, list):
+                raise ValueError("edits must be a JSON array")
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Warning: Failed to parse LLM edits: {e}")
+            self.stats.rejected += 1
+            return {}
+
+        pseudonyms = {value for values in mapping.values() for value in values.values()}
+        edits: Dict[str, Tuple[str, str]] = {}
+        for item in items:
+            if not isinstance(item, dict):
+                self.stats.rejected += 1
+                continue
+            original = str(item.get("original", "")).strip()
+            replacement = str(item.get("replacement", "")).strip()
+            entity_type = ENTITY_TYPE_MAPPING.get(str(item.get("type", "")), "MISC")
+            # 原文必须真实出现在段落中，且不能是已有的虚拟值
+            if (
+                len(original) < 2
+                or original not in paragraph
+                or original in pseudonyms
+                or any(original in value for value in pseudonyms)
+                or PARAGRAPH_SEPARATOR in replacement
+                or replacement == original
+            ):
+                self.stats.rejected += 1
+                continue
+            edits[original] = (entity_type, replacement)
+        return edits
+
+    def apply_edits(
+        self,
+        text: str,
+        edits: Dict[str, Tuple[str, str]],
+        mapping: Dict[str, Dict[str, str]],
+        value_provider: Optional[Callable[[str, str], str]] = None,
+        changes: Optional[List[Tuple[int, int, int]]] = None,
+    ) -> str:
+        """
+        一次扫描把编辑应用到全文
+
+        替换值优先复用映射表中已有的值，其次使用 value_provider，最后才使用模型给出的值；
+        新的映射会写入映射表，保证全文一致。
+
+        Args:
+            text: 文本
+            edits: {original: (entity_type, replacement)}
+            mapping: 映射表
+            value_provider: 生成虚拟值的函数（可选）
+            changes: 修改记录列表（可选），追加每处替换 (start, end, 新长度)
+
+        Returns:
+            应用编辑后的文本
+        """
+        if not edits:
+            return text
+
+        replacements = {}
+        for original, (entity_type, suggested) in edits.items():
+            existing = next(
+                (values[original] for values in mapping.values() if original in values), None
+            )
+            if existing is None:
+                if value_provider is not None:
+                    existing = value_provider(original, entity_type)
+                else:
+                    existing = suggested or f"[{entity_type}]"
+                mapping.setdefault(entity_type, {})[original] = existing
+            replacements[original] = existing
+
+        originals = list(replacements)
+        automaton = AhoCorasick.build(originals)
+        pieces = []
+        last = 0
+        for start, end, pattern_id in automaton.longest_matches(text):
+            replacement = replacements[originals[pattern_id]]
+            pieces.append(text[last:start])
+            pieces.append(replacement)
+            last = end
+            self.stats.applied_edits += 1
+            if changes is not None:
+                changes.append((start, end, len(replacement)))
+        pieces.append(text[last:])
+        return "".join(pieces)
+
+    def _generate(self, prompt: str, text: str) -> str:
+        """
+        调用本地模型生成润色结果
 
-        # TODO: 实现模型推理逻辑
-        # refined_text = self.model.generate(prompt)
-        # return refined_text
+        Args:
+            prompt: 完整提示词
+            text: 待润色的段落
 
-        # 临时返回原文本，等待实现
-        return text
+        Returns:
+            模型输出
+        """
+        return self.model(text, prompt)
+
+    @staticmethod
+    def _format_mapping(mapping: Dict[str, Dict[str, str]]) -> str:
+        """将映射条目格式化为提示词中的文本"""
+        return "\n".join(
+            f"{original} -> {anonymized}"
+            for values in mapping.values()
+            for original, anonymized in values.items()
+        ) or "（无）"
 
     def _build_prompt(self, text: str, mapping: Dict[str, Dict[str, str]]) -> str:
         """
-        构建 LLM 提示词
+        构建 LLM 提示词（text 模式）
 
         Args:
-            text: 待润色的文本
-            mapping: 已有的映射表
+            text: 待润色的段落
+            mapping: 与该段相关的映射条目
+
+        Returns:
+            完整的提示词
+        """
+        prompt = f"""请检查以下合同段落，如果发现遗漏的真实公司名、人名或具体项目地址，请将其修改为虚拟名称，保持上下文一致，不要改变合同原意。
+
+已有映射关系：
+{self._format_mapping(mapping)}
+
+待检查段落：
+{text}
+
+请只输出润色后的段落："""
+        return prompt
+
+    def _build_edits_prompt(self, text: str, mapping: Dict[str, Dict[str, str]]) -> str:
+        """
+        构建 LLM 提示词（edits 模式）
+
+        Args:
+            text: 待检查的段落
+            mapping: 与该段相关的映射条目
 
         Returns:
             完整的提示词
         """
-        prompt = f"""请检查以下文本，如果发现遗漏的真实公司名、人名或具体项目地址，请将其修改为虚拟名称，保持上下文一致，不要改变合同原意。
+        prompt = f"""请检查以下合同段落，找出遗漏的真实公司名、人名或具体项目地址，不要改写段落。
+
+要求：
+1. 只返回 JSON 数组，格式如下：
+[{{"original": "段落中的原文", "type": "组织机构", "replacement": "虚拟名称"}}]
+2. original 必须与段落中的文字完全一致，type 取值为：组织机构、人名、地点
+3. 已有映射关系中的原文请使用对应的虚拟名称
+4. 没有遗漏时返回 []
 
 已有映射关系：
-{mapping}
+{self._format_mapping(mapping)}
 
-待检查文本：
+待检查段落：
 {text}
 
-请输出润色后的文本："""
+结果："""
         return prompt
@@ -5,16 +5,27 @@ NER 适配器模块
 - ModelScope（推荐）
 - PaddleNLP（向后兼容）
 - LLM（用于实体抽取）
+- Remote（本地 NER 推理服务客户端）
+- Cascade（快速模型 + 强模型级联）
+- Ensemble（多个后端并发运行并合并结果）
 """
 
 from contract_deid.core.ner_adapters.base import BaseNERAdapter
 from contract_deid.core.ner_adapters.modelscope_adapter import ModelScopeNERAdapter
 from contract_deid.core.ner_adapters.paddlenlp_adapter import PaddleNLPAdapter
 from contract_deid.core.ner_adapters.llm_adapter import LLMNERAdapter
+from contract_deid.core.ner_adapters.remote_adapter import RemoteNERAdapter
+from contract_deid.core.ner_adapters.cascade_adapter import CascadeNERAdapter, CascadeStats
+from contract_deid.core.ner_adapters.ensemble_adapter import EnsembleNERAdapter, EnsembleStats
 
 __all__ = [
     "BaseNERAdapter",
     "ModelScopeNERAdapter",
     "PaddleNLPAdapter",
     "LLMNERAdapter",
+    "RemoteNERAdapter",
+    "CascadeNERAdapter",
+    "CascadeStats",
+    "EnsembleNERAdapter",
+    "EnsembleStats",
 ]
@@ -8,6 +8,8 @@ from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 from presidio_analyzer import RecognizerResult
 
+from contract_deid.core.span import Span, to_recognizer_results
+
 
 class BaseNERAdapter(ABC):
     """
@@ -15,7 +17,7 @@ class BaseNERAdapter(ABC):
     
     定义统一的输入输出接口：
     - 输入：文本字符串
-    - 输出：List[RecognizerResult]（Presidio 格式）
+    - 输出：List[Span]（analyze_spans，引擎内部使用）或 List[RecognizerResult]（analyze，Presidio 格式）
     """
 
     def __init__(self, model_name: Optional[str] = None, model_path: Optional[str] = None, **kwargs):
@@ -79,41 +81,106 @@ class BaseNERAdapter(ABC):
         """
         pass
 
-    def analyze(self, text: str) -> List[RecognizerResult]:
+    def _extract_entities_batch(self, texts: List[str]) -> List[Dict[str, List[Dict[str, Any]]]]:
         """
-        识别文本中的实体（统一接口）
-        
+        批量提取实体（内部方法，返回原始格式）
+
+        默认逐条调用 _extract_entities，支持批量推理的后端可以重写此方法。
+
+        Args:
+            texts: 待识别的文本列表
+
+        Returns:
+            与输入一一对应的实体字典列表
+        """
+        return [self._extract_entities(text) for text in texts]
+
+    def _to_spans(self, ner_results: Dict[str, List[Dict[str, Any]]]) -> List[Span]:
+        """
+        将原始格式的实体字典转换为 Span
+
+        Args:
+            ner_results: 实体字典
+
+        Returns:
+            List[Span]: 识别结果列表
+        """
+        spans = []
+        for entity_type, entities in ner_results.items():
+            presidio_type = self._map_entity_type(entity_type)
+            if presidio_type:
+                for entity in entities:
+                    if "text" in entity and "start" in entity and "end" in entity:
+                        spans.append(
+                            Span(
+                                presidio_type,
+                                entity["start"],
+                                entity["end"],
+                                entity.get("probability", entity.get("score", 0.9)),
+                                "ner",
+                            )
+                        )
+        return spans
+
+    def analyze_spans(self, text: str) -> List[Span]:
+        """
+        识别文本中的实体，返回轻量的 Span（引擎内部使用）
+
         Args:
             text: 待识别的文本
-            
+
         Returns:
-            List[RecognizerResult]: Presidio 格式的识别结果列表
+            List[Span]: 识别结果列表
         """
-        results = []
-        
         try:
-            # 调用具体实现提取实体
-            ner_results = self._extract_entities(text)
-            
-            # 转换为 Presidio 格式
-            for entity_type, entities in ner_results.items():
-                presidio_type = self._map_entity_type(entity_type)
-                if presidio_type:
-                    for entity in entities:
-                        if "text" in entity and "start" in entity and "end" in entity:
-                            result = RecognizerResult(
-                                entity_type=presidio_type,
-                                start=entity["start"],
-                                end=entity["end"],
-                                score=entity.get("probability", entity.get("score", 0.9)),
-                            )
-                            results.append(result)
+            return self._to_spans(self._extract_entities(text))
         except Exception as e:
             # 如果 NER 失败，记录错误但不中断流程
             print(f"Warning: NER analysis failed: {e}")
             return []
+
+    def analyze_spans_batch(self, texts: List[str]) -> List[List[Span]]:
+        """
+        批量识别文本中的实体，返回 Span
+
+        Args:
+            texts: 待识别的文本列表
+
+        Returns:
+            与输入一一对应的识别结果列表
+        """
+        if not texts:
+            return []
+        try:
+            return [self._to_spans(item) for item in self._extract_entities_batch(texts)]
+        except Exception as e:
+            # 批量推理失败时退化为逐条识别，单条失败不影响其他文本
+            print(f"Warning: Batched NER analysis failed, falling back to per-text analysis: {e}")
+            return [self.analyze_spans(text) for text in texts]
+
+    def analyze(self, text: str) -> List[RecognizerResult]:
+        """
+        识别文本中的实体（统一接口）
         
-        return results
+        Args:
+            text: 待识别的文本
+            
+        Returns:
+            List[RecognizerResult]: Presidio 格式的识别结果列表
+        """
+        return to_recognizer_results(self.analyze_spans(text))
+
+    def analyze_batch(self, texts: List[str]) -> List[List[RecognizerResult]]:
+        """
+        批量识别文本中的实体
+
+        Args:
+            texts: 待识别的文本列表
+
+        Returns:
+            与输入一一对应的识别结果列表
+        """
+        return [to_recognizer_results(spans) for spans in self.analyze_spans_batch(texts)]
 
     def __repr__(self) -> str:
         """返回适配器的字符串表示"""
@@ -0,0 +1,159 @@
+"""
+级联 NER 适配器（Model Cascade）
+
+先用小而快的模型（如 tiny BERT、CRF）处理全文，只把低置信度或标签冲突的区域
+升级给大模型（如 StructBERT/UIE）重新识别，在召回率与推理成本之间取得平衡。
+"""
+
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
+
+from contract_deid.core.ner_adapters.base import BaseNERAdapter
+from contract_deid.core.span import Span
+
+
+@dataclass
+class CascadeStats:
+    """级联统计信息"""
+
+    documents: int = 0
+    total_chars: int = 0
+    escalated_chars: int = 0
+    escalated_regions: int = 0
+
+    @property
+    def escalated_ratio(self) -> float:
+        """升级给大模型的文本占比"""
+        return self.escalated_chars / self.total_chars if self.total_chars else 0.0
+
+
+class CascadeNERAdapter(BaseNERAdapter):
+    """
+    级联 NER 适配器：组合一个快速模型和一个强模型
+
+    升级条件：
+    - 快速模型的结果得分低于 confidence_threshold
+    - 快速模型给出相互重叠但标签不同的结果
+    """
+
+    def __init__(
+        self,
+        fast_adapter: BaseNERAdapter,
+        strong_adapter: BaseNERAdapter,
+        confidence_threshold: float = 0.8,
+        context_margin: int = 32,
+        model_name: Optional[str] = None,
+        **kwargs
+    ):
+        """
+        初始化级联适配器
+
+        Args:
+            fast_adapter: 处理全文的快速适配器
+            strong_adapter: 只处理升级区域的强适配器
+            confidence_threshold: 低于该得分的结果所在区域会被升级
+            context_margin: 升级区域向两侧扩展的上下文字符数
+            model_name: 适配器名称（用于标识）
+            **kwargs: 其他参数
+        """
+        super().__init__(
+            model_name=model_name or f"cascade({fast_adapter.model_name}->{strong_adapter.model_name})",
+            **kwargs
+        )
+        self.fast_adapter = fast_adapter
+        self.strong_adapter = strong_adapter
+        self.confidence_threshold = confidence_threshold
+        self.context_margin = context_margin
+        self.stats = CascadeStats()
+
+    def _load_model(self):
+        """子适配器各自懒加载模型"""
+        return (self.fast_adapter, self.strong_adapter)
+
+    def _escalation_regions(self, text: str, results: List[Span]) -> List[Tuple[int, int]]:
+        """
+        计算需要升级的区域
+
+        Args:
+            text: 完整文本
+            results: 快速模型的识别结果
+
+        Returns:
+            合并后的区域列表 [(start, end), ...]
+        """
+        spans = []
+        ordered = sorted(results, key=lambda r: (r.start, r.end))
+        for i, result in enumerate(ordered):
+            if result.score < self.confidence_threshold:
+                spans.append((result.start, result.end))
+            # 与后续重叠结果的标签冲突
+            for other in ordered[i + 1 :]:
+                if other.start >= result.end:
+                    break
+                if other.entity_type != result.entity_type:
+                    spans.append((min(result.start, other.start), max(result.end, other.end)))
+
+        regions: List[Tuple[int, int]] = []
+        for start, end in sorted(spans):
+            start = max(0, start - self.context_margin)
+            end = min(len(text), end + self.context_margin)
+            if regions and start <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+            else:
+                regions.append((start, end))
+        return regions
+
+    def _extract_entities(self, text: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        级联识别实体
+
+        Args:
+            text: 待识别的文本
+
+        Returns:
+            Dict[str, List[Dict]]: 实体字典（类型已是 Presidio 类型）
+        """
+        fast_results = self.fast_adapter.analyze_spans(text)
+        regions = self._escalation_regions(text, fast_results)
+
+        self.stats.documents += 1
+        self.stats.total_chars += len(text)
+        self.stats.escalated_chars += sum(end - start for start, end in regions)
+        self.stats.escalated_regions += len(regions)
+
+        # 升级区域之外保留快速模型的结果
+        final = [
+            r for r in fast_results
+            if not any(r.start < end and start < r.end for start, end in regions)
+        ]
+
+        # 升级区域内以强模型结果为准
+        if regions:
+            strong_batches = self.strong_adapter.analyze_spans_batch([text[start:end] for start, end in regions])
+            for (offset, _), batch in zip(regions, strong_batches):
+                for r in batch:
+                    r.start += offset
+                    r.end += offset
+                    final.append(r)
+
+        entities: Dict[str, List[Dict[str, Any]]] = {}
+        for r in sorted(final, key=lambda r: (r.start, r.end)):
+            entities.setdefault(r.entity_type, []).append({
+                "text": text[r.start:r.end],
+                "start": r.start,
+                "end": r.end,
+                "probability": r.score,
+            })
+        return entities
+
+    def _map_entity_type(self, raw_type: str) -> Optional[str]:
+        """
+        子适配器已完成类型映射
+
+        Args:
+            raw_type: Presidio 实体类型
+
+        Returns:
+            Presidio 实体类型
+        """
+        return raw_type
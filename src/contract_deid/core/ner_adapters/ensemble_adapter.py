@@ -0,0 +1,288 @@
+"""
+集成 NER 适配器（Ensemble）
+
+不同后端的召回各有所长（如 ModelScope 擅长公司名，LLM 擅长地址）。
+集成适配器把文档并发分发给多个适配器，再用区间扫描合并相互重叠的结果，
+按投票或最高得分选出每个区间的最终实体；落选结果中未被覆盖的部分单独再投票。
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Literal, Tuple
+
+from contract_deid.core.ner_adapters.base import BaseNERAdapter
+from contract_deid.core.span import Span
+
+
+@dataclass
+class BackendStats:
+    """单个后端的统计信息"""
+
+    calls: int = 0
+    total_seconds: float = 0.0
+    spans: int = 0
+
+    @property
+    def mean_latency(self) -> float:
+        """平均延迟（秒）"""
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+
+@dataclass
+class EnsembleStats:
+    """集成统计信息"""
+
+    backends: Dict[str, BackendStats] = field(default_factory=dict)
+    clusters: int = 0
+    agreed_clusters: int = 0
+
+    @property
+    def agreement_ratio(self) -> float:
+        """所有后端给出相同区间与类型的簇占比"""
+        return self.agreed_clusters / self.clusters if self.clusters else 0.0
+
+
+class EnsembleNERAdapter(BaseNERAdapter):
+    """
+    集成 NER 适配器：并发运行多个适配器并合并结果
+
+    合并策略：
+    - "vote"：每个重叠簇内按类型统计支持的后端数，最高票类型胜出；区间被不少于 min_votes 个后端标记时才采纳
+    - "max_score"：每个重叠簇内取得分最高的结果
+
+    胜出结果之外、仍被落选结果覆盖的部分组成子簇继续按同一策略选择。
+    """
+
+    def __init__(
+        self,
+        adapters: List[BaseNERAdapter],
+        strategy: Literal["vote", "max_score"] = "vote",
+        min_votes: int = 1,
+        max_workers: Optional[int] = None,
+        model_name: Optional[str] = None,
+        **kwargs
+    ):
+        """
+        初始化集成适配器
+
+        Args:
+            adapters: 参与集成的适配器列表
+            strategy: 合并策略，"vote" 或 "max_score"
+            min_votes: vote 策略下实体被采纳所需的最少后端数
+            max_workers: 并发线程数，默认与适配器数量相同
+            model_name: 适配器名称（用于标识）
+            **kwargs: 其他参数
+        """
+        if not adapters:
+            raise ValueError("EnsembleNERAdapter requires at least one adapter")
+        if strategy not in ("vote", "max_score"):
+            raise ValueError(f"Unknown ensemble strategy: {strategy}")
+        super().__init__(
+            model_name=model_name or "ensemble(" + ",".join(str(a.model_name) for a in adapters) + ")",
+            **kwargs
+        )
+        self.adapters = adapters
+        self.strategy = strategy
+        self.min_votes = min_votes
+        self.max_workers = max_workers or len(adapters)
+        self.names = self._backend_names(adapters)
+        self.stats = EnsembleStats(backends={name: BackendStats() for name in self.names})
+
+    @staticmethod
+    def _backend_names(adapters: List[BaseNERAdapter]) -> List[str]:
+        """为每个后端生成唯一的统计名称"""
+        names = []
+        for adapter in adapters:
+            name = adapter.__class__.__name__
+            if name in names:
+                name = f"{name}#{len(names)}"
+            names.append(name)
+        return names
+
+    def _load_model(self):
+        """子适配器各自懒加载模型"""
+        return tuple(self.adapters)
+
+    def _run_backend(self, index: int, texts: List[str]) -> List[List[Span]]:
+        """运行单个后端并记录延迟"""
+        started = time.perf_counter()
+        results = self.adapters[index].analyze_spans_batch(texts)
+        stats = self.stats.backends[self.names[index]]
+        stats.calls += 1
+        stats.total_seconds += time.perf_counter() - started
+        stats.spans += sum(len(items) for items in results)
+        return results
+
+    def merge(self, votes: List[Tuple[int, Span]]) -> List[Span]:
+        """
+        区间扫描合并多个后端的结果
+
+        每个重叠簇先选出一个胜出结果，落选结果超出胜出区间的部分组成子簇再分别投票，
+        被足够多后端标记的位置不会因为簇内另一个实体胜出而漏掉。
+
+        Args:
+            votes: (后端下标, 识别结果) 列表
+
+        Returns:
+            合并后的识别结果列表，互不重叠
+        """
+        merged: List[Span] = []
+        for cluster in self._clusters(votes):
+            self._record_agreement(cluster)
+            merged.extend(self._coalesce(self._resolve(cluster)))
+        return sorted(merged, key=lambda r: r.start)
+
+    @staticmethod
+    def _clusters(votes: List[Tuple[int, Span]]) -> List[List[Tuple[int, Span]]]:
+        """按区间重叠关系（传递闭包）把结果分簇"""
+        clusters: List[List[Tuple[int, Span]]] = []
+        cluster_end = -1
+        for vote in sorted(votes, key=lambda v: (v[1].start, -v[1].end)):
+            if clusters and vote[1].start < cluster_end:
+                clusters[-1].append(vote)
+                cluster_end = max(cluster_end, vote[1].end)
+            else:
+                clusters.append([vote])
+                cluster_end = vote[1].end
+        return clusters
+
+    def _record_agreement(self, cluster: List[Tuple[int, Span]]):
+        """统计所有后端给出相同区间与类型的簇"""
+        self.stats.clusters += 1
+        keys = {(r.start, r.end, r.entity_type) for _, r in cluster}
+        if len(keys) == 1 and len({index for index, _ in cluster}) == len(self.adapters):
+            self.stats.agreed_clusters += 1
+
+    def _resolve(self, cluster: List[Tuple[int, Span]], prefer: Optional[str] = None) -> List[Span]:
+        """
+        从一个重叠簇中选出最终结果
+
+        Args:
+            cluster: 相互重叠的 (后端下标, 识别结果)
+            prefer: 票数与得分之前优先考虑的类型（子簇沿用上一级胜出实体的类型，避免同一实体被拆成不同类型）
+
+        Returns:
+            互不重叠的结果列表
+        """
+        chosen = self._choose(cluster, prefer)
+        if chosen is None:
+            return []
+        residual = [
+            (index, part)
+            for index, result in cluster
+            for part in self._subtract(result, chosen)
+        ]
+        results = [chosen]
+        for sub_cluster in self._clusters(residual):
+            results.extend(self._resolve(sub_cluster, chosen.entity_type))
+        return results
+
+    def _choose(self, cluster: List[Tuple[int, Span]], prefer: Optional[str]) -> Optional[Span]:
+        """
+        选出簇内的胜出结果
+
+        vote 策略按（支持的后端数、是否为优先类型、最高得分）排序候选；候选区间被不少于 min_votes 个后端
+        标记（任意类型）时才采纳，否则尝试下一个候选。
+        """
+        if self.strategy == "max_score":
+            return max(cluster, key=lambda v: (v[1].entity_type == prefer, v[1].score))[1]
+
+        supporters: Dict[str, set] = {}
+        for index, result in cluster:
+            supporters.setdefault(result.entity_type, set()).add(index)
+        ranked = sorted(
+            (result for _, result in cluster),
+            key=lambda r: (len(supporters[r.entity_type]), r.entity_type == prefer, r.score),
+            reverse=True,
+        )
+        for candidate in ranked:
+            flagged = {index for index, r in cluster if r.start < candidate.end and candidate.start < r.end}
+            if len(flagged) >= self.min_votes:
+                return candidate
+        return None
+
+    @staticmethod
+    def _subtract(result: Span, chosen: Span) -> List[Span]:
+        """结果去掉与胜出区间重叠部分后剩下的片段"""
+        if result.end <= chosen.start or chosen.end <= result.start:
+            return [result]
+        parts = []
+        if result.start < chosen.start:
+            parts.append(Span(result.entity_type, result.start, chosen.start, result.score, result.layer))
+        if chosen.end < result.end:
+            parts.append(Span(result.entity_type, chosen.end, result.end, result.score, result.layer))
+        return parts
+
+    @staticmethod
+    def _coalesce(results: List[Span]) -> List[Span]:
+        """合并同一簇内首尾相接的同类型结果"""
+        coalesced: List[Span] = []
+        for result in sorted(results, key=lambda r: r.start):
+            previous = coalesced[-1] if coalesced else None
+            if previous is not None and previous.end == result.start and previous.entity_type == result.entity_type:
+                coalesced[-1] = Span(
+                    previous.entity_type, previous.start, result.end,
+                    max(previous.score, result.score), previous.layer,
+                )
+            else:
+                coalesced.append(result)
+        return coalesced
+
+    def _extract_entities_batch(self, texts: List[str]) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """
+        并发运行所有后端并合并结果
+
+        Args:
+            texts: 待识别的文本列表
+
+        Returns:
+            与输入一一对应的实体字典列表（类型已是 Presidio 类型）
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._run_backend, index, texts) for index in range(len(self.adapters))
+            ]
+            per_backend = [future.result() for future in futures]
+
+        outputs = []
+        for position, text in enumerate(texts):
+            votes = [
+                (index, result)
+                for index, results in enumerate(per_backend)
+                for result in results[position]
+            ]
+            entities: Dict[str, List[Dict[str, Any]]] = {}
+            for r in self.merge(votes):
+                entities.setdefault(r.entity_type, []).append({
+                    "text": text[r.start:r.end],
+                    "start": r.start,
+                    "end": r.end,
+                    "probability": r.score,
+                })
+            outputs.append(entities)
+        return outputs
+
+    def _extract_entities(self, text: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        并发运行所有后端并合并结果
+
+        Args:
+            text: 待识别的文本
+
+        Returns:
+            Dict[str, List[Dict]]: 实体字典（类型已是 Presidio 类型）
+        """
+        return self._extract_entities_batch([text])[0]
+
+    def _map_entity_type(self, raw_type: str) -> Optional[str]:
+        """
+        子适配器已完成类型映射
+
+        Args:
+            raw_type: Presidio 实体类型
+
+        Returns:
+            Presidio 实体类型
+        """
+        return raw_type
@@ -3,15 +3,43 @@ LLM NER 适配器
 
 使用大语言模型（LLM）进行实体抽取。
 支持本地部署的模型或 API 调用。
+
+长文本会被切分为多个分块并发发送（可配置并发数与速率限制），
+LLM 返回的 start/end 通常不可靠，合并时根据实体文本在分块中的出现位置重新计算偏移。
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Callable
 import json
 import re
 import importlib
+import threading
+import time
 
 from contract_deid.config import NERConfig
+from contract_deid.core.llm_cache import LLMResponseCache, get_shared_cache
 from contract_deid.core.ner_adapters.base import BaseNERAdapter
+from contract_deid.utils.text_windows import split_windows
+
+
+class _RateLimiter:
+    """简单的请求速率限制器（线程安全）"""
+
+    def __init__(self, requests_per_second: Optional[float]):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """阻塞直到可以发出下一个请求"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
 
 
 class LLMNERAdapter(BaseNERAdapter):
@@ -35,12 +63,23 @@ class LLMNERAdapter(BaseNERAdapter):
     # 默认实体类型列表
     DEFAULT_SCHEMA = ["组织机构", "人名", "地点"]
 
+    # 提示词模板版本，修改 _build_prompt 或响应解析逻辑时需要更新（使缓存失效）
+    PROMPT_VERSION = "ner-v1"
+
+    # 提示词中文本之后的固定后缀
+    PROMPT_SUFFIX = "\n\n结果："
+
     def __init__(
         self,
         model_name: Optional[str] = None,
         model_path: Optional[str] = None,
         schema: Optional[List[str]] = None,
         llm_call_func: Optional[Callable[[str, str], str]] = None,
+        chunk_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        requests_per_second: Optional[float] = None,
+        max_new_tokens: int = 512,
+        llm_cache: Optional[LLMResponseCache] = None,
         **kwargs
     ):
         """
@@ -51,6 +90,11 @@ class LLMNERAdapter(BaseNERAdapter):
             model_path: 模型路径（如果使用本地模型）
             schema: 实体类型列表，如 ["组织机构", "人名", "地点"]
             llm_call_func: LLM 调用函数，签名：callable(text: str, prompt: str) -> str
+            chunk_size: 分块大小（字符数），默认从环境变量 LLM_CHUNK_SIZE 读取
+            max_concurrency: 最大并发请求数，默认从环境变量 LLM_MAX_CONCURRENCY 读取
+            requests_per_second: 每秒最大请求数，默认从环境变量 LLM_REQUESTS_PER_SECOND 读取
+            max_new_tokens: 本地 transformers 后端每条文本生成的最大 token 数
+            llm_cache: LLM 响应缓存，默认从环境变量 LLM_CACHE_PATH 创建
             **kwargs: 其他参数
         """
         super().__init__(
@@ -60,6 +104,14 @@ class LLMNERAdapter(BaseNERAdapter):
         )
         self.schema = schema or self.DEFAULT_SCHEMA
         self.llm_call_func = llm_call_func
+        self.chunk_size = chunk_size or NERConfig.get_llm_chunk_size()
+        self.max_concurrency = max_concurrency or NERConfig.get_llm_max_concurrency()
+        self.max_new_tokens = max_new_tokens
+        cache_path = NERConfig.get_llm_cache_path() if llm_cache is None else None
+        self.llm_cache = llm_cache or (get_shared_cache(cache_path) if cache_path else None)
+        self._rate_limiter = _RateLimiter(
+            requests_per_second if requests_per_second is not None else NERConfig.get_llm_requests_per_second()
+        )
         
         if self.llm_call_func is None:
             # 尝试从环境变量加载 LLM 调用函数
@@ -102,25 +154,17 @@ class LLMNERAdapter(BaseNERAdapter):
         Returns:
             LLM 调用函数
         """
-        # 尝试导入 transformers（本地模型）
+        # 尝试导入 transformers（本地模型），使用前缀缓存后端
         try:
-            from transformers import AutoTokenizer, AutoModelForCausalLM  # type: ignore
-            import torch  # type: ignore
-            
+            from contract_deid.core.ner_adapters.transformers_backend import PrefixCachedTransformersBackend
+
             if self.model_path:
-                tokenizer = AutoTokenizer.from_pretrained(self.model_path)
-                model = AutoModelForCausalLM.from_pretrained(self.model_path)
-                device = "cuda" if torch.cuda.is_available() else "cpu"
-                model.to(device)
-                
-                def _call_local_llm(text: str, prompt: str) -> str:
-                    full_prompt = prompt + "\n\n文本：" + text + "\n\n结果："
-                    inputs = tokenizer(full_prompt, return_tensors="pt").to(device)
-                    outputs = model.generate(**inputs, max_new_tokens=512, temperature=0.7)
-                    response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-                    return response.split("结果：")[-1].strip()
-                
-                return _call_local_llm
+                return PrefixCachedTransformersBackend(
+                    self.model_path,
+                    prefix=self.prompt_prefix(),
+                    max_new_tokens=self.max_new_tokens,
+                    batch_size=self.max_concurrency,
+                )
         except ImportError:
             pass
         
@@ -133,18 +177,15 @@ class LLMNERAdapter(BaseNERAdapter):
         """LLM 适配器不需要显式加载模型"""
         return self.llm_call_func
 
-    def _build_prompt(self, text: str) -> str:
+    def prompt_prefix(self) -> str:
         """
-        构建 LLM prompt
-        
-        Args:
-            text: 待识别的文本
-            
+        构建提示词中固定的指令前缀（只取决于 schema，本地后端会缓存其 KV）
+
         Returns:
-            prompt 字符串
+            指令前缀字符串
         """
         schema_str = "、".join(self.schema)
-        prompt = f"""请从以下文本中提取实体，实体类型包括：{schema_str}。
+        prefix = f"""请从以下文本中提取实体，实体类型包括：{schema_str}。
 
 要求：
 1. 返回 JSON 格式，格式如下：
@@ -158,26 +199,132 @@ class LLMNERAdapter(BaseNERAdapter):
 3. 如果某个类型没有实体，返回空数组 []
 4. 只返回 JSON，不要有其他文字说明
 
-文本：{text}
+文本："""
+        return prefix
 
-结果："""
-        return prompt
+    def _build_prompt(self, text: str) -> str:
+        """
+        构建 LLM prompt
+        
+        Args:
+            text: 待识别的文本
+            
+        Returns:
+            prompt 字符串
+        """
+        return self.prompt_prefix() + text + self.PROMPT_SUFFIX
 
     def _extract_entities(self, text: str) -> Dict[str, List[Dict[str, Any]]]:
         """
         使用 LLM 提取实体
-        
+
+        长文本按 chunk_size 切分后并发调用 LLM，结果偏移映射回原文。
+
         Args:
             text: 待识别的文本
             
         Returns:
             Dict[str, List[Dict]]: 实体字典
         """
-        prompt = self._build_prompt(text)
-        
-        # 调用 LLM
-        response = self.llm_call_func(text, prompt)
-        
+        windows = split_windows(text, self.chunk_size) if len(text) > self.chunk_size else [(0, len(text))]
+        chunks = [text[start:end] for start, end in windows]
+
+        if hasattr(self.llm_call_func, "call_batch"):
+            # 支持批量生成的后端（如本地前缀缓存后端）一次处理所有分块
+            responses = self._call_llm_batch(chunks)
+            chunk_results = [
+                self._align_offsets(chunk, self._parse_response(response))
+                for chunk, response in zip(chunks, responses)
+            ]
+        elif len(chunks) == 1:
+            return self._extract_chunk(text)
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                chunk_results = list(executor.map(self._extract_chunk, chunks))
+
+        merged: Dict[str, List[Dict[str, Any]]] = {}
+        for (offset, _), entities in zip(windows, chunk_results):
+            for entity_type, entity_list in entities.items():
+                target = merged.setdefault(entity_type, [])
+                for entity in entity_list:
+                    target.append({
+                        **entity,
+                        "start": entity["start"] + offset,
+                        "end": entity["end"] + offset,
+                    })
+        return merged
+
+    def _extract_chunk(self, chunk: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        对单个分块调用 LLM 并重新计算偏移
+
+        Args:
+            chunk: 分块文本
+
+        Returns:
+            Dict[str, List[Dict]]: 实体字典（偏移相对于分块）
+        """
+        prompt = self._build_prompt(chunk)
+
+        return self._align_offsets(chunk, self._parse_response(self._call_llm(chunk, prompt)))
+
+    def _call_llm(self, chunk: str, prompt: str) -> str:
+        """
+        调用 LLM（启用缓存时优先查询缓存，命中时不占用速率配额）
+
+        Args:
+            chunk: 分块文本
+            prompt: 完整提示词
+
+        Returns:
+            LLM 响应文本
+        """
+        def call() -> str:
+            self._rate_limiter.acquire()
+            return self.llm_call_func(chunk, prompt)
+
+        if self.llm_cache is None:
+            return call()
+        return self.llm_cache.get_or_call(
+            str(self.model_path or self.model_name),
+            f"{self.PROMPT_VERSION}:{'、'.join(self.schema)}",
+            chunk,
+            call,
+        )
+
+    def _call_llm_batch(self, chunks: List[str]) -> List[str]:
+        """
+        使用后端的 call_batch 批量调用 LLM（启用缓存时只对未命中的分块生成）
+
+        Args:
+            chunks: 分块文本列表
+
+        Returns:
+            与分块一一对应的响应文本
+        """
+        def call(batch: List[str]) -> List[str]:
+            self._rate_limiter.acquire()
+            return self.llm_call_func.call_batch(batch, [self._build_prompt(chunk) for chunk in batch])
+
+        if self.llm_cache is None:
+            return call(chunks)
+        return self.llm_cache.get_or_call_batch(
+            str(self.model_path or self.model_name),
+            f"{self.PROMPT_VERSION}:{'、'.join(self.schema)}",
+            chunks,
+            call,
+        )
+
+    def _parse_response(self, response: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        解析 LLM 返回的 JSON
+
+        Args:
+            response: LLM 响应文本
+
+        Returns:
+            Dict[str, List[Dict]]: 实体字典（偏移为 LLM 声称的位置）
+        """
         # 解析 JSON 响应
         try:
             # 尝试提取 JSON 部分（可能包含其他文本）
@@ -205,11 +352,59 @@ class LLMNERAdapter(BaseNERAdapter):
             
             return standardized
             
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
+        except (json.JSONDecodeError, KeyError, ValueError, AttributeError) as e:
             print(f"Warning: Failed to parse LLM response: {e}")
             print(f"Response: {response}")
             return {}
 
+    @staticmethod
+    def _align_offsets(chunk: str, entities: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        根据实体文本在分块中的实际出现位置重新计算偏移
+
+        对每个实体文本建立出现位置索引，选取距离 LLM 声称的 start 最近且尚未被
+        同类型实体占用的出现位置；文本在分块中不存在的实体（幻觉）和重复条目会被丢弃。
+
+        Args:
+            chunk: 分块文本
+            entities: LLM 返回的实体字典
+
+        Returns:
+            Dict[str, List[Dict]]: 偏移已校正的实体字典
+        """
+        occurrences: Dict[str, List[int]] = {}
+        aligned: Dict[str, List[Dict[str, Any]]] = {}
+        for entity_type, entity_list in entities.items():
+            used = set()
+            aligned[entity_type] = []
+            for entity in entity_list:
+                surface = str(entity["text"]).strip()
+                if not surface:
+                    continue
+                positions = occurrences.get(surface)
+                if positions is None:
+                    positions = []
+                    position = chunk.find(surface)
+                    while position != -1:
+                        positions.append(position)
+                        position = chunk.find(surface, position + 1)
+                    occurrences[surface] = positions
+
+                candidates = [p for p in positions if (p, surface) not in used]
+                if not candidates:
+                    continue
+                claimed = entity.get("start")
+                claimed = claimed if isinstance(claimed, int) else 0
+                start = min(candidates, key=lambda p: abs(p - claimed))
+                used.add((start, surface))
+                aligned[entity_type].append({
+                    **entity,
+                    "text": surface,
+                    "start": start,
+                    "end": start + len(surface),
+                })
+        return aligned
+
     def _map_entity_type(self, raw_type: str) -> Optional[str]:
         """
         将 LLM 返回的实体类型映射到 Presidio 类型
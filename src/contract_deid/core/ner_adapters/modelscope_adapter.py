@@ -135,6 +135,36 @@ class ModelScopeNERAdapter(BaseNERAdapter):
         # 调用 pipeline
         results = pipeline(text)
         
+        return self._normalize_results(text, results)
+
+    def _extract_entities_batch(self, texts: List[str]) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """
+        批量提取实体：一次 pipeline 调用完成多条文本的前向计算
+
+        Args:
+            texts: 待识别的文本列表
+
+        Returns:
+            与输入一一对应的实体字典列表
+        """
+        pipeline = self.model
+
+        # ModelScope pipeline 接受列表输入，并按 batch_size 组批推理
+        results = pipeline(texts, batch_size=len(texts))
+
+        return [self._normalize_results(text, result) for text, result in zip(texts, results)]
+
+    def _normalize_results(self, text: str, results: Any) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        标准化 pipeline 的输出格式
+
+        Args:
+            text: 原始文本
+            results: pipeline 对该文本的输出
+
+        Returns:
+            Dict[str, List[Dict]]: 实体字典
+        """
         # 标准化结果格式
         entities = {}
         
@@ -0,0 +1,248 @@
+"""
+本地 NER 推理服务客户端适配器
+
+将文本发送给独立的 NER 推理服务进程（见 contract_deid.core.ner_server），
+由服务端持有模型并进行动态微批推理，客户端进程无需加载模型。
+"""
+
+import itertools
+import os
+import secrets
+import threading
+from multiprocessing.connection import Client
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+from contract_deid.config import NERConfig
+from contract_deid.core.ner_adapters.base import BaseNERAdapter
+
+Address = Union[str, Tuple[str, int]]
+
+# 等待服务端响应的默认超时（秒）
+DEFAULT_TIMEOUT = 60.0
+
+
+def parse_address(address: str) -> Address:
+    """
+    解析服务地址
+
+    Args:
+        address: Unix socket 路径，或 "host:port" 形式的 TCP 地址
+
+    Returns:
+        multiprocessing.connection 可接受的地址
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and host and port.isdigit() and "/" not in address:
+        return (host, int(port))
+    return address
+
+
+def authkey_path(address: Address, path: Optional[str] = None) -> Optional[str]:
+    """
+    确定认证密钥文件路径
+
+    Args:
+        address: 已解析的服务地址
+        path: 显式指定的密钥文件路径，默认读取 NER_SERVER_AUTHKEY_FILE
+
+    Returns:
+        密钥文件路径；TCP 地址且未指定时返回 None
+    """
+    path = path or NERConfig.get_server_authkey_file()
+    if path:
+        return path
+    return f"{address}.key" if isinstance(address, str) else None
+
+
+def read_authkey(path: Optional[str]) -> Optional[bytes]:
+    """
+    读取认证密钥文件
+
+    Args:
+        path: 密钥文件路径
+
+    Returns:
+        认证密钥；文件不存在时返回 None
+    """
+    if not path or not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read().strip() or None
+
+
+def write_authkey(path: str) -> bytes:
+    """
+    生成随机认证密钥并写入仅属主可读写（0600）的文件
+
+    Args:
+        path: 密钥文件路径
+
+    Returns:
+        生成的认证密钥
+    """
+    authkey = secrets.token_hex(32).encode("ascii")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        # 文件已存在时 os.open 不会修改权限
+        os.fchmod(fd, 0o600)
+        os.write(fd, authkey)
+    finally:
+        os.close(fd)
+    return authkey
+
+
+class RemoteNERAdapter(BaseNERAdapter):
+    """
+    本地 NER 推理服务客户端适配器
+
+    服务端已将实体类型映射为 Presidio 类型，客户端只负责收发。
+    同一适配器实例可被多个线程共享，请求在连接上串行发送。
+    """
+
+    SUPPORTED_TYPES = {"ORGANIZATION", "PERSON", "LOCATION", "MISC"}
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        model_path: Optional[str] = None,
+        schema: Optional[List[str]] = None,
+        address: Optional[str] = None,
+        authkey: Optional[bytes] = None,
+        authkey_file: Optional[str] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        **kwargs
+    ):
+        """
+        初始化客户端适配器
+
+        Args:
+            model_name: 模型名称（仅用于标识，实际模型由服务端决定）
+            model_path: 未使用，保留以兼容统一接口
+            schema: 未使用，保留以兼容统一接口
+            address: 服务地址，如果为 None 将从环境变量 NER_SERVER_ADDRESS 读取
+            authkey: 认证密钥，如果为 None 将从环境变量 NER_SERVER_AUTHKEY 或密钥文件读取
+            authkey_file: 密钥文件路径，默认读取 NER_SERVER_AUTHKEY_FILE，Unix socket 默认为 "<socket 路径>.key"
+            timeout: 等待服务端响应的最长时间（秒），超时视为服务端失联
+            **kwargs: 其他参数
+        """
+        super().__init__(
+            model_name=model_name or "remote-ner",
+            model_path=model_path,
+            **kwargs
+        )
+        address = address or NERConfig.get_server_address()
+        if not address:
+            raise ValueError(
+                "NER server address is not configured. "
+                "Pass address=... or set NER_SERVER_ADDRESS."
+            )
+        self.address = parse_address(address)
+        self.authkey = (
+            authkey
+            or NERConfig.get_server_authkey()
+            or read_authkey(authkey_path(self.address, authkey_file))
+        )
+        if not self.authkey:
+            raise ValueError(
+                "NER server authkey is not configured. "
+                "Pass authkey=..., set NER_SERVER_AUTHKEY, or point NER_SERVER_AUTHKEY_FILE at the server's key file."
+            )
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+
+    def _load_model(self):
+        """建立到推理服务的连接"""
+        return Client(self.address, authkey=self.authkey)
+
+    def _request(self, texts: List[str]) -> List[List[Tuple[str, int, int, float]]]:
+        """
+        发送一次请求并等待结果
+
+        Args:
+            texts: 待识别的文本列表
+
+        Returns:
+            与输入一一对应的 (entity_type, start, end, score) 列表
+        """
+        with self._lock:
+            connection = self.model
+            request_id = next(self._request_ids)
+            try:
+                connection.send(("analyze", request_id, texts))
+                if not connection.poll(self.timeout):
+                    raise TimeoutError(f"NER server did not respond within {self.timeout}s")
+                kind, response_id, payload = connection.recv()
+            except (EOFError, OSError):
+                # 连接断开或超时时丢弃连接（迟到的响应会与下一个请求错位），下次调用重新建立
+                self._model.close()
+                self._model = None
+                raise
+        if kind == "error":
+            raise RuntimeError(f"NER server error: {payload}")
+        if response_id != request_id:
+            raise RuntimeError(f"Mismatched NER server response: {response_id} != {request_id}")
+        return payload
+
+    @staticmethod
+    def _to_entity_dict(text: str, spans: List[Tuple[str, int, int, float]]) -> Dict[str, List[Dict[str, Any]]]:
+        """将服务端返回的 span 元组转换为原始实体字典格式"""
+        entities: Dict[str, List[Dict[str, Any]]] = {}
+        for entity_type, start, end, score in spans:
+            entities.setdefault(entity_type, []).append({
+                "text": text[start:end],
+                "start": start,
+                "end": end,
+                "probability": score,
+            })
+        return entities
+
+    def _extract_entities(self, text: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        请求推理服务提取实体
+
+        Args:
+            text: 待识别的文本
+
+        Returns:
+            Dict[str, List[Dict]]: 实体字典
+        """
+        (spans,) = self._request([text])
+        return self._to_entity_dict(text, spans)
+
+    def _extract_entities_batch(self, texts: List[str]) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """
+        一次请求发送多条文本，由服务端合并进微批
+
+        Args:
+            texts: 待识别的文本列表
+
+        Returns:
+            与输入一一对应的实体字典列表
+        """
+        return [self._to_entity_dict(text, spans) for text, spans in zip(texts, self._request(texts))]
+
+    def _map_entity_type(self, raw_type: str) -> Optional[str]:
+        """
+        服务端返回的已经是 Presidio 类型
+
+        Args:
+            raw_type: 原始实体类型
+
+        Returns:
+            Presidio 实体类型
+        """
+        return raw_type if raw_type in self.SUPPORTED_TYPES else None
+
+    def __getstate__(self):
+        """连接和锁不可序列化，恢复后重新建立"""
+        state = self.__dict__.copy()
+        state["_model"] = None
+        state["_lock"] = None
+        state["_request_ids"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
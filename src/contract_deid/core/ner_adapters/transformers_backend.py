@@ -0,0 +1,218 @@
+"""
+前缀缓存的本地 transformers 后端
+
+LLMNERAdapter 每次调用的提示词由固定的指令前缀（实体类型说明、输出格式要求）和变化的文本组成。
+本后端在加载时对指令前缀做一次前向计算并保存其 KV 缓存，之后每次调用只对变化部分编码，
+从缓存继续贪心解码，并在 JSON 对象闭合时提前停止；多个分块可以合并为一个批次生成，
+使纯 CPU 环境下的实体抽取也变得可行。
+"""
+
+import copy
+from typing import Any, List, Optional
+
+
+class JSONStopTracker:
+    """
+    增量跟踪生成文本中的 JSON 结构，顶层对象闭合时报告完成
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escape = False
+        self.closed = False
+
+    def feed(self, piece: str) -> bool:
+        """
+        追加一段生成的文本
+
+        Args:
+            piece: 新生成的文本片段
+
+        Returns:
+            顶层 JSON 对象是否已闭合
+        """
+        for ch in piece:
+            if self.closed:
+                break
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"' and self.started:
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+                self.started = True
+            elif ch == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.closed = True
+        return self.closed
+
+
+class PrefixCachedTransformersBackend:
+    """
+    复用指令前缀 KV 缓存的本地 transformers 后端
+
+    可直接作为 LLMNERAdapter 的 llm_call_func 使用；call_batch 供适配器批量生成多个分块。
+
+    Example:
+        >>> backend = PrefixCachedTransformersBackend("./models/qwen", prefix=adapter.prompt_prefix())
+        >>> response = backend(chunk, adapter._build_prompt(chunk))
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        prefix: str,
+        max_new_tokens: int = 512,
+        batch_size: int = 4,
+        device: Optional[str] = None,
+    ):
+        """
+        初始化后端（加载模型并预计算前缀 KV 缓存）
+
+        Args:
+            model_path: 本地模型路径
+            prefix: 固定的指令前缀，每次调用的提示词都必须以它开头
+            max_new_tokens: 每条文本最多生成的 token 数
+            batch_size: 批量生成时每批的最大条数
+            device: 运行设备，默认有 GPU 时使用 cuda
+        """
+        import torch  # type: ignore
+        from transformers import AutoModelForCausalLM, AutoTokenizer  # type: ignore
+
+        self._torch = torch
+        self.prefix = prefix
+        self.max_new_tokens = max_new_tokens
+        self.batch_size = batch_size
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(model_path)
+        self.model.to(self.device)
+        self.model.eval()
+
+        # 对固定前缀做一次前向计算，保存 KV 缓存
+        self._prefix_ids = self.tokenizer(prefix, return_tensors="pt").input_ids.to(self.device)
+        with torch.no_grad():
+            self._prefix_cache = self.model(self._prefix_ids, use_cache=True).past_key_values
+
+    def _expand_cache(self, batch: int) -> Any:
+        """复制前缀 KV 缓存并扩展到批大小（解码会原地追加缓存，不能共享）"""
+        cache = copy.deepcopy(self._prefix_cache)
+        if hasattr(cache, "batch_repeat_interleave"):
+            cache.batch_repeat_interleave(batch)
+            return cache
+        return tuple(
+            tuple(tensor.expand(batch, *tensor.shape[1:]).contiguous() for tensor in layer)
+            for layer in cache
+        )
+
+    def _variable_part(self, prompt: str) -> str:
+        if not prompt.startswith(self.prefix):
+            raise ValueError("Prompt does not start with the cached instruction prefix")
+        return prompt[len(self.prefix):]
+
+    def _generate(self, suffixes: List[str]) -> List[str]:
+        """从前缀缓存继续，对一批变化部分做贪心解码"""
+        torch = self._torch
+        tokenizer = self.tokenizer
+        tokenizer.padding_side = "left"
+        encoded = tokenizer(
+            suffixes, return_tensors="pt", padding=True, add_special_tokens=False
+        ).to(self.device)
+        batch = len(suffixes)
+        prefix_len = self._prefix_ids.shape[1]
+
+        attention_mask = torch.cat(
+            [torch.ones(batch, prefix_len, dtype=encoded.attention_mask.dtype, device=self.device),
+             encoded.attention_mask],
+            dim=1,
+        )
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)[:, prefix_len:]
+
+        trackers = [JSONStopTracker() for _ in suffixes]
+        generated: List[List[int]] = [[] for _ in suffixes]
+        done = [False] * batch
+        eos_id = tokenizer.eos_token_id
+
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=encoded.input_ids,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=self._expand_cache(batch),
+                use_cache=True,
+            )
+            for _ in range(self.max_new_tokens):
+                next_tokens = outputs.logits[:, -1, :].argmax(dim=-1)
+                for row, token in enumerate(next_tokens.tolist()):
+                    if done[row]:
+                        continue
+                    if token == eos_id:
+                        done[row] = True
+                        continue
+                    generated[row].append(token)
+                    if trackers[row].feed(tokenizer.decode([token], skip_special_tokens=True)):
+                        done[row] = True
+                if all(done):
+                    break
+
+                # 已完成的行继续填充 pad，保持批内形状一致
+                next_tokens = torch.tensor(
+                    [tokenizer.pad_token_id if done[row] else token
+                     for row, token in enumerate(next_tokens.tolist())],
+                    device=self.device,
+                )
+                attention_mask = torch.cat(
+                    [attention_mask, torch.ones(batch, 1, dtype=attention_mask.dtype, device=self.device)],
+                    dim=1,
+                )
+                position_ids = position_ids[:, -1:] + 1
+                outputs = self.model(
+                    input_ids=next_tokens[:, None],
+                    attention_mask=attention_mask,
+                    position_ids=position_ids,
+                    past_key_values=outputs.past_key_values,
+                    use_cache=True,
+                )
+
+        return [tokenizer.decode(tokens, skip_special_tokens=True).strip() for tokens in generated]
+
+    def call_batch(self, texts: List[str], prompts: List[str]) -> List[str]:
+        """
+        批量生成
+
+        Args:
+            texts: 分块文本列表
+            prompts: 与分块对应的完整提示词列表
+
+        Returns:
+            与输入一一对应的响应文本
+        """
+        suffixes = [self._variable_part(prompt) for prompt in prompts]
+        responses: List[str] = []
+        for i in range(0, len(suffixes), self.batch_size):
+            responses.extend(self._generate(suffixes[i : i + self.batch_size]))
+        return responses
+
+    def __call__(self, text: str, prompt: str) -> str:
+        """
+        单条生成（与 llm_call_func 签名一致）
+
+        Args:
+            text: 分块文本
+            prompt: 完整提示词
+
+        Returns:
+            响应文本
+        """
+        return self.call_batch([text], [prompt])[0]
@@ -5,6 +5,9 @@
 - ModelScope（推荐）
 - PaddleNLP（向后兼容）
 - LLM（用于实体抽取）
+- Remote（本地 NER 推理服务，见 ner_server）
+- Cascade（快速模型 + 强模型级联）
+- Ensemble（多个后端并发运行并合并结果）
 
 识别中文法律实体：
 - ORG（组织机构）：甲方、乙方、关联公司
@@ -16,11 +19,16 @@ from typing import List, Optional, Literal, Union
 from presidio_analyzer import RecognizerResult
 
 from contract_deid.config import NERConfig
+from contract_deid.core.span import Span, to_recognizer_results
+from contract_deid.core.ner_gate import NERGate, GateReport
 from contract_deid.core.ner_adapters import (
     BaseNERAdapter,
     ModelScopeNERAdapter,
     PaddleNLPAdapter,
     LLMNERAdapter,
+    RemoteNERAdapter,
+    CascadeNERAdapter,
+    EnsembleNERAdapter,
 )
 
 
@@ -32,7 +40,7 @@ class NEREngine:
     """
 
     # 支持的适配器类型
-    ADAPTER_TYPES = Literal["modelscope", "paddlenlp", "llm"]
+    ADAPTER_TYPES = Literal["modelscope", "paddlenlp", "llm", "remote", "cascade", "ensemble"]
 
     def __init__(
         self,
@@ -40,13 +48,15 @@ class NEREngine:
         model_name: Optional[str] = None,
         model_path: Optional[str] = None,
         schema: Optional[List[str]] = None,
+        gate: Optional[NERGate] = None,
+        adapter: Optional[BaseNERAdapter] = None,
         **kwargs
     ):
         """
         初始化 NER 引擎
 
         Args:
-            adapter_type: 适配器类型，可选 "modelscope"（默认）、"paddlenlp"、"llm"
+            adapter_type: 适配器类型，可选 "modelscope"（默认）、"paddlenlp"、"llm"、"remote"、"cascade"、"ensemble"
                         如果为 None，将从环境变量 NER_ADAPTER_TYPE 读取
             model_name: 模型名称（根据适配器类型不同而不同）
                        如果为 None，将从环境变量 NER_MODEL_NAME 读取
@@ -54,6 +64,8 @@ class NEREngine:
                        如果为 None，将从环境变量 NER_MODEL_PATH 读取
             schema: 实体类型列表，如 ["组织机构", "人名", "地点"]
                    如果为 None，将从环境变量 NER_SCHEMA 读取
+            gate: 触发词门控（可选），设置后只对可能包含实体的片段运行模型
+            adapter: 直接使用已创建的适配器实例（可选），此时忽略 adapter_type
             **kwargs: 其他适配器特定参数
         """
         # 从环境变量读取默认值
@@ -61,9 +73,12 @@ class NEREngine:
         self.model_name = model_name or NERConfig.get_model_name()
         self.model_path = model_path or NERConfig.get_model_path()
         self.schema = schema or NERConfig.get_schema() or ["组织机构", "人名", "地点"]
+        self.gate = gate
+        # 最近一次门控的统计信息
+        self.last_gate_report: Optional[GateReport] = None
         
         # 创建适配器实例
-        self._adapter: BaseNERAdapter = self._create_adapter(**kwargs)
+        self._adapter: BaseNERAdapter = adapter or self._create_adapter(**kwargs)
 
     def _create_adapter(self, **kwargs) -> BaseNERAdapter:
         """
@@ -95,12 +110,104 @@ class NEREngine:
         elif self.adapter_type == "llm":
             return LLMNERAdapter(**adapter_kwargs)
         
+        elif self.adapter_type == "remote":
+            return RemoteNERAdapter(**adapter_kwargs)
+        
+        elif self.adapter_type == "cascade":
+            return self._create_cascade_adapter(**kwargs)
+        
+        elif self.adapter_type == "ensemble":
+            return self._create_ensemble_adapter(**kwargs)
+        
         else:
             raise ValueError(
                 f"Unknown adapter_type: {self.adapter_type}. "
-                f"Supported types: {', '.join(['modelscope', 'paddlenlp', 'llm'])}"
+                f"Supported types: {', '.join(['modelscope', 'paddlenlp', 'llm', 'remote', 'cascade', 'ensemble'])}"
             )
 
+    def _create_cascade_adapter(
+        self,
+        fast_adapter: Union[str, BaseNERAdapter] = "paddlenlp",
+        strong_adapter: Union[str, BaseNERAdapter] = "modelscope",
+        fast_model_name: Optional[str] = None,
+        strong_model_name: Optional[str] = None,
+        confidence_threshold: float = 0.8,
+        context_margin: int = 32,
+        **kwargs
+    ) -> CascadeNERAdapter:
+        """
+        创建级联适配器
+
+        Args:
+            fast_adapter: 快速适配器类型或实例
+            strong_adapter: 强适配器类型或实例
+            fast_model_name: 快速适配器的模型名称
+            strong_model_name: 强适配器的模型名称（默认使用 model_name）
+            confidence_threshold: 低于该得分的区域升级给强适配器
+            context_margin: 升级区域两侧的上下文字符数
+            **kwargs: 传给子适配器的其他参数
+
+        Returns:
+            CascadeNERAdapter: 级联适配器实例
+        """
+        return CascadeNERAdapter(
+            fast_adapter=self._create_child_adapter(fast_adapter, fast_model_name, **kwargs),
+            strong_adapter=self._create_child_adapter(
+                strong_adapter, strong_model_name or self.model_name, **kwargs
+            ),
+            confidence_threshold=confidence_threshold,
+            context_margin=context_margin,
+        )
+
+    def _create_ensemble_adapter(
+        self,
+        adapters: Optional[List[Union[str, BaseNERAdapter]]] = None,
+        strategy: str = "vote",
+        min_votes: int = 1,
+        max_workers: Optional[int] = None,
+        **kwargs
+    ) -> EnsembleNERAdapter:
+        """
+        创建集成适配器
+
+        Args:
+            adapters: 参与集成的适配器类型或实例列表，默认 ["modelscope", "paddlenlp"]
+            strategy: 合并策略，"vote" 或 "max_score"
+            min_votes: vote 策略下实体被采纳所需的最少后端数
+            max_workers: 并发线程数
+            **kwargs: 传给子适配器的其他参数
+
+        Returns:
+            EnsembleNERAdapter: 集成适配器实例
+        """
+        return EnsembleNERAdapter(
+            adapters=[
+                self._create_child_adapter(spec, None, **kwargs)
+                for spec in (adapters or ["modelscope", "paddlenlp"])
+            ],
+            strategy=strategy,
+            min_votes=min_votes,
+            max_workers=max_workers,
+        )
+
+    def _create_child_adapter(
+        self, spec: Union[str, BaseNERAdapter], model_name: Optional[str], **kwargs
+    ) -> BaseNERAdapter:
+        """
+        创建组合适配器（级联、集成）使用的子适配器
+
+        Args:
+            spec: 适配器类型或实例
+            model_name: 模型名称（为 None 时使用该类型的默认模型）
+            **kwargs: 适配器特定参数
+
+        Returns:
+            BaseNERAdapter: 适配器实例
+        """
+        if isinstance(spec, BaseNERAdapter):
+            return spec
+        return NEREngine(adapter_type=spec, model_name=model_name, schema=self.schema, **kwargs).adapter
+
     def analyze(self, text: str) -> List[RecognizerResult]:
         """
         识别文本中的实体（统一接口）
@@ -111,7 +218,65 @@ class NEREngine:
         Returns:
             List[RecognizerResult]: Presidio 格式的识别结果列表
         """
-        return self._adapter.analyze(text)
+        return to_recognizer_results(self.analyze_spans(text))
+
+    def analyze_batch(self, texts: List[str]) -> List[List[RecognizerResult]]:
+        """
+        批量识别多条文本中的实体
+
+        Args:
+            texts: 待识别的文本列表
+
+        Returns:
+            与输入一一对应的识别结果列表
+        """
+        return [to_recognizer_results(spans) for spans in self.analyze_spans_batch(texts)]
+
+    def analyze_spans(self, text: str) -> List[Span]:
+        """
+        识别文本中的实体，返回轻量的 Span（引擎内部使用）
+
+        Args:
+            text: 待识别的文本
+
+        Returns:
+            List[Span]: 识别结果列表
+        """
+        if self.gate is None:
+            return self._adapter.analyze_spans(text)
+        return self.analyze_spans_batch([text])[0]
+
+    def analyze_spans_batch(self, texts: List[str]) -> List[List[Span]]:
+        """
+        批量识别多条文本中的实体，返回 Span
+
+        启用门控时，所有文本的选中片段会合并为一个批次推理。
+
+        Args:
+            texts: 待识别的文本列表
+
+        Returns:
+            与输入一一对应的识别结果列表
+        """
+        if self.gate is None:
+            return self._adapter.analyze_spans_batch(texts)
+
+        pieces: List[str] = []
+        owners: List[tuple] = []
+        for index, text in enumerate(texts):
+            segments, self.last_gate_report = self.gate.select_segments(text)
+            for start, end in segments:
+                pieces.append(text[start:end])
+                owners.append((index, start))
+
+        # 只对选中的片段推理，并将结果偏移回原文坐标
+        results: List[List[Span]] = [[] for _ in texts]
+        for (index, offset), batch in zip(owners, self._adapter.analyze_spans_batch(pieces)):
+            for span in batch:
+                span.start += offset
+                span.end += offset
+                results[index].append(span)
+        return results
 
     @property
     def adapter(self) -> BaseNERAdapter:
@@ -0,0 +1,176 @@
+"""
+NER 触发词门控（Trigger Gating）
+
+合同正文大部分是条款用语，不包含公司名、人名或地址，但 NER 模型会处理每一个字符。
+门控阶段先用 Aho-Corasick 自动机一次扫描出触发词（甲方/乙方、有限公司、法定代表人、
+地址、先生/女士、签章区、省市名称等），只把触发词附近的片段（带上下文余量）送入模型。
+
+"省/市/区/县/镇"单字在条款中随处可见（市场、区别、城镇化），不作为触发词；
+只有后面跟着道路或门牌号的行政区划后缀才作为地址线索，由正则单独扫描。
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Pattern, Tuple
+
+from contract_deid.utils.aho_corasick import AhoCorasick
+
+# 合同当事方
+PARTY_TRIGGERS = ["甲方", "乙方", "丙方", "丁方", "出租方", "承租方", "委托方", "受托方", "买方", "卖方", "当事人"]
+
+# 组织机构后缀
+ORGANIZATION_TRIGGERS = [
+    "公司", "有限公司", "股份有限公司", "集团", "企业", "事务所", "研究院", "中心", "银行", "支行",
+    "分行", "法院", "仲裁委员会", "合作社", "工作室", "商行",
+]
+
+# 自然人角色与称谓
+PERSON_TRIGGERS = [
+    "法定代表人", "法人代表", "负责人", "委托代理人", "代理人", "授权代表", "联系人", "经办人",
+    "先生", "女士", "小姐", "同志", "老师", "教授", "博士", "律师", "经理", "总经理", "董事长",
+    "董事", "总裁", "主任", "姓名",
+]
+
+# 地址
+ADDRESS_TRIGGERS = [
+    "地址", "住所", "住址", "注册地", "所在地", "通讯地址", "送达地址", "开户行",
+    "自治区", "街道", "大道", "号楼",
+]
+
+# 复合地址线索：前面至少两个汉字的行政区划后缀，其后不远处出现道路或门牌号（如"海淀区中关村大街1号"）
+ADDRESS_PATTERN = re.compile(
+    r"(?<=[\u4e00-\u9fff]{2})[省市区县镇]"
+    r"(?=[^\s，。；：,;]{0,16}?(?:路|街|巷|弄|胡同|村|\d+号))"
+)
+
+# 签章区
+SIGNATURE_TRIGGERS = ["签字", "签章", "盖章", "签名", "签署", "（章）", "(章)"]
+
+# 省级行政区与主要城市
+REGION_TRIGGERS = [
+    "北京", "天津", "上海", "重庆", "河北", "山西", "辽宁", "吉林", "黑龙江", "江苏", "浙江",
+    "安徽", "福建", "江西", "山东", "河南", "湖北", "湖南", "广东", "海南", "四川", "贵州",
+    "云南", "陕西", "甘肃", "青海", "台湾", "内蒙古", "广西", "西藏", "宁夏", "新疆", "香港",
+    "澳门", "广州", "深圳", "杭州", "南京", "成都", "武汉", "西安", "苏州", "无锡", "宁波",
+    "青岛", "大连", "长沙", "郑州", "厦门", "济南", "合肥", "福州", "沈阳", "哈尔滨", "长春",
+    "昆明", "南宁", "贵阳", "南昌", "石家庄", "太原", "珠海", "东莞", "佛山",
+]
+
+DEFAULT_TRIGGERS = (
+    PARTY_TRIGGERS
+    + ORGANIZATION_TRIGGERS
+    + PERSON_TRIGGERS
+    + ADDRESS_TRIGGERS
+    + SIGNATURE_TRIGGERS
+    + REGION_TRIGGERS
+)
+
+
+@dataclass
+class GateReport:
+    """单次门控的统计信息"""
+
+    total_chars: int = 0
+    selected_chars: int = 0
+    trigger_hits: int = 0
+    segments: List[Tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def skipped_chars(self) -> int:
+        """跳过（未送入模型）的字符数"""
+        return self.total_chars - self.selected_chars
+
+    @property
+    def skipped_ratio(self) -> float:
+        """跳过字符占比"""
+        return self.skipped_chars / self.total_chars if self.total_chars else 0.0
+
+
+class NERGate:
+    """
+    NER 触发词门控
+
+    Example:
+        >>> gate = NERGate(margin=32)
+        >>> segments, report = gate.select_segments(text)
+        >>> print(f"skipped {report.skipped_ratio:.0%}")
+    """
+
+    def __init__(
+        self,
+        triggers: Optional[Iterable[str]] = None,
+        extra_triggers: Optional[Iterable[str]] = None,
+        patterns: Optional[Iterable[Pattern]] = None,
+        margin: int = 64,
+        max_selected_ratio: float = 0.8,
+    ):
+        """
+        初始化门控
+
+        Args:
+            triggers: 触发词列表，默认使用 DEFAULT_TRIGGERS
+            extra_triggers: 在默认触发词之外追加的触发词
+            patterns: 正则触发线索，默认使用 ADDRESS_PATTERN
+            margin: 召回安全余量，触发词前后各保留的上下文字符数
+            max_selected_ratio: 选中比例超过该值时直接处理全文（切分收益不足）
+        """
+        trigger_list = list(triggers) if triggers is not None else list(DEFAULT_TRIGGERS)
+        if extra_triggers:
+            trigger_list.extend(extra_triggers)
+        self.triggers = trigger_list
+        self.patterns = list(patterns) if patterns is not None else [ADDRESS_PATTERN]
+        self.margin = margin
+        self.max_selected_ratio = max_selected_ratio
+        self._automaton = AhoCorasick.build(self.triggers)
+
+        # 累计统计
+        self.total_chars = 0
+        self.skipped_chars = 0
+
+    @property
+    def skipped_ratio(self) -> float:
+        """累计跳过字符占比"""
+        return self.skipped_chars / self.total_chars if self.total_chars else 0.0
+
+    def select_segments(self, text: str) -> Tuple[List[Tuple[int, int]], GateReport]:
+        """
+        选择需要送入 NER 模型的片段
+
+        每个触发词向两侧各扩展 margin 个字符，相互重叠或间隔小于 margin 的片段会被合并。
+
+        Args:
+            text: 待识别的文本
+
+        Returns:
+            (片段列表 [(start, end), ...], GateReport)
+        """
+        length = len(text)
+        report = GateReport(total_chars=length)
+
+        windows = []
+        for start, end, _ in self._automaton.iter_matches(text):
+            report.trigger_hits += 1
+            windows.append((max(0, start - self.margin), min(length, end + self.margin)))
+        for pattern in self.patterns:
+            for match in pattern.finditer(text):
+                report.trigger_hits += 1
+                windows.append((max(0, match.start() - self.margin), min(length, match.end() + self.margin)))
+
+        # 合并相互重叠或间隔小于 margin 的片段
+        segments: List[Tuple[int, int]] = []
+        for seg_start, seg_end in sorted(windows):
+            if segments and seg_start <= segments[-1][1] + self.margin:
+                segments[-1] = (segments[-1][0], max(segments[-1][1], seg_end))
+            else:
+                segments.append((seg_start, seg_end))
+
+        selected = sum(end - start for start, end in segments)
+        if length and selected / length > self.max_selected_ratio:
+            segments = [(0, length)]
+            selected = length
+
+        report.segments = segments
+        report.selected_chars = selected
+        self.total_chars += report.total_chars
+        self.skipped_chars += report.skipped_chars
+        return segments, report
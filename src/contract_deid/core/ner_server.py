@@ -0,0 +1,297 @@
+"""
+本地 NER 推理服务（Sidecar）
+
+由一个独立进程持有 NER 模型，多个客户端工作进程通过本地 socket 发送文本。
+服务端将来自不同客户端的文本动态合并为微批（micro-batch），
+在不超过最大等待时延的前提下尽量凑满批次，再把结果发回对应的调用方。
+
+客户端通过 NEREngine(adapter_type="remote") 接入。
+
+连接必须通过认证：multiprocessing 连接会反序列化收到的消息，未认证的对端可以借此执行任意代码。
+未指定密钥时，Unix socket 服务生成随机密钥并写入仅属主可读写的 "<socket 路径>.key"，
+客户端默认从同一路径读取；TCP 地址必须显式指定密钥。
+
+使用方法:
+    contract-deid-ner-server --address /tmp/contract-deid-ner.sock --max-batch-size 16 --max-latency-ms 10
+"""
+
+import argparse
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+from typing import Any, Dict, List, Optional
+
+from contract_deid.config import NERConfig
+from contract_deid.core.ner_adapters.remote_adapter import authkey_path, parse_address, write_authkey
+
+
+@dataclass
+class _Request:
+    """一次客户端请求，可能包含多条文本"""
+
+    connection: Any
+    send_lock: threading.Lock
+    request_id: int
+    results: List[Optional[list]]
+    remaining: int
+
+
+@dataclass
+class _Item:
+    """微批中的一条文本"""
+
+    request: _Request
+    index: int
+    text: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class ServerStats:
+    """推理服务统计信息"""
+
+    requests: int = 0
+    items: int = 0
+    batches: int = 0
+    max_batch_size: int = 0
+
+    @property
+    def average_batch_size(self) -> float:
+        """平均批大小"""
+        return self.items / self.batches if self.batches else 0.0
+
+
+class NERServer:
+    """
+    本地 NER 推理服务
+
+    Example:
+        >>> server = NERServer("/tmp/contract-deid-ner.sock", adapter_type="modelscope")
+        >>> server.serve_forever()
+    """
+
+    def __init__(
+        self,
+        address: Optional[str] = None,
+        authkey: Optional[bytes] = None,
+        authkey_file: Optional[str] = None,
+        max_batch_size: int = 16,
+        max_latency_ms: float = 10.0,
+        adapter=None,
+        **engine_kwargs
+    ):
+        """
+        初始化推理服务
+
+        Args:
+            address: 监听地址，Unix socket 路径或 "host:port"，默认读取 NER_SERVER_ADDRESS
+            authkey: 认证密钥，默认读取 NER_SERVER_AUTHKEY；Unix socket 未指定时生成随机密钥写入密钥文件
+            authkey_file: 生成的密钥写入的文件，默认读取 NER_SERVER_AUTHKEY_FILE，否则为 "<socket 路径>.key"
+            max_batch_size: 单个微批的最大文本数
+            max_latency_ms: 请求在队列中等待凑批的最长时间（毫秒）
+            adapter: 直接指定 NER 适配器实例；为 None 时根据 engine_kwargs 创建 NEREngine
+            **engine_kwargs: 传递给 NEREngine 的参数（adapter_type、model_name 等）
+        """
+        address = address or NERConfig.get_server_address()
+        if not address:
+            raise ValueError("NER server address is not configured. Pass address=... or set NER_SERVER_ADDRESS.")
+        if engine_kwargs.get("adapter_type") == "remote":
+            raise ValueError("NER server cannot use the remote adapter itself")
+
+        self.address = parse_address(address)
+        self.authkey = authkey or NERConfig.get_server_authkey()
+        self.authkey_file: Optional[str] = None
+        if not self.authkey:
+            if isinstance(self.address, tuple):
+                raise ValueError(
+                    f"Refusing to serve on TCP address {address} without an authkey. "
+                    "Pass authkey=... or set NER_SERVER_AUTHKEY."
+                )
+            self.authkey_file = authkey_path(self.address, authkey_file)
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+
+        if adapter is None:
+            from contract_deid.core.ner_engine import NEREngine
+
+            adapter = NEREngine(**engine_kwargs).adapter
+        self.adapter = adapter
+
+        self.stats = ServerStats()
+        self._queue: "queue.Queue[_Item]" = queue.Queue()
+        self._listener: Optional[Listener] = None
+        self._running = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """加载模型并在后台线程中开始服务"""
+        if self._running.is_set():
+            return
+        # 先加载模型，避免第一个批次承担加载时间
+        _ = self.adapter.model
+
+        if self.authkey_file:
+            self.authkey = write_authkey(self.authkey_file)
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self._running.set()
+        for target in (self._accept_loop, self._batch_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def serve_forever(self):
+        """启动服务并阻塞当前线程"""
+        self.start()
+        try:
+            while self._running.is_set():
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """停止服务"""
+        self._running.clear()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _accept_loop(self):
+        """接受客户端连接，每个连接一个读取线程"""
+        while self._running.is_set():
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                # 监听关闭或认证失败
+                if not self._running.is_set():
+                    return
+                continue
+            thread = threading.Thread(target=self._connection_loop, args=(connection,), daemon=True)
+            thread.start()
+
+    def _connection_loop(self, connection):
+        """读取单个客户端的请求并放入微批队列"""
+        send_lock = threading.Lock()
+        with connection:
+            while self._running.is_set():
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    return
+
+                kind, request_id, texts = message
+                if kind != "analyze" or not isinstance(texts, list):
+                    with send_lock:
+                        connection.send(("error", request_id, f"Unknown request: {kind}"))
+                    continue
+
+                self.stats.requests += 1
+                request = _Request(
+                    connection=connection,
+                    send_lock=send_lock,
+                    request_id=request_id,
+                    results=[None] * len(texts),
+                    remaining=len(texts),
+                )
+                if not texts:
+                    self._reply(request)
+                for index, text in enumerate(texts):
+                    self._queue.put(_Item(request=request, index=index, text=text))
+
+    def _collect_batch(self) -> List[_Item]:
+        """
+        收集一个微批：以队首请求的入队时间为起点，在截止时间前尽量凑满批次
+
+        Returns:
+            本批次的文本列表，服务停止时可能为空
+        """
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = first.enqueued_at + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    # 已到截止时间，只取走已在队列中的请求
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self):
+        """微批推理主循环"""
+        while self._running.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            self.stats.batches += 1
+            self.stats.items += len(batch)
+            self.stats.max_batch_size = max(self.stats.max_batch_size, len(batch))
+
+            batch_results = self.adapter.analyze_spans_batch([item.text for item in batch])
+            for item, results in zip(batch, batch_results):
+                item.request.results[item.index] = [
+                    (r.entity_type, r.start, r.end, r.score) for r in results
+                ]
+                item.request.remaining -= 1
+                if item.request.remaining == 0:
+                    self._reply(item.request)
+
+    @staticmethod
+    def _reply(request: _Request):
+        """将完整结果发回对应的客户端"""
+        try:
+            with request.send_lock:
+                request.connection.send(("result", request.request_id, request.results))
+        except (OSError, EOFError):
+            # 客户端已断开
+            pass
+
+
+def main():
+    """推理服务命令行入口"""
+    parser = argparse.ArgumentParser(description="合同脱敏本地 NER 推理服务")
+    parser.add_argument("--address", type=str, help="监听地址（Unix socket 路径或 host:port）")
+    parser.add_argument("--authkey-file", type=str, help="生成的认证密钥写入的文件（默认 <socket 路径>.key）")
+    parser.add_argument("--max-batch-size", type=int, default=16, help="单个微批的最大文本数")
+    parser.add_argument("--max-latency-ms", type=float, default=10.0, help="凑批的最长等待时间（毫秒）")
+    parser.add_argument("--adapter-type", type=str, help="服务端使用的 NER 适配器类型")
+    parser.add_argument("--model-name", type=str, help="模型名称")
+    parser.add_argument("--model-path", type=str, help="本地模型路径")
+    args = parser.parse_args()
+
+    engine_kwargs: Dict[str, Any] = {}
+    if args.adapter_type:
+        engine_kwargs["adapter_type"] = args.adapter_type
+    if args.model_name:
+        engine_kwargs["model_name"] = args.model_name
+    if args.model_path:
+        engine_kwargs["model_path"] = args.model_path
+
+    server = NERServer(
+        address=args.address,
+        authkey_file=args.authkey_file,
+        max_batch_size=args.max_batch_size,
+        max_latency_ms=args.max_latency_ms,
+        **engine_kwargs,
+    )
+    server.start()
+    print(f"NER server listening on {server.address}")
+    if server.authkey_file:
+        print(f"Authkey written to {server.authkey_file}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
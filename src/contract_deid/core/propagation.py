@@ -0,0 +1,92 @@
+"""
+文档内实体传播（Entity Propagation）
+
+NER 在文档中识别到某个实体（如"腾讯科技（深圳）有限公司"）后，
+后续的每一次出现都不应再依赖模型重新识别：漏识别会导致泄漏，识别到也要付出推理成本。
+
+传播阶段用已识别实体的表面形式构建 Aho-Corasick 自动机，一次线性扫描标出全文所有出现位置。
+有了传播，NER 只需处理长合同的开头部分或门控选中的片段，也能保证全文覆盖。
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from contract_deid.core.span import Span
+from contract_deid.utils.aho_corasick import AhoCorasick
+
+# 默认参与传播的实体类型（第二层"软实体"）
+DEFAULT_PROPAGATED_TYPES = ("ORGANIZATION", "PERSON", "LOCATION")
+
+
+class EntityPropagator:
+    """
+    文档内实体传播器
+
+    Example:
+        >>> propagator = EntityPropagator()
+        >>> extra = propagator.propagate(text, ner_results)
+    """
+
+    def __init__(
+        self,
+        entity_types: Iterable[str] = DEFAULT_PROPAGATED_TYPES,
+        min_length: int = 2,
+    ):
+        """
+        初始化传播器
+
+        Args:
+            entity_types: 参与传播的实体类型
+            min_length: 参与传播的表面形式最小长度，过短的实体（如单字）容易误伤
+        """
+        self.entity_types = set(entity_types)
+        self.min_length = min_length
+
+    def propagate(
+        self,
+        text: str,
+        results: List[Span],
+        known: Optional[Dict[str, Tuple[str, float]]] = None,
+    ) -> List[Span]:
+        """
+        将已识别实体传播到全文
+
+        已被任何现有识别结果覆盖的位置不会重复标注。
+
+        Args:
+            text: 完整文本
+            results: 现有识别结果（规则层与 NER 层；任何带 entity_type/start/end/score 的对象）
+            known: 文本之外已识别的实体 {表面形式: (实体类型, 置信度)}，如流式处理中之前窗口的实体
+
+        Returns:
+            新增的识别结果（不包含输入中已有的结果），来源层为 propagation
+        """
+        # 收集表面形式，同一表面形式出现多种类型时取得分最高者
+        surfaces: Dict[str, Tuple[str, float]] = dict(known or {})
+        for result in results:
+            if result.entity_type not in self.entity_types:
+                continue
+            surface = text[result.start : result.end]
+            if len(surface.strip()) < self.min_length:
+                continue
+            current = surfaces.get(surface)
+            if current is None or result.score > current[1]:
+                surfaces[surface] = (result.entity_type, result.score)
+
+        if not surfaces:
+            return []
+
+        # 标记已覆盖的字符
+        covered = bytearray(len(text))
+        for result in results:
+            covered[result.start : result.end] = b"\x01" * (result.end - result.start)
+
+        patterns = list(surfaces)
+        automaton = AhoCorasick.build(patterns)
+
+        propagated = []
+        for start, end, pattern_id in automaton.longest_matches(text):
+            if covered.find(1, start, end) != -1:
+                continue
+            entity_type, score = surfaces[patterns[pattern_id]]
+            propagated.append(Span(entity_type, start, end, score, "propagation"))
+        return propagated
@@ -0,0 +1,153 @@
+"""
+逐条记录的惰性脱敏（ETL 管道）
+
+输入 (id, text) 记录的迭代器，按输入顺序惰性产出结果，不物化整个列表：
+- 后台线程预读有界数量的记录，读取与处理重叠，内存占用与预读量成正比
+- 每批记录的 NER 合并为一次批量推理
+- 单条记录出错只记录在该条结果中，不中断整个流；批量识别失败时逐条重试以定位出错记录
+"""
+
+import queue
+import threading
+from dataclasses import dataclass, replace
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from contract_deid.utils.mapping_export import DeidentificationResult
+
+# 默认每批记录数与预读记录数
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_READ_AHEAD = 32
+
+# 预读线程结束标记
+_END = object()
+
+
+@dataclass
+class RecordResult:
+    """
+    单条记录的脱敏结果
+
+    Attributes:
+        id: 记录标识
+        result: 脱敏结果；出错时为 None
+        error: 处理该记录时的异常；成功时为 None
+    """
+
+    id: Any
+    result: Optional[DeidentificationResult] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        """是否处理成功"""
+        return self.error is None
+
+
+def _prefetch(records: Iterable[Tuple[Any, str]], read_ahead: int) -> Iterator[Tuple[Any, str]]:
+    """
+    在后台线程中预读记录
+
+    Args:
+        records: (id, text) 记录迭代器
+        read_ahead: 最多预读的记录数
+
+    Yields:
+        (id, text)；输入迭代器本身抛出的异常在对应位置重新抛出
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=read_ahead)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # 队列满时等待；消费方停止后放弃写入
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        try:
+            for record in records:
+                if not put(record):
+                    return
+        except Exception as e:
+            put(e)
+        put(_END)
+
+    thread = threading.Thread(target=reader, name="contract-deid-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # 消费方提前停止时通知读取线程退出
+        stop.set()
+
+
+def deidentify_records(
+    engine,
+    records: Iterable[Tuple[Any, str]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    read_ahead: int = DEFAULT_READ_AHEAD,
+) -> Iterator[RecordResult]:
+    """
+    按输入顺序惰性脱敏 (id, text) 记录
+
+    每条记录使用独立的一致性映射和金额噪声系数，以及一份 document_id 为记录标识的配置副本，
+    配置了语料级映射表时每条记录的映射带上对应的 document 列；调用方的配置对象不被修改。
+
+    Args:
+        engine: DeidentificationEngine
+        records: (id, text) 记录迭代器
+        batch_size: 每批合并推理的记录数
+        read_ahead: 后台预读的最大记录数（不小于 batch_size）
+
+    Yields:
+        RecordResult，与输入一一对应且顺序相同
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+    source = _prefetch(records, max(read_ahead, batch_size))
+    config = engine.config
+    try:
+        while True:
+            batch: List[Tuple[Any, str]] = list(islice(source, batch_size))
+            if not batch:
+                return
+            yield from _process_batch(engine, batch, config)
+    finally:
+        engine.config = config
+        source.close()
+
+
+def _process_batch(engine, batch: List[Tuple[Any, str]], config) -> Iterator[RecordResult]:
+    """处理一批记录：批量识别，逐条替换；批量识别失败时逐条识别，config 为各条记录配置副本的基础"""
+    texts = [text for _, text in batch]
+    try:
+        if not all(isinstance(text, str) for text in texts):
+            raise TypeError("record text must be str")
+        batch_spans = engine.analyze_batch(texts)
+    except Exception:
+        batch_spans = [None] * len(batch)
+
+    for (record_id, text), spans in zip(batch, batch_spans):
+        try:
+            if spans is None:
+                spans = engine.analyze(text)
+            # 每条记录独立的映射表与金额噪声系数
+            engine.consistency_provider.clear()
+            engine.amount_recognizer.reset_noise_factor()
+            # 结果持有各自的配置副本，不修改调用方的配置
+            engine.config = replace(config, document_id=None if record_id is None else str(record_id))
+            record = RecordResult(record_id, result=engine.process_spans(text, spans))
+        except Exception as e:
+            record = RecordResult(record_id, error=e)
+        yield record
@@ -0,0 +1,254 @@
+"""
+引擎快照（Engine Snapshot）
+
+将已完成初始化（预热）的 DeidentificationEngine 序列化到磁盘，
+新进程可直接从快照恢复，跳过注册表构建、正则编译、实体库生成和模型加载。
+
+快照文件格式（便于 mmap）：
+- 魔数 + 头部长度 + JSON 头部（指纹、版本、缓冲区表）
+- pickle 主体（protocol 5）
+- 按 64 字节对齐的带外缓冲区（大块权重/数组），加载时直接从 mmap 中切片，不做拷贝
+
+配置或包版本变化时指纹不一致，快照自动失效并重建。
+"""
+
+import dataclasses
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import platform
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from contract_deid.config import NERConfig
+from contract_deid.utils.mapping_export import DeidentificationConfig
+
+# 快照格式版本，格式变化时递增
+SNAPSHOT_FORMAT_VERSION = 2
+
+_MAGIC = b"CDEIDSNP"
+_ALIGNMENT = 64
+
+# 仅影响运行时输出、不影响引擎内部状态的配置字段，不参与指纹计算
+_RUNTIME_ONLY_FIELDS = {"mapping_file_path", "mapping_stream_path", "document_id", "engine_snapshot_path"}
+
+
+def compute_fingerprint(config: DeidentificationConfig) -> str:
+    """
+    计算快照指纹
+
+    指纹由配置、包版本、Python 版本以及 NER 相关环境变量共同决定。
+
+    Args:
+        config: 脱敏配置
+
+    Returns:
+        十六进制指纹字符串
+    """
+    from contract_deid import __version__
+
+    config_dict = {
+        key: value
+        for key, value in dataclasses.asdict(config).items()
+        if key not in _RUNTIME_ONLY_FIELDS
+    }
+    payload = {
+        "format": SNAPSHOT_FORMAT_VERSION,
+        "package_version": __version__,
+        "python": platform.python_version(),
+        "config": config_dict,
+        "ner": {
+            "adapter_type": NERConfig.get_adapter_type(),
+            "model_name": NERConfig.get_model_name(),
+            "model_path": NERConfig.get_model_path(),
+            "schema": NERConfig.get_schema(),
+        },
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _aligned(offset: int) -> int:
+    """将偏移量向上对齐到 _ALIGNMENT"""
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _dumps(obj: Any) -> tuple[bytes, List[pickle.PickleBuffer]]:
+    """使用 protocol 5 序列化对象，大块缓冲区走带外通道"""
+    buffers: List[pickle.PickleBuffer] = []
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    return data, buffers
+
+
+def _detach_ner_model(engine) -> Optional[Any]:
+    """
+    从引擎中摘下 NER 模型对象（用于模型无法序列化的场景）
+
+    Returns:
+        被摘下的模型对象，若没有则返回 None
+    """
+    if engine.ner_engine is None:
+        return None
+    adapter = engine.ner_engine.adapter
+    model = adapter._model
+    adapter._model = None
+    return model
+
+
+def save_snapshot(engine, path: str) -> Dict[str, Any]:
+    """
+    将预热后的引擎保存为快照
+
+    保存前会强制完成所有懒加载（包括 NER 模型），并清空会话映射表。
+    如果 NER 模型本身无法序列化，则只保存其余部分，模型在恢复后按需重新加载。
+
+    Args:
+        engine: DeidentificationEngine 实例
+        path: 快照文件路径
+
+    Returns:
+        快照头部信息
+    """
+    engine.warm_up()
+    engine.consistency_provider.clear()
+
+    model_included = True
+    try:
+        data, buffers = _dumps(engine)
+    except Exception as e:
+        print(f"Warning: NER model is not serializable, snapshot will exclude it: {e}")
+        model = _detach_ner_model(engine)
+        try:
+            data, buffers = _dumps(engine)
+        finally:
+            if model is not None:
+                engine.ner_engine.adapter._model = model
+        model_included = False
+
+    # 计算带外缓冲区在文件中的布局
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    header: Dict[str, Any] = {
+        "fingerprint": compute_fingerprint(engine.config),
+        "format": SNAPSHOT_FORMAT_VERSION,
+        "pickle_length": len(data),
+        "ner_model_included": model_included,
+        "buffers": [],
+    }
+
+    # 头部长度依赖于缓冲区偏移，偏移又依赖于头部长度，这里先以相对偏移记录
+    relative = _aligned(len(data))
+    for raw in raw_buffers:
+        header["buffers"].append([relative, raw.nbytes])
+        relative = _aligned(relative + raw.nbytes)
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    body_start = _aligned(len(_MAGIC) + 8 + len(header_bytes))
+
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_suffix(target.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (body_start - f.tell()))
+        f.write(data)
+        for (offset, _), raw in zip(header["buffers"], raw_buffers):
+            f.write(b"\0" * (body_start + offset - f.tell()))
+            f.write(raw)
+    # 原子替换，避免并发读取到写了一半的快照
+    os.replace(tmp_path, target)
+
+    return header
+
+
+def _read_header(mm: mmap.mmap) -> tuple[Dict[str, Any], int]:
+    """读取快照头部，返回 (头部, 主体起始偏移)"""
+    if mm[: len(_MAGIC)] != _MAGIC:
+        raise ValueError("Not a contract_deid engine snapshot")
+    (header_length,) = struct.unpack("<Q", mm[len(_MAGIC) : len(_MAGIC) + 8])
+    header_start = len(_MAGIC) + 8
+    header = json.loads(bytes(mm[header_start : header_start + header_length]))
+    return header, _aligned(header_start + header_length)
+
+
+def load_snapshot(path: str, config: DeidentificationConfig):
+    """
+    从快照恢复引擎
+
+    Args:
+        path: 快照文件路径
+        config: 当前脱敏配置（用于校验指纹）
+
+    Returns:
+        DeidentificationEngine 实例；快照不存在、损坏或已失效时返回 None
+    """
+    if not Path(path).is_file():
+        return None
+
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件无法 mmap
+            return None
+
+    try:
+        header, body_start = _read_header(mm)
+    except (ValueError, struct.error, json.JSONDecodeError) as e:
+        print(f"Warning: Ignoring invalid engine snapshot {path}: {e}")
+        mm.close()
+        return None
+
+    if header.get("fingerprint") != compute_fingerprint(config):
+        mm.close()
+        return None
+
+    view = memoryview(mm)
+    data = view[body_start : body_start + header["pickle_length"]]
+    # 带外缓冲区直接引用 mmap 区域，反序列化后的数组与文件页共享
+    buffers = [view[body_start + offset : body_start + offset + length] for offset, length in header["buffers"]]
+    try:
+        engine = pickle.loads(data, buffers=buffers)
+    except Exception as e:
+        print(f"Warning: Failed to restore engine snapshot {path}: {e}")
+        return None
+
+    engine.config = config
+    # 快照中带有保存时的随机状态（金额噪声系数、Faker 种子），每次恢复重新初始化
+    engine.reseed()
+    return engine
+
+
+def load_or_create_engine(config: DeidentificationConfig, path: Optional[str] = None):
+    """
+    优先从快照恢复引擎，快照缺失或失效时重新构建并写入快照
+
+    Args:
+        config: 脱敏配置
+        path: 快照文件路径，默认使用 config.engine_snapshot_path
+
+    Returns:
+        DeidentificationEngine 实例
+    """
+    from contract_deid.core.analyzer import DeidentificationEngine
+    from contract_deid.core.consistency import ConsistencyProvider
+
+    path = path or config.engine_snapshot_path
+    if path is None:
+        return DeidentificationEngine(config=config, consistency_provider=ConsistencyProvider())
+
+    engine = load_snapshot(path, config)
+    if engine is not None:
+        return engine
+
+    engine = DeidentificationEngine(config=config, consistency_provider=ConsistencyProvider())
+    try:
+        save_snapshot(engine, path)
+    except Exception as e:
+        # 快照只是启动加速手段，写入失败不影响本次处理
+        print(f"Warning: Failed to write engine snapshot {path}: {e}")
+    return engine
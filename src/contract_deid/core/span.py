@@ -0,0 +1,83 @@
+"""
+轻量实体区间类型
+
+Presidio 的 RecognizerResult 带有解释信息和基于字典的元数据，每次创建的开销较大。
+分析、合并与替换流程内部统一使用 __slots__ 的 Span，只在与 Presidio 交互的边界
+（注册到 AnalyzerEngine 的识别器、适配器的 analyze 接口）转换为 RecognizerResult。
+"""
+
+from typing import Iterable, List
+
+from presidio_analyzer import RecognizerResult
+
+
+class Span:
+    """
+    实体区间
+
+    Attributes:
+        entity_type: 实体类型
+        start: 起始偏移
+        end: 结束偏移
+        score: 置信度
+        layer: 来源层（rule / ner / propagation）
+    """
+
+    __slots__ = ("entity_type", "start", "end", "score", "layer")
+
+    def __init__(self, entity_type: str, start: int, end: int, score: float, layer: str = "rule"):
+        self.entity_type = entity_type
+        self.start = start
+        self.end = end
+        self.score = score
+        self.layer = layer
+
+    def __repr__(self) -> str:
+        return f"Span({self.entity_type}, {self.start}, {self.end}, {self.score:.2f}, {self.layer})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Span):
+            return NotImplemented
+        return (self.entity_type, self.start, self.end, self.score, self.layer) == (
+            other.entity_type, other.start, other.end, other.score, other.layer,
+        )
+
+    __hash__ = None
+
+    def to_recognizer_result(self) -> RecognizerResult:
+        """转换为 Presidio RecognizerResult"""
+        return RecognizerResult(entity_type=self.entity_type, start=self.start, end=self.end, score=self.score)
+
+    @classmethod
+    def from_recognizer_result(cls, result: RecognizerResult, layer: str = "rule") -> "Span":
+        """从 Presidio RecognizerResult 转换"""
+        return cls(result.entity_type, result.start, result.end, result.score, layer)
+
+
+def to_recognizer_results(spans: Iterable[Span]) -> List[RecognizerResult]:
+    """
+    批量转换为 Presidio RecognizerResult
+
+    Args:
+        spans: Span 序列
+
+    Returns:
+        RecognizerResult 列表
+    """
+    return [span.to_recognizer_result() for span in spans]
+
+
+def with_layer(spans: List[Span], layer: str) -> List[Span]:
+    """
+    原地设置来源层
+
+    Args:
+        spans: Span 列表
+        layer: 来源层
+
+    Returns:
+        同一个列表
+    """
+    for span in spans:
+        span.layer = layer
+    return spans
@@ -0,0 +1,223 @@
+"""
+流式脱敏（Streaming De-identification）
+
+超大文档（合并的合同归档、OCR 导出）不必一次读入内存：按窗口读取文本，
+每个窗口连同其后的重叠区一起识别，只输出不会被后续文本影响的前缀，剩余部分并入下一个窗口。
+
+- 跨越输出边界的实体整体留到下一个窗口，连同完整上下文重新识别
+- 一致性映射在窗口之间共享，同一实体在全文中映射到同一个虚拟值
+- 之前窗口识别到的软实体参与后续窗口的实体传播
+
+峰值内存与窗口大小成正比，与文件大小无关（映射表与实体位置表随实体数量增长）。
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from contract_deid.core.leak_verifier import LeakReport, LeakVerifier
+from contract_deid.utils.mapping_export import DeidentificationResult
+from contract_deid.utils.span_table import SpanTable
+from contract_deid.utils.text_windows import find_boundary
+
+# 默认窗口大小与重叠区长度（字符数）
+DEFAULT_WINDOW_SIZE = 65536
+DEFAULT_OVERLAP = 1024
+
+TextSource = Union[str, TextIO, Iterable[str]]
+
+
+def read_chunks(source: TextSource, size: int) -> Iterator[str]:
+    """
+    把文本来源统一为文本块迭代器
+
+    字符串与超过 size 的文本块按 size 切开，每个文本块都不超过 size 个字符。
+
+    Args:
+        source: 字符串、文本文件对象（按 size 读取，不依赖换行）或文本块迭代器
+        size: 文本块的最大字符数
+
+    Yields:
+        文本块
+    """
+    if isinstance(source, str):
+        source = (source,)
+    read = getattr(source, "read", None)
+    if read is not None:
+        while True:
+            chunk = read(size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for chunk in source:
+            for start in range(0, len(chunk), size):
+                yield chunk[start : start + size]
+
+
+class DeidentificationStream:
+    """
+    流式脱敏：迭代得到脱敏后的文本块
+
+    迭代结束后 result 为完整的 DeidentificationResult（anonymized_text 为空字符串，
+    映射表、实体位置表和冲突计数覆盖全文），配置了映射表路径时同时完成导出。
+    启用泄漏校验时每个输出块在输出前用当时的映射表校验，结果累积在 leak_report 中（坐标为输出中的偏移）。
+
+    Example:
+        >>> stream = DeidentificationStream(engine, open("archive.txt", encoding="utf-8"))
+        >>> with open("archive.deid.txt", "w", encoding="utf-8") as out:
+        ...     for chunk in stream:
+        ...         out.write(chunk)
+        >>> print(stream.result.mapping)
+    """
+
+    def __init__(
+        self,
+        engine,
+        source: TextSource,
+        window_size: int = DEFAULT_WINDOW_SIZE,
+        overlap: int = DEFAULT_OVERLAP,
+        verify_leaks: bool = False,
+    ):
+        """
+        初始化流式脱敏
+
+        Args:
+            engine: DeidentificationEngine
+            source: 文本来源（字符串、文本文件对象或文本块迭代器）
+            window_size: 每次输出的最大字符数
+            overlap: 窗口之后额外参与识别的字符数，应不小于最长实体的长度
+            verify_leaks: 是否逐块校验输出中的残留原始值
+        """
+        if window_size <= 0 or overlap < 0:
+            raise ValueError(f"Invalid window_size/overlap: {window_size}/{overlap}")
+        self.engine = engine
+        self.source = source
+        self.window_size = window_size
+        self.overlap = overlap
+
+        self.spans = SpanTable()
+        self.conflicts: Counter = Counter()
+        self.result: Optional[DeidentificationResult] = None
+        self.leak_report: Optional[LeakReport] = LeakReport() if verify_leaks else None
+
+        # 已识别的软实体 {表面形式: (实体类型, 置信度)}，参与后续窗口的实体传播
+        self._known: Dict[str, Tuple[str, float]] = {}
+
+    def __iter__(self) -> Iterator[str]:
+        """逐块输出脱敏后的文本"""
+        for _, chunk, _ in self.windows():
+            yield chunk
+
+    def windows(self) -> Iterator[Tuple[str, str, List[Tuple[int, int, str]]]]:
+        """
+        逐块输出原文、脱敏后的文本与替换列表
+
+        Yields:
+            (原文块, 脱敏后的文本块, 按位置排序的 [(块内起始, 块内结束, 虚拟值)])
+        """
+        buffer = ""
+        offset = 0
+        anon_offset = 0
+        limit = self.window_size + self.overlap
+        chunks = read_chunks(self.source, self.window_size)
+        exhausted = False
+        while True:
+            # 读满一个窗口加重叠区；文本块不超过窗口大小，缓冲区不超过 limit + window_size
+            while not exhausted and len(buffer) < limit:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    buffer += chunk
+            if not buffer:
+                break
+
+            # 每次只识别一个窗口加重叠区，单步开销与文本总长无关
+            view = buffer[:limit]
+            results, conflicts = self.engine.analyze_resolved(view, self._known)
+            self.conflicts.update(conflicts)
+            last = exhausted and len(buffer) <= limit
+            cut = len(view) if last else self._safe_cut(view, results)
+
+            chunk_start = anon_offset
+            chunk_out, anon_offset, replacements = self._emit(view, cut, results, offset, anon_offset)
+            if self.leak_report is not None:
+                self._verify(chunk_out, chunk_start)
+            yield view[:cut], chunk_out, replacements
+            buffer = buffer[cut:]
+            offset += cut
+
+        self.result = DeidentificationResult(
+            anonymized_text="",
+            mapping=self.engine.consistency_provider.mapping,
+            config=self.engine.config,
+            spans=self.spans,
+            conflicts=dict(self.conflicts),
+        )
+
+    def _verify(self, chunk: str, chunk_start: int):
+        """校验一个输出块，命中位置换算为输出中的偏移"""
+        mapping = self.engine.consistency_provider.mapping
+        report = LeakVerifier().verify(chunk, mapping)
+        for hit in report.hits:
+            hit.start += chunk_start
+            hit.end += chunk_start
+        self.leak_report.hits.extend(report.hits)
+        self.leak_report.checked_values = report.checked_values
+
+    def _safe_cut(self, buffer: str, results: list) -> int:
+        """
+        计算可以安全输出的前缀长度
+
+        在窗口末尾附近的断点处切开；跨越切点的实体整体留到下一个窗口。
+        """
+        limit = min(self.window_size, len(buffer))
+        cut = find_boundary(buffer, 0, limit)
+        while True:
+            crossing = [result.start for result in results if result.start < cut < result.end]
+            if not crossing:
+                return cut
+            if min(crossing) == 0:
+                # 实体比整个窗口还长：整体输出
+                return max(result.end for result in results if result.start == 0)
+            cut = min(crossing)
+
+    def _emit(self, buffer: str, cut: int, results: list, offset: int, anon_offset: int) -> tuple:
+        """
+        替换前缀中的实体并记录位置
+
+        Returns:
+            tuple: (脱敏后的文本块, 输出中的下一个偏移, 块内替换列表)
+        """
+        provider = self.engine.consistency_provider
+        config = self.engine.config
+        accepted = [result for result in results if result.end <= cut]
+        replacements = provider.plan_replacements(
+            buffer, accepted, config, self.engine.amount_recognizer.get_noise_factor()
+        )
+
+        entity_types = self.engine.propagator.entity_types if self.engine.propagator else ()
+        pieces = []
+        applied = []
+        last = 0
+        for result, anonymized in replacements:
+            original = buffer[result.start : result.end]
+            applied.append((result.start, result.end, anonymized))
+            pieces.append(buffer[last : result.start])
+            anon_offset += result.start - last
+            self.spans.append(
+                result.entity_type, original, offset + result.start, offset + result.end,
+                anon_offset, anon_offset + len(anonymized), result.score, result.layer,
+            )
+            pieces.append(anonymized)
+            anon_offset += len(anonymized)
+            last = result.end
+            if (
+                result.entity_type in entity_types
+                and original not in self._known
+                and len(original.strip()) >= self.engine.propagator.min_length
+            ):
+                self._known[original] = (result.entity_type, result.score)
+        pieces.append(buffer[last:cut])
+        anon_offset += cut - last
+        return "".join(pieces), anon_offset, applied
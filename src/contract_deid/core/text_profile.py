@@ -0,0 +1,107 @@
+"""
+文本字符类画像与识别器前置过滤（Prefilter）
+
+叙述性段落通常不含数字、"@" 或中文大写数字，第一层的大部分识别器在这些段落上不可能命中。
+识别器通过 PREREQUISITES 声明命中所必需的字符类，引擎先对每个文本/窗口做一次字符集扫描，
+前置条件不满足时直接跳过该识别器。
+
+前置条件是若干备选组合：满足其中任意一组（组内特征全部存在）即需要运行识别器，例如金额识别器
+(("digit",), ("upper_numeral",), ("lower_numeral", "yuan")) 表示含数字、含大写中文数字，
+或同时含小写中文数字和"元"。未声明 PREREQUISITES 的识别器（如词典识别器）总是运行。
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import FrozenSet, Optional, Sequence, Tuple
+
+# 前置条件：备选组合列表，每组为必须同时存在的特征
+Prerequisites = Sequence[Tuple[str, ...]]
+
+# 特征对应的字符集
+FEATURE_CHARS = {
+    "at": frozenset("@"),
+    "currency": frozenset("¥￥元圆万亿"),
+    "yuan": frozenset("元圆"),
+    "upper_numeral": frozenset("零壹贰叁肆伍陆柒捌玖拾佰仟"),
+    "lower_numeral": frozenset("〇零一二两三四五六七八九十百千"),
+}
+
+
+class TextProfile:
+    """
+    文本的字符类画像
+
+    Attributes:
+        features: 文本中存在的特征（digit / at / currency / yuan / upper_numeral / lower_numeral）
+    """
+
+    __slots__ = ("features",)
+
+    def __init__(self, features: FrozenSet[str]):
+        self.features = features
+
+    @classmethod
+    def from_text(cls, text: str) -> "TextProfile":
+        """
+        一次扫描计算字符类画像
+
+        set(text) 在 C 层完成唯一的一次全文扫描，之后只在不同字符的集合上做小集合求交。
+
+        Args:
+            text: 文本或窗口
+
+        Returns:
+            TextProfile
+        """
+        chars = set(text)
+        features = {name for name, members in FEATURE_CHARS.items() if not chars.isdisjoint(members)}
+        # 与正则 \d 一致：包含全角数字等所有 Unicode 十进制数字
+        if any(ch.isdecimal() for ch in chars):
+            features.add("digit")
+        return cls(frozenset(features))
+
+    def satisfies(self, prerequisites: Optional[Prerequisites]) -> bool:
+        """
+        是否满足前置条件
+
+        Args:
+            prerequisites: 备选组合列表；为 None 表示没有前置条件
+
+        Returns:
+            满足任意一组时为 True
+        """
+        if prerequisites is None:
+            return True
+        return any(self.features.issuperset(group) for group in prerequisites)
+
+    def __repr__(self) -> str:
+        return f"TextProfile({sorted(self.features)})"
+
+
+@dataclass
+class PrefilterStats:
+    """前置过滤统计信息"""
+
+    # 画像过的文本/窗口数
+    segments: int = 0
+    # 按识别器名称计数的运行与跳过次数
+    runs: Counter = field(default_factory=Counter)
+    skips: Counter = field(default_factory=Counter)
+
+    @property
+    def skip_rate(self) -> float:
+        """跳过的识别器调用占比"""
+        total = sum(self.runs.values()) + sum(self.skips.values())
+        return sum(self.skips.values()) / total if total else 0.0
+
+    def record(self, name: str, skipped: bool):
+        """记录一次识别器调用或跳过"""
+        (self.skips if skipped else self.runs)[name] += 1
+
+    def summary(self) -> str:
+        """单行摘要"""
+        details = ", ".join(f"{name}={count}" for name, count in self.skips.most_common())
+        return (
+            f"Prefilter: skipped {sum(self.skips.values())} recognizer runs "
+            f"({self.skip_rate:.1%}) over {self.segments} segments ({details or 'none'})"
+        )
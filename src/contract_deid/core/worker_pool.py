@@ -0,0 +1,309 @@
+"""
+Fork 工作进程池
+
+父进程只加载一次脱敏引擎和 NER 模型，然后 fork 出多个工作进程。
+工作进程以写时复制（copy-on-write）的方式共享模型权重，避免每个进程各自加载一份。
+
+为减少引用计数和 GC 扫描导致的页面复制，fork 前会执行 gc.freeze()，
+将父进程中已有的对象移入永久代，工作进程的 GC 不再触碰这些对象。
+"""
+
+import gc
+import multiprocessing
+import os
+import queue
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from contract_deid.utils.mapping_export import DeidentificationConfig, DeidentificationResult
+
+# 控制消息
+_STOP = "__stop__"
+_STATS = "__stats__"
+
+# 等待结果时检查工作进程存活的间隔（秒）
+_POLL_INTERVAL = 1.0
+
+# fork 前由父进程设置，工作进程通过继承的地址空间直接使用
+_WORKER_ENGINE = None
+
+
+@dataclass
+class WorkerMemory:
+    """
+    工作进程内存占用（单位：字节）
+
+    - rss: 常驻内存，包含与父进程共享的页面
+    - pss: 按共享进程数均摊后的内存
+    - private: 进程私有页面，即该工作进程带来的额外开销
+    """
+
+    pid: int
+    rss: int
+    pss: int
+    private: int
+
+
+def read_memory_usage(pid: Optional[int] = None) -> Dict[str, int]:
+    """
+    读取进程内存占用（仅 Linux 提供完整数据）
+
+    Args:
+        pid: 进程 ID，默认为当前进程
+
+    Returns:
+        {"rss": ..., "pss": ..., "private": ...}，单位为字节
+    """
+    path = f"/proc/{pid or 'self'}/smaps_rollup"
+    usage = {"rss": 0, "pss": 0, "private": 0}
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                fields = value.split()
+                if not fields or not fields[0].isdigit():
+                    continue
+                size = int(fields[0]) * 1024
+                if key == "Rss":
+                    usage["rss"] = size
+                elif key == "Pss":
+                    usage["pss"] = size
+                elif key in ("Private_Clean", "Private_Dirty"):
+                    usage["private"] += size
+    except OSError:
+        # 非 Linux 平台退化为 ru_maxrss
+        import resource
+
+        usage["rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return usage
+
+
+def _worker_loop(task_queue, result_queue, stats_barrier):
+    """工作进程主循环"""
+    engine = _WORKER_ENGINE
+    # fork 出的副本继承父进程的随机状态，先重新播种，避免各进程生成相同的虚拟值
+    engine.reseed()
+    while True:
+        task = task_queue.get()
+        if task == _STOP:
+            break
+        if task == _STATS:
+            usage = read_memory_usage()
+            result_queue.put(("stats", os.getpid(), usage))
+            # 等待所有工作进程都领取到统计请求，保证每个进程恰好上报一次
+            stats_barrier.wait()
+            continue
+
+        generation, index, text = task
+        try:
+            # 每份文档独立的映射表与金额噪声系数
+            engine.consistency_provider.clear()
+            engine.amount_recognizer.reset_noise_factor()
+            result = engine.process(text)
+            result_queue.put(("result", generation, index, result, None))
+        except Exception as e:
+            result_queue.put(("result", generation, index, None, f"{type(e).__name__}: {e}"))
+
+
+class ForkWorkerPool:
+    """
+    共享模型的 fork 工作进程池
+
+    Example:
+        >>> with ForkWorkerPool(DeidentificationConfig(), processes=4) as pool:
+        ...     results = pool.map(texts)
+        ...     print(pool.memory_report())
+    """
+
+    def __init__(
+        self,
+        config: DeidentificationConfig,
+        processes: Optional[int] = None,
+        freeze_gc: bool = True,
+    ):
+        """
+        初始化工作进程池
+
+        Args:
+            config: 脱敏配置
+            processes: 工作进程数，默认为 CPU 核数
+            freeze_gc: fork 前是否执行 gc.freeze()
+        """
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise ValueError("ForkWorkerPool requires the 'fork' start method (Linux/macOS)")
+
+        self.config = config
+        self.processes = processes or os.cpu_count() or 1
+        self.freeze_gc = freeze_gc
+        self._context = multiprocessing.get_context("fork")
+        self._workers: List[multiprocessing.Process] = []
+        self._task_queue = None
+        self._result_queue = None
+        self._stats_barrier = None
+        # 每次 imap 调用的编号，用于丢弃提前停止迭代的调用遗留的结果
+        self._generation = 0
+
+    def start(self):
+        """在父进程中构建并预热引擎，然后 fork 工作进程"""
+        global _WORKER_ENGINE
+
+        if self._workers:
+            return
+
+        from contract_deid.core.snapshot import load_or_create_engine
+
+        engine = load_or_create_engine(self.config)
+        engine.warm_up()
+        _WORKER_ENGINE = engine
+
+        self._task_queue = self._context.Queue()
+        self._result_queue = self._context.Queue()
+        self._stats_barrier = self._context.Barrier(self.processes)
+
+        if self.freeze_gc:
+            gc.collect()
+            gc.freeze()
+
+        try:
+            for _ in range(self.processes):
+                worker = self._context.Process(
+                    target=_worker_loop,
+                    args=(self._task_queue, self._result_queue, self._stats_barrier),
+                    daemon=True,
+                )
+                worker.start()
+                self._workers.append(worker)
+        finally:
+            if self.freeze_gc:
+                gc.unfreeze()
+
+    def imap(self, texts: Iterable[str]) -> Iterator[DeidentificationResult]:
+        """
+        按输入顺序逐个返回脱敏结果
+
+        同时在途的任务数限制为工作进程数的两倍，输入可以是惰性迭代器。
+
+        Args:
+            texts: 待脱敏文本
+
+        Yields:
+            DeidentificationResult
+
+        Raises:
+            RuntimeError: 某个文本处理失败或工作进程意外退出时抛出
+        """
+        self.start()
+        self._generation += 1
+        generation = self._generation
+
+        max_in_flight = self.processes * 2
+        pending: Dict[int, tuple] = {}
+        next_to_yield = 0
+        submitted = 0
+        source = iter(texts)
+        exhausted = False
+
+        while True:
+            while not exhausted and submitted - next_to_yield < max_in_flight:
+                try:
+                    text = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                self._task_queue.put((generation, submitted, text))
+                submitted += 1
+
+            if exhausted and next_to_yield == submitted:
+                return
+
+            while next_to_yield not in pending:
+                message = self._get()
+                # 统计消息与之前调用遗留的结果直接丢弃
+                if message[0] == "result" and message[1] == generation:
+                    _, _, index, result, error = message
+                    pending[index] = (result, error)
+
+            result, error = pending.pop(next_to_yield)
+            next_to_yield += 1
+            if error is not None:
+                raise RuntimeError(f"Worker failed on item {next_to_yield - 1}: {error}")
+            yield result
+
+    def _get(self) -> tuple:
+        """
+        从结果队列取一条消息，等待期间检查工作进程是否存活
+
+        Raises:
+            RuntimeError: 有工作进程意外退出（如被 OOM killer 杀死）时终止进程池并抛出
+        """
+        while True:
+            try:
+                return self._result_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                dead = [worker for worker in self._workers if not worker.is_alive()]
+                if dead:
+                    codes = ", ".join(f"pid {worker.pid} exit code {worker.exitcode}" for worker in dead)
+                    self.terminate()
+                    raise RuntimeError(f"Worker process died ({codes}); pool terminated")
+
+    def map(self, texts: Iterable[str]) -> List[DeidentificationResult]:
+        """
+        批量脱敏，结果顺序与输入一致
+
+        Args:
+            texts: 待脱敏文本
+
+        Returns:
+            List[DeidentificationResult]
+        """
+        return list(self.imap(texts))
+
+    def memory_report(self) -> List[WorkerMemory]:
+        """
+        收集每个工作进程的内存占用
+
+        调用时不应有在途任务。
+
+        Returns:
+            List[WorkerMemory]，按 pid 排序
+        """
+        self.start()
+        for _ in self._workers:
+            self._task_queue.put(_STATS)
+
+        report = []
+        while len(report) < len(self._workers):
+            message = self._get()
+            if message[0] == "stats":
+                _, pid, usage = message
+                report.append(WorkerMemory(pid=pid, **usage))
+        return sorted(report, key=lambda item: item.pid)
+
+    def close(self):
+        """停止所有工作进程"""
+        global _WORKER_ENGINE
+
+        for _ in self._workers:
+            self._task_queue.put(_STOP)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        _WORKER_ENGINE = None
+
+    def terminate(self):
+        """立即终止所有工作进程（丢弃在途任务），之后可以重新 start"""
+        global _WORKER_ENGINE
+
+        for worker in self._workers:
+            worker.terminate()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        _WORKER_ENGINE = None
+
+    def __enter__(self) -> "ForkWorkerPool":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -6,9 +6,12 @@
 
 import re
 import random
-from typing import Tuple
+from typing import List, Tuple
 from presidio_analyzer import PatternRecognizer, Pattern, RecognizerResult
 
+from contract_deid.core.span import Span, to_recognizer_results
+from contract_deid.utils.chinese_numerals import parse_chinese_amount
+
 
 class AmountRecognizer(PatternRecognizer):
     """
@@ -17,28 +20,36 @@ class AmountRecognizer(PatternRecognizer):
     识别合同中的金额，支持多种格式：
     - 人民币 1,000,000 元
     - ¥1000000
-    - 100万元
-    - 壹佰万元整
+    - 100万元、1.5亿元
+    - 壹佰万元整、一百二十万元
     """
 
     PATTERNS = [
         Pattern(
             "AMOUNT_WITH_COMMA",
-            r"[¥￥]?\s*\d{1,3}(?:,\d{3})*(?:\.\d{2})?\s*[元整]?",
+            r"[¥￥]\s*\d+(?:,\d{3})*(?:\.\d{1,2})?(?:\s*元整?)?|\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?(?:\s*元整?)?",
             0.9,
         ),
         Pattern(
             "AMOUNT_SIMPLE",
-            r"\d+(?:\.\d{2})?\s*[万元]",
+            r"\d+(?:\.\d+)?\s*[千百]?[万亿]元?|\d+(?:\.\d{1,2})?\s*元整?",
             0.8,
         ),
         Pattern(
             "AMOUNT_CHINESE",
-            r"[零壹贰叁肆伍陆柒捌玖拾佰仟万亿]+[元整]?",
+            r"[零壹贰叁肆伍陆柒捌玖拾佰仟万亿]+(?:[元圆][零壹贰叁肆伍陆柒捌玖角分]*整?)?",
             0.7,
         ),
+        Pattern(
+            "AMOUNT_CHINESE_LOWER",
+            r"[〇零一二两三四五六七八九十百千万亿]+[元圆](?:[零一二三四五六七八九][角分])*整?",
+            0.6,
+        ),
     ]
 
+    # 前置条件（core.text_profile）：阿拉伯数字、大写中文数字，或小写中文数字加"元"
+    PREREQUISITES = (("digit",), ("upper_numeral",), ("lower_numeral", "yuan"))
+
     CONTEXT = [
         "金额",
         "价格",
@@ -66,9 +77,9 @@ class AmountRecognizer(PatternRecognizer):
         self.noise_range = noise_range
         self.noise_factor = random.uniform(*noise_range)
 
-    def analyze(self, text: str, entities=None, nlp_artifacts=None):
+    def analyze(self, text: str, entities=None, nlp_artifacts=None) -> List[RecognizerResult]:
         """
-        分析文本，识别金额
+        分析文本，识别金额（Presidio 接口）
 
         Args:
             text: 待分析文本
@@ -78,59 +89,42 @@ class AmountRecognizer(PatternRecognizer):
         Returns:
             识别结果列表
         """
-        results = []
+        return to_recognizer_results(self.find_spans(text))
+
+    def find_spans(self, text: str, entities=None) -> List[Span]:
+        """
+        识别金额，返回轻量的 Span（引擎内部使用）
+
+        Args:
+            text: 待分析文本
+            entities: 实体类型列表
+
+        Returns:
+            Span 列表
+        """
+        spans = []
 
         for pattern in self.PATTERNS:
-            matches = re.finditer(pattern.regex, text)
-            for match in matches:
-                amount_text = match.group()
+            for match in re.finditer(pattern.regex, text):
                 # 提取数字部分
-                numeric_value = self._extract_numeric_value(amount_text)
-                if numeric_value:
-                    results.append(
-                        RecognizerResult(
-                            entity_type="AMOUNT",
-                            start=match.start(),
-                            end=match.end(),
-                            score=pattern.score,
-                        )
-                    )
-
-        return results
+                if self._extract_numeric_value(match.group()):
+                    spans.append(Span("AMOUNT", match.start(), match.end(), pattern.score))
+
+        return spans
 
     def _extract_numeric_value(self, amount_text: str) -> float | None:
         """
         从金额文本中提取数值
 
         Args:
-            amount_text: 金额文本，如 "1,000,000 元" 或 "100万元"
+            amount_text: 金额文本，如 "1,000,000 元"、"100万元"、"1.5亿元" 或 "壹佰万元整"
 
         Returns:
             提取的数值，如果无法提取则返回 None
         """
-        # 移除货币符号和单位
-        cleaned = re.sub(r"[¥￥元整\s]", "", amount_text)
-
-        # 处理中文数字（如"壹佰万元"）
-        if re.search(r"[零壹贰叁肆伍陆柒捌玖拾佰仟万亿]", cleaned):
-            # TODO: 实现中文数字转阿拉伯数字
-            return None
-
-        # 处理带逗号的数字（如 "1,000,000"）
-        cleaned = cleaned.replace(",", "")
-
-        # 处理"万"单位（如 "100万元" -> 1000000）
-        if "万" in amount_text:
-            match = re.search(r"(\d+(?:\.\d+)?)", cleaned)
-            if match:
-                return float(match.group(1)) * 10000
-
-        # 提取纯数字
-        match = re.search(r"(\d+(?:\.\d+)?)", cleaned)
-        if match:
-            return float(match.group(1))
-
-        return None
+        # 移除货币符号和空白，中文数字与单位交给查表解析
+        value = parse_chinese_amount(re.sub(r"[¥￥\s]", "", amount_text))
+        return float(value) if value is not None else None
 
     def get_noise_factor(self) -> float:
         """
@@ -140,3 +134,13 @@ class AmountRecognizer(PatternRecognizer):
             噪声系数
         """
         return self.noise_factor
+
+    def reset_noise_factor(self) -> float:
+        """
+        重新生成噪声系数（同一引擎处理多份文档时，每份文档使用独立的系数）
+
+        Returns:
+            新的噪声系数
+        """
+        self.noise_factor = random.uniform(*self.noise_range)
+        return self.noise_factor
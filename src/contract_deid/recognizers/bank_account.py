@@ -38,6 +38,9 @@ class BankAccountRecognizer(PatternRecognizer):
         ),
     ]
 
+    # 前置条件（core.text_profile）
+    PREREQUISITES = (("digit",),)
+
     CONTEXT = [
         "银行账号",
         "银行卡号",
@@ -28,6 +28,9 @@ class CreditCodeRecognizer(PatternRecognizer):
         ),
     ]
 
+    # 前置条件（core.text_profile）：第 3-8 位必须是数字
+    PREREQUISITES = (("digit",),)
+
     CONTEXT = ["统一社会信用代码", "信用代码", "社会信用代码", "信用代码证"]
 
     def __init__(self):
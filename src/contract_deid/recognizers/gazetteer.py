@@ -0,0 +1,246 @@
+"""
+词典识别器（Gazetteer）
+
+将已知必须脱敏的名称（客户主数据中的公司名、签约人姓名等）编译为紧凑的
+Aho-Corasick 自动机文件，运行时通过 mmap 加载，对每份文档做一次线性扫描。
+
+文件布局（以 gazetteer.bin 为例）：
+- gazetteer.bin：编译好的自动机，mmap 加载
+- gazetteer.bin.tsv：构建时使用的名称列表（entity_type<TAB>name），用于重建
+- gazetteer.bin.delta.tsv：增量更新日志（+/-<TAB>entity_type<TAB>name），无需全量重建即可生效
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from presidio_analyzer import EntityRecognizer, RecognizerResult
+
+from contract_deid.core.span import Span, to_recognizer_results
+from contract_deid.utils.aho_corasick import AhoCorasick
+
+# 词典支持的实体类型，下标即自动机中的标签
+ENTITY_LABELS = ["ORGANIZATION", "PERSON"]
+
+
+def _read_entries(path: Path) -> List[Tuple[str, str]]:
+    """读取 entity_type<TAB>name 格式的名称列表"""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            entity_type, _, name = line.partition("\t")
+            if name:
+                entries.append((entity_type, name))
+    return entries
+
+
+def build_gazetteer(entries: Iterable[Tuple[str, str]], path: str) -> AhoCorasick:
+    """
+    构建词典文件
+
+    Args:
+        entries: (entity_type, name) 列表，entity_type 取值见 ENTITY_LABELS
+        path: 输出的自动机文件路径
+
+    Returns:
+        构建好的自动机
+    """
+    names: Dict[str, str] = {}
+    for entity_type, name in entries:
+        if entity_type not in ENTITY_LABELS:
+            raise ValueError(f"Unsupported gazetteer entity type: {entity_type}")
+        name = name.strip()
+        if name:
+            names.setdefault(name, entity_type)
+
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    automaton = AhoCorasick.build(
+        names.keys(), labels=[ENTITY_LABELS.index(t) for t in names.values()]
+    )
+    automaton.save(str(target))
+    with open(f"{target}.tsv", "w", encoding="utf-8") as f:
+        for name, entity_type in names.items():
+            f.write(f"{entity_type}\t{name}\n")
+
+    # 全量重建后增量日志已合并，清空
+    delta = Path(f"{target}.delta.tsv")
+    if delta.exists():
+        delta.unlink()
+    return automaton
+
+
+class GazetteerRecognizer(EntityRecognizer):
+    """
+    词典识别器：识别已知的组织机构和人名
+    """
+
+    def __init__(self, path: Optional[str] = None, score: float = 0.95):
+        """
+        初始化词典识别器
+
+        Args:
+            path: 词典自动机文件路径（由 build_gazetteer 生成）
+            score: 命中结果的置信度
+        """
+        self.path = path
+        self.score = score
+        self._base: Optional[AhoCorasick] = None
+        self._delta: Optional[AhoCorasick] = None
+        self._added: Dict[str, str] = {}
+        self._removed: Set[str] = set()
+
+        # EntityRecognizer.__init__ 会调用 load()
+        super().__init__(supported_entities=list(ENTITY_LABELS), name="GazetteerRecognizer")
+
+    def load(self):
+        """通过 mmap 加载词典，并回放增量更新日志"""
+        if not self.path:
+            return
+        self._base = AhoCorasick.load(self.path)
+
+        delta = Path(f"{self.path}.delta.tsv")
+        if delta.exists():
+            with open(delta, "r", encoding="utf-8") as f:
+                for line in f:
+                    op, _, rest = line.rstrip("\n").partition("\t")
+                    entity_type, _, name = rest.partition("\t")
+                    if op == "+":
+                        self._apply_add(name, entity_type)
+                    elif op == "-":
+                        self._apply_remove(name)
+            self._rebuild_delta()
+
+    def _apply_add(self, name: str, entity_type: str):
+        self._added[name] = entity_type
+        self._removed.discard(name)
+
+    def _apply_remove(self, name: str):
+        self._added.pop(name, None)
+        self._removed.add(name)
+
+    def _rebuild_delta(self):
+        """只重建增量部分的小自动机"""
+        if self._added:
+            self._delta = AhoCorasick.build(
+                self._added.keys(), labels=[ENTITY_LABELS.index(t) for t in self._added.values()]
+            )
+        else:
+            self._delta = None
+
+    def _append_log(self, lines: List[str]):
+        if self.path:
+            with open(f"{self.path}.delta.tsv", "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    def add(self, names: Iterable[str], entity_type: str = "ORGANIZATION", persist: bool = True):
+        """
+        增量添加名称（无需全量重建）
+
+        Args:
+            names: 名称列表
+            entity_type: 实体类型，取值见 ENTITY_LABELS
+            persist: 是否写入增量日志，使后续加载也生效
+        """
+        if entity_type not in ENTITY_LABELS:
+            raise ValueError(f"Unsupported gazetteer entity type: {entity_type}")
+        names = [name.strip() for name in names if name.strip()]
+        for name in names:
+            self._apply_add(name, entity_type)
+        self._rebuild_delta()
+        if persist:
+            self._append_log([f"+\t{entity_type}\t{name}\n" for name in names])
+
+    def remove(self, names: Iterable[str], persist: bool = True):
+        """
+        增量移除名称（以墓碑方式屏蔽，无需全量重建）
+
+        Args:
+            names: 名称列表
+            persist: 是否写入增量日志
+        """
+        names = [name.strip() for name in names if name.strip()]
+        for name in names:
+            self._apply_remove(name)
+        self._rebuild_delta()
+        if persist:
+            self._append_log([f"-\t\t{name}\n" for name in names])
+
+    def compact(self):
+        """将增量日志合并进主词典并全量重建"""
+        if not self.path:
+            raise ValueError("compact() requires a gazetteer file path")
+        entries = [
+            (entity_type, name)
+            for entity_type, name in _read_entries(Path(f"{self.path}.tsv"))
+            if name not in self._removed and name not in self._added
+        ]
+        entries.extend((entity_type, name) for name, entity_type in self._added.items())
+        self._base = None
+        build_gazetteer(entries, self.path)
+        self._added.clear()
+        self._removed.clear()
+        self.load()
+
+    def analyze(self, text: str, entities: List[str] = None, nlp_artifacts=None) -> List[RecognizerResult]:
+        """
+        扫描文本，返回词典命中结果（Presidio 接口）
+
+        Args:
+            text: 待分析文本
+            entities: 实体类型列表
+            nlp_artifacts: NLP 分析结果
+
+        Returns:
+            识别结果列表
+        """
+        return to_recognizer_results(self.find_spans(text, entities))
+
+    def find_spans(self, text: str, entities: List[str] = None) -> List[Span]:
+        """
+        扫描文本，返回词典命中的 Span（互不重叠的最左最长匹配，引擎内部使用）
+
+        Args:
+            text: 待分析文本
+            entities: 实体类型列表
+
+        Returns:
+            Span 列表
+        """
+        matches = []
+        for automaton in (self._base, self._delta):
+            if automaton is None:
+                continue
+            for start, end, pattern_id in automaton.iter_matches(text):
+                matches.append((start, end, automaton.label(pattern_id)))
+
+        # 合并主词典与增量词典的命中，选取最左最长且未被移除的匹配
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        results = []
+        last_end = 0
+        for start, end, label in matches:
+            if start < last_end:
+                continue
+            if self._removed and text[start:end] in self._removed:
+                continue
+            entity_type = ENTITY_LABELS[label]
+            if entities and entity_type not in entities:
+                continue
+            results.append(Span(entity_type, start, end, self.score))
+            last_end = end
+        return results
+
+    def __getstate__(self):
+        """从文件加载的自动机不随对象序列化，恢复时重新 mmap"""
+        state = self.__dict__.copy()
+        if self.path:
+            state["_base"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.path and self._base is None:
+            self._base = AhoCorasick.load(self.path)
@@ -30,6 +30,9 @@ class IdCardRecognizer(PatternRecognizer):
         ),
     ]
 
+    # 前置条件（core.text_profile）
+    PREREQUISITES = (("digit",),)
+
     CONTEXT = ["身份证", "身份证号", "身份证号码", "身份证明", "证件号码"]
 
     def __init__(self):
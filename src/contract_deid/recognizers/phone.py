@@ -8,6 +8,8 @@ import re
 from typing import List
 from presidio_analyzer import PatternRecognizer, Pattern, RecognizerResult
 
+from contract_deid.core.span import Span, to_recognizer_results
+
 
 class PhoneRecognizer(PatternRecognizer):
     """
@@ -41,6 +43,9 @@ class PhoneRecognizer(PatternRecognizer):
         ),
     ]
 
+    # 前置条件（core.text_profile）：号码需要数字，邮箱需要 "@"
+    PREREQUISITES = (("digit",), ("at",))
+
     PHONE_CONTEXT = ["电话", "手机", "联系电话", "手机号", "手机号码", "座机", "固话"]
     EMAIL_CONTEXT = ["邮箱", "电子邮件", "Email", "E-mail", "电子邮箱"]
 
@@ -57,9 +62,9 @@ class PhoneRecognizer(PatternRecognizer):
             context=self.PHONE_CONTEXT + self.EMAIL_CONTEXT,
         )
 
-    def analyze(self, text: str, entities: List[str] = None, nlp_artifacts=None):
+    def analyze(self, text: str, entities: List[str] = None, nlp_artifacts=None) -> List[RecognizerResult]:
         """
-        分析文本，识别电话和邮箱
+        分析文本，识别电话和邮箱（Presidio 接口）
 
         Args:
             text: 待分析文本
@@ -69,45 +74,29 @@ class PhoneRecognizer(PatternRecognizer):
         Returns:
             识别结果列表
         """
-        results = []
-
-        # 识别手机号
-        for pattern in self.PHONE_PATTERNS:
-            matches = re.finditer(pattern.regex, text)
-            for match in matches:
-                results.append(
-                    RecognizerResult(
-                        entity_type="PHONE_NUMBER",
-                        start=match.start(),
-                        end=match.end(),
-                        score=pattern.score,
-                    )
-                )
-
-        # 识别固定电话
-        for pattern in self.LANDLINE_PATTERNS:
-            matches = re.finditer(pattern.regex, text)
-            for match in matches:
-                results.append(
-                    RecognizerResult(
-                        entity_type="PHONE_NUMBER",
-                        start=match.start(),
-                        end=match.end(),
-                        score=pattern.score,
-                    )
-                )
+        return to_recognizer_results(self.find_spans(text))
+
+    def find_spans(self, text: str, entities: List[str] = None) -> List[Span]:
+        """
+        识别电话和邮箱，返回轻量的 Span（引擎内部使用）
+
+        Args:
+            text: 待分析文本
+            entities: 实体类型列表
+
+        Returns:
+            Span 列表
+        """
+        spans = []
+
+        # 识别手机号和固定电话
+        for pattern in self.PHONE_PATTERNS + self.LANDLINE_PATTERNS:
+            for match in re.finditer(pattern.regex, text):
+                spans.append(Span("PHONE_NUMBER", match.start(), match.end(), pattern.score))
 
         # 识别邮箱
         for pattern in self.EMAIL_PATTERNS:
-            matches = re.finditer(pattern.regex, text)
-            for match in matches:
-                results.append(
-                    RecognizerResult(
-                        entity_type="EMAIL",
-                        start=match.start(),
-                        end=match.end(),
-                        score=pattern.score,
-                    )
-                )
-
-        return results
+            for match in re.finditer(pattern.regex, text):
+                spans.append(Span("EMAIL", match.start(), match.end(), pattern.score))
+
+        return spans
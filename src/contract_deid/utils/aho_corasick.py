@@ -0,0 +1,361 @@
+"""
+紧凑 Aho-Corasick 自动机
+
+一次线性扫描即可找出文本中所有模式串的出现位置，用于触发词门控、实体传播、
+词典识别和泄漏校验等场景。
+
+构建完成后，自动机被编译为若干扁平的 32 位整数数组（按状态排列的有序转移表、
+失败链接、输出链接等），既节省内存，又可以直接序列化为文件并通过 mmap 加载，
+多个进程共享同一份只读页面。
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+_MAGIC = b"CDEIDAC1"
+# magic, 状态数, 转移数, 模式数
+_HEADER = struct.Struct("<8sIII")
+
+# 匹配结果：(start, end, pattern_id)
+Match = Tuple[int, int, int]
+
+
+class AhoCorasick:
+    """
+    紧凑 Aho-Corasick 自动机
+
+    Example:
+        >>> automaton = AhoCorasick.build(["甲方", "有限公司"])
+        >>> list(automaton.iter_matches("甲方：某某有限公司"))
+        [(0, 2, 0), (5, 9, 1)]
+    """
+
+    def __init__(
+        self,
+        trans_offsets: Sequence[int],
+        trans_chars: Sequence[int],
+        trans_targets: Sequence[int],
+        fail: Sequence[int],
+        outputs: Sequence[int],
+        dict_links: Sequence[int],
+        depths: Sequence[int],
+        labels: Sequence[int],
+        backing: Optional[object] = None,
+    ):
+        """
+        通常不直接调用，请使用 build() 或 load()
+
+        Args:
+            trans_offsets: 每个状态在转移表中的起始下标（长度为状态数 + 1）
+            trans_chars: 转移字符（码位），每个状态内升序排列
+            trans_targets: 转移目标状态
+            fail: 失败链接
+            outputs: 状态对应的模式编号，非终止状态为 -1
+            dict_links: 沿失败链最近的终止状态，没有则为 -1
+            depths: 状态深度（即到达该状态的模式长度）
+            labels: 每个模式的标签
+            backing: 数组所引用的底层缓冲区（如 mmap），需要保持存活
+        """
+        self._trans_offsets = trans_offsets
+        self._trans_chars = trans_chars
+        self._trans_targets = trans_targets
+        self._fail = fail
+        self._outputs = outputs
+        self._dict_links = dict_links
+        self._depths = depths
+        self._labels = labels
+        self._backing = backing
+
+        # 根状态的转移最频繁，单独展开为字典
+        lo, hi = trans_offsets[0], trans_offsets[1]
+        self._root: Dict[int, int] = {
+            trans_chars[i]: trans_targets[i] for i in range(lo, hi)
+        }
+
+    @classmethod
+    def build(
+        cls,
+        patterns: Iterable[str],
+        labels: Optional[Iterable[int]] = None,
+    ) -> "AhoCorasick":
+        """
+        从模式串构建自动机
+
+        Args:
+            patterns: 模式串，空串会被忽略；重复的模式串保留第一次出现的编号
+            labels: 每个模式的整数标签（可选，默认为 0）
+
+        Returns:
+            AhoCorasick 实例
+        """
+        patterns = list(patterns)
+        label_list = list(labels) if labels is not None else [0] * len(patterns)
+        if len(label_list) != len(patterns):
+            raise ValueError("labels must have the same length as patterns")
+
+        # 1. 构建字典树
+        goto: List[Dict[int, int]] = [{}]
+        outputs = [-1]
+        depths = [0]
+        for pattern_id, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                code = ord(ch)
+                nxt = goto[state].get(code)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][code] = nxt
+                    goto.append({})
+                    outputs.append(-1)
+                    depths.append(depths[state] + 1)
+                state = nxt
+            if outputs[state] == -1:
+                outputs[state] = pattern_id
+
+        # 2. 广度优先计算失败链接与输出链接，同时确定新的状态编号
+        size = len(goto)
+        fail = [0] * size
+        dict_links = [-1] * size
+        order = [0]
+        queue = deque()
+        for child in goto[0].values():
+            queue.append(child)
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for code, child in goto[state].items():
+                queue.append(child)
+                f = fail[state]
+                while f and code not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(code, 0)
+                fail[child] = target if target != child else 0
+                link = fail[child]
+                dict_links[child] = link if outputs[link] != -1 else dict_links[link]
+
+        # 3. 按 BFS 顺序重新编号并编译为扁平数组
+        renumber = [0] * size
+        for new_id, old_id in enumerate(order):
+            renumber[old_id] = new_id
+
+        trans_offsets = array("I", [0])
+        trans_chars = array("I")
+        trans_targets = array("I")
+        new_fail = array("I")
+        new_outputs = array("i")
+        new_dict_links = array("i")
+        new_depths = array("I")
+        for old_id in order:
+            for code in sorted(goto[old_id]):
+                trans_chars.append(code)
+                trans_targets.append(renumber[goto[old_id][code]])
+            trans_offsets.append(len(trans_chars))
+            new_fail.append(renumber[fail[old_id]])
+            new_outputs.append(outputs[old_id])
+            link = dict_links[old_id]
+            new_dict_links.append(renumber[link] if link != -1 else -1)
+            new_depths.append(depths[old_id])
+
+        return cls(
+            trans_offsets,
+            trans_chars,
+            trans_targets,
+            new_fail,
+            new_outputs,
+            new_dict_links,
+            new_depths,
+            array("i", label_list),
+        )
+
+    @property
+    def num_states(self) -> int:
+        """状态数"""
+        return len(self._fail)
+
+    @property
+    def num_patterns(self) -> int:
+        """模式数"""
+        return len(self._labels)
+
+    def label(self, pattern_id: int) -> int:
+        """
+        获取模式的标签
+
+        Args:
+            pattern_id: 模式编号
+
+        Returns:
+            标签
+        """
+        return self._labels[pattern_id]
+
+    def _goto(self, state: int, code: int) -> int:
+        """查找转移，不存在时返回 -1"""
+        if state == 0:
+            return self._root.get(code, -1)
+        lo = self._trans_offsets[state]
+        hi = self._trans_offsets[state + 1]
+        if lo == hi:
+            return -1
+        i = bisect_left(self._trans_chars, code, lo, hi)
+        if i < hi and self._trans_chars[i] == code:
+            return self._trans_targets[i]
+        return -1
+
+    def iter_matches(self, text: str) -> Iterator[Match]:
+        """
+        线性扫描文本，返回所有（可能重叠的）匹配
+
+        Args:
+            text: 待扫描文本
+
+        Yields:
+            (start, end, pattern_id)，按 end 升序
+        """
+        fail = self._fail
+        outputs = self._outputs
+        dict_links = self._dict_links
+        depths = self._depths
+        goto = self._goto
+
+        state = 0
+        for position, ch in enumerate(text):
+            code = ord(ch)
+            while True:
+                nxt = goto(state, code)
+                if nxt != -1:
+                    state = nxt
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+
+            match_state = state if outputs[state] != -1 else dict_links[state]
+            while match_state > 0:
+                end = position + 1
+                yield end - depths[match_state], end, outputs[match_state]
+                match_state = dict_links[match_state]
+
+    def longest_matches(self, text: str) -> List[Match]:
+        """
+        返回互不重叠的最左最长匹配
+
+        Args:
+            text: 待扫描文本
+
+        Returns:
+            [(start, end, pattern_id), ...]，按 start 升序
+        """
+        matches = sorted(self.iter_matches(text), key=lambda m: (m[0], m[0] - m[1]))
+        selected: List[Match] = []
+        last_end = 0
+        for match in matches:
+            if match[0] >= last_end:
+                selected.append(match)
+                last_end = match[1]
+        return selected
+
+    def to_bytes(self) -> bytes:
+        """
+        序列化为紧凑的二进制格式（本机字节序）
+
+        Returns:
+            二进制数据
+        """
+        parts = [
+            _HEADER.pack(_MAGIC, self.num_states, len(self._trans_chars), self.num_patterns)
+        ]
+        for values, _ in self._arrays():
+            parts.append(values.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_buffer(cls, buffer, backing: Optional[object] = None) -> "AhoCorasick":
+        """
+        从二进制缓冲区构建自动机，数组直接引用缓冲区，不做拷贝
+
+        Args:
+            buffer: 支持缓冲区协议的对象（bytes、mmap 等）
+            backing: 需要随自动机一起保持存活的对象
+
+        Returns:
+            AhoCorasick 实例
+        """
+        if sys.byteorder != "little":
+            raise ValueError("Serialized automata are only supported on little-endian platforms")
+
+        view = memoryview(buffer)
+        magic, num_states, num_trans, num_patterns = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError("Not a serialized Aho-Corasick automaton")
+
+        lengths = [
+            (num_states + 1, "I"),  # trans_offsets
+            (num_trans, "I"),  # trans_chars
+            (num_trans, "I"),  # trans_targets
+            (num_states, "I"),  # fail
+            (num_states, "i"),  # outputs
+            (num_states, "i"),  # dict_links
+            (num_states, "I"),  # depths
+            (num_patterns, "i"),  # labels
+        ]
+        offset = _HEADER.size
+        arrays = []
+        for count, typecode in lengths:
+            arrays.append(view[offset : offset + count * 4].cast(typecode))
+            offset += count * 4
+        return cls(*arrays, backing=backing if backing is not None else buffer)
+
+    def save(self, path: str):
+        """
+        保存到文件
+
+        写入临时文件后原子替换，不影响正在 mmap 旧文件的其他进程。
+
+        Args:
+            path: 文件路径
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "AhoCorasick":
+        """
+        通过 mmap 加载自动机文件
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            AhoCorasick 实例（数组与文件页共享）
+        """
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(mapped, backing=mapped)
+
+    def _arrays(self):
+        """按序列化顺序返回所有数组及其类型码"""
+        return [
+            (self._trans_offsets, "I"),
+            (self._trans_chars, "I"),
+            (self._trans_targets, "I"),
+            (self._fail, "I"),
+            (self._outputs, "i"),
+            (self._dict_links, "i"),
+            (self._depths, "I"),
+            (self._labels, "i"),
+        ]
+
+    def __reduce__(self):
+        """序列化时转换为紧凑二进制，支持 pickle（如引擎快照）"""
+        return (AhoCorasick.from_buffer, (self.to_bytes(),))
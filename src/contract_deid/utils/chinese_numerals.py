@@ -0,0 +1,214 @@
+"""
+中文金额数字解析与格式化
+
+查表实现，支持：
+- 大写金额：壹佰万元整、壹万贰仟叁佰肆拾伍元陆角柒分
+- 小写中文数字：一百二十万元、三千五百元
+- 阿拉伯数字与单位混写：1.5亿元、3千万元、100万
+所有计算使用 Decimal，避免浮点误差导致大写/小写金额不一致。
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Optional
+
+# 数字
+DIGITS = {
+    "零": 0, "〇": 0,
+    "壹": 1, "一": 1,
+    "贰": 2, "二": 2, "两": 2,
+    "叁": 3, "三": 3,
+    "肆": 4, "四": 4,
+    "伍": 5, "五": 5,
+    "陆": 6, "六": 6,
+    "柒": 7, "七": 7,
+    "捌": 8, "八": 8,
+    "玖": 9, "九": 9,
+}
+
+# 节内单位
+SMALL_UNITS = {"拾": 10, "十": 10, "佰": 100, "百": 100, "仟": 1000, "千": 1000}
+
+# 节单位
+SECTION_UNITS = {"万": 10**4, "萬": 10**4, "亿": 10**8, "億": 10**8}
+
+# 小数单位
+FRACTION_UNITS = {"角": Decimal("0.1"), "分": Decimal("0.01")}
+
+# 元（整数部分结束）与可忽略的字符
+YUAN = set("元圆")
+IGNORED = set("整正 ")
+
+# 大写专用字符（用于判断原文风格）
+UPPERCASE_CHARS = set("壹贰叁肆伍陆柒捌玖拾佰仟")
+
+_UPPER_DIGITS = "零壹贰叁肆伍陆柒捌玖"
+_LOWER_DIGITS = "零一二三四五六七八九"
+_UPPER_UNITS = ("", "拾", "佰", "仟")
+_LOWER_UNITS = ("", "十", "百", "千")
+
+_ARABIC = set("0123456789.,")
+
+CENT = Decimal("0.01")
+
+
+def parse_chinese_amount(text: str) -> Optional[Decimal]:
+    """
+    解析中文金额（大写、小写或与阿拉伯数字混写）
+
+    Args:
+        text: 金额文本，如 "壹佰万元整"、"一百二十万元"、"1.5亿元"
+
+    Returns:
+        数值；无法解析或不含任何数字时返回 None
+    """
+    total = Decimal(0)
+    section = Decimal(0)
+    number = Decimal(0)
+    seen_digit = False
+    fraction = None
+    index = 0
+    length = len(text)
+    while index < length:
+        ch = text[index]
+        if ch in _ARABIC:
+            # 连续的阿拉伯数字作为一个数
+            end = index
+            while end < length and text[end] in _ARABIC:
+                end += 1
+            try:
+                number = Decimal(text[index:end].replace(",", ""))
+            except InvalidOperation:
+                return None
+            seen_digit = True
+            index = end
+            continue
+
+        if ch in DIGITS:
+            number = Decimal(DIGITS[ch])
+            seen_digit = True
+        elif ch in SMALL_UNITS:
+            # "十五" 中省略的 "一"
+            section += (number if number else 1) * SMALL_UNITS[ch]
+            number = Decimal(0)
+            seen_digit = True
+        elif ch in SECTION_UNITS:
+            unit = SECTION_UNITS[ch]
+            section += number
+            if unit > 10**4:
+                total = (total + section) * unit
+            else:
+                total += section * unit
+            section = Decimal(0)
+            number = Decimal(0)
+        elif ch in YUAN:
+            if fraction is not None:
+                return None
+            fraction = Decimal(0)
+            total += section + number
+            section = Decimal(0)
+            number = Decimal(0)
+        elif ch in FRACTION_UNITS:
+            if fraction is None:
+                fraction = Decimal(0)
+                total += section
+                section = Decimal(0)
+            fraction += number * FRACTION_UNITS[ch]
+            number = Decimal(0)
+        elif ch not in IGNORED:
+            return None
+        index += 1
+
+    if not seen_digit:
+        return None
+    if fraction is None:
+        return total + section + number
+    return total + fraction
+
+
+def _group_to_chinese(group: int, digits: str, units: tuple) -> str:
+    """把 1-9999 的数转换为中文（节内读法）"""
+    out = []
+    pending_zero = False
+    for position in (3, 2, 1, 0):
+        digit = group // 10**position % 10
+        if digit == 0:
+            pending_zero = bool(out)
+            continue
+        if pending_zero:
+            out.append(digits[0])
+            pending_zero = False
+        out.append(digits[digit] + units[position])
+    return "".join(out)
+
+
+def integer_to_chinese(value: int, uppercase: bool = True) -> str:
+    """
+    把非负整数转换为中文数字
+
+    Args:
+        value: 整数
+        uppercase: True 为大写（壹佰），False 为小写（一百）
+
+    Returns:
+        中文数字
+    """
+    digits = _UPPER_DIGITS if uppercase else _LOWER_DIGITS
+    units = _UPPER_UNITS if uppercase else _LOWER_UNITS
+    if value == 0:
+        return digits[0]
+
+    text = _integer_to_chinese(value, digits, units)
+    # 小写习惯读作 "十五" 而不是 "一十五"
+    if not uppercase and text.startswith("一十"):
+        text = text[1:]
+    return text
+
+
+def _integer_to_chinese(value: int, digits: str, units: tuple) -> str:
+    """
+    把正整数转换为中文
+
+    亿以上的部分递归表示为"若干亿"（如 1.2 万亿为 "壹万贰仟亿"），与 parse_chinese_amount 互逆。
+    """
+    for section, name in ((10**8, "亿"), (10**4, "万")):
+        if value >= section:
+            high, low = divmod(value, section)
+            text = _integer_to_chinese(high, digits, units) + name
+            if low:
+                # 低位不足该节的最高位时补 "零"，如 "壹亿零伍万"
+                text += (digits[0] if low < section // 10 else "") + _integer_to_chinese(low, digits, units)
+            return text
+    return _group_to_chinese(value, digits, units)
+
+
+def format_chinese_amount(value: Decimal, uppercase: bool = True, yuan: bool = True, zheng: bool = True) -> str:
+    """
+    把金额格式化为中文
+
+    Args:
+        value: 金额（按分四舍五入）
+        uppercase: 是否使用大写
+        yuan: 是否带 "元" 和角分
+        zheng: 没有角分时是否以 "整" 结尾
+
+    Returns:
+        中文金额，如 "壹佰零伍万元整"、"壹拾元零伍分"
+    """
+    value = value.quantize(CENT, rounding=ROUND_HALF_UP)
+    integer = int(value)
+    cents = int((value - integer) * 100)
+    text = integer_to_chinese(integer, uppercase)
+    if not yuan:
+        return text
+
+    digits = _UPPER_DIGITS if uppercase else _LOWER_DIGITS
+    jiao, fen = divmod(cents, 10)
+    # 不足一元时省略 "零元"，如 "伍角"
+    text = text + "元" if integer or not cents else ""
+    if jiao:
+        text += digits[jiao] + "角"
+    if fen:
+        text += (digits[0] if text and not jiao else "") + digits[fen] + "分"
+    if not cents and zheng:
+        text += "整"
+    return text
@@ -0,0 +1,77 @@
+"""
+原地改写
+
+保持偏移模式下虚拟值与原文等长，脱敏结果可以直接写回 bytearray 或 mmap 映射的输出文件，
+不需要重新拼接整份文本，也不需要原文/脱敏后坐标映射。
+"""
+
+import mmap
+from typing import Iterable, Iterator, List, Tuple, Union
+
+Buffer = Union[bytearray, mmap.mmap]
+
+
+def byte_offsets(text: str, positions: Iterable[int], encoding: str = "utf-8") -> Iterator[int]:
+    """
+    把递增的字符偏移转换为编码后的字节偏移
+
+    每次只编码相邻两个位置之间的片段，整体为一次线性扫描。
+
+    Args:
+        text: 文本
+        positions: 递增的字符偏移
+        encoding: 编码
+
+    Yields:
+        对应的字节偏移
+    """
+    char_pos = 0
+    byte_pos = 0
+    for position in positions:
+        byte_pos += len(text[char_pos:position].encode(encoding))
+        char_pos = position
+        yield byte_pos
+
+
+def patch_in_place(buffer: Buffer, replacements: Iterable[Tuple[int, int, bytes]]) -> int:
+    """
+    在缓冲区中原地写入等长的替换值
+
+    Args:
+        buffer: 可写的 bytearray 或 mmap
+        replacements: [(字节起始, 字节结束, 替换值)]，替换值必须与原片段等长
+
+    Returns:
+        写入的替换数
+    """
+    # 先整体校验再写入，避免校验失败时留下改写了一半的文件
+    replacements = list(replacements)
+    for start, end, value in replacements:
+        if len(value) != end - start:
+            raise ValueError(
+                f"Replacement for bytes {start}-{end} has length {len(value)}; "
+                "in-place output requires preserve_offsets with offset_unit='byte'"
+            )
+    for start, end, value in replacements:
+        buffer[start:end] = value
+    return len(replacements)
+
+
+def encode_replacements(
+    text: str, replacements: List[Tuple[int, int, str]], encoding: str = "utf-8"
+) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    把按位置排序的字符坐标替换转换为字节坐标替换
+
+    Args:
+        text: 原文
+        replacements: 按起始位置排序、互不重叠的 [(字符起始, 字符结束, 替换值)]
+        encoding: 编码
+
+    Yields:
+        (字节起始, 字节结束, 编码后的替换值)
+    """
+    positions = (position for start, end, _ in replacements for position in (start, end))
+    offsets = byte_offsets(text, positions, encoding)
+    for _, _, value in replacements:
+        yield next(offsets), next(offsets), value.encode(encoding)
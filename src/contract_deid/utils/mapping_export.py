@@ -4,18 +4,18 @@
 提供多种格式的映射表导出功能：
 - Python 字典
 - JSON 字符串
-- CSV 文件
+- CSV / JSONL 文件（可选 gzip/zstd 压缩，由 MappingWriter 流式写出）
 """
 
+import csv
+import io
 import json
 from dataclasses import dataclass, field
 from typing import Dict, Optional, Tuple
 from pathlib import Path
 
-try:
-    import pandas as pd
-except ImportError:
-    pd = None
+from contract_deid.utils.mapping_writer import FIELDNAMES, MappingWriter, detect_format
+from contract_deid.utils.span_table import SpanTable
 
 
 @dataclass
@@ -33,13 +33,59 @@ class DeidentificationConfig:
     # NER 启用
     enable_ner: bool = True
 
+    # NER 触发词门控：只对触发词附近的片段运行模型
+    ner_gating: bool = False
+    # 门控召回安全余量：触发词前后各保留的上下文字符数
+    ner_gate_margin: int = 64
+
+    # 文档内实体传播：将已识别的软实体标注到全文所有出现位置
+    enable_entity_propagation: bool = True
+    # NER 只处理文档的前 N 个字符（可选），其余出现位置依靠实体传播覆盖
+    ner_max_chars: Optional[int] = None
+
+    # 词典识别：已知组织机构/人名的词典文件（由 build_gazetteer 生成）
+    gazetteer_path: Optional[str] = None
+
+    # 第一层前置过滤：按文本字符类画像跳过不可能命中的识别器（如不含数字的段落跳过号码类识别器）
+    rule_prefilter: bool = True
+
+    # 执行模式：第一层与第二层并发执行（NER 前向计算会释放 GIL）
+    concurrent_layers: bool = False
+    # 分窗大小（字符数）：设置后第一层和第二层按窗口处理，并发模式下各窗口流水线执行
+    layer_window_size: Optional[int] = None
+
+    # 跨层冲突消解：实体类型与来源层优先级（覆盖 core.conflict 中的默认值，数值越大越优先）
+    conflict_type_priority: Optional[Dict[str, int]] = None
+    conflict_layer_priority: Optional[Dict[str, int]] = None
+
+    # 保持偏移：每个虚拟值与原文片段等长，原文与脱敏后文本坐标一致，支持原地改写输出文件
+    preserve_offsets: bool = False
+    # 等长的单位："char"（字符数）或 "byte"（UTF-8 字节数，原地改写 UTF-8 文件时需要）
+    offset_unit: str = "char"
+
     # LLM 润色（可选）
     enable_llm_refinement: bool = False
     llm_model_path: Optional[str] = None
+    # 润色输出模式："edits"（模型只返回编辑列表）或 "text"（逐段重写）
+    llm_refine_mode: str = "edits"
+
+    # LLM 响应缓存（可选）：LLM 实体抽取与润色共享的 SQLite 缓存文件
+    llm_cache_path: Optional[str] = None
+    # 缓存条目过期时间（秒），为 None 时永不过期
+    llm_cache_ttl: Optional[float] = None
+    # 缓存最大条目数，超出时淘汰最久未访问的条目
+    llm_cache_max_entries: int = 10000
 
     # 输出格式
     export_mapping_csv: bool = True
     mapping_file_path: Optional[str] = None
+    # 语料级映射表（可选）：每处理完一个文档即把映射追加写入该文件（.csv/.jsonl，可加 .gz/.zst）
+    mapping_stream_path: Optional[str] = None
+    # 当前文档标识，写入语料级映射表的 document 列
+    document_id: Optional[str] = None
+
+    # 引擎快照路径（可选）：设置后优先从快照恢复已预热的引擎
+    engine_snapshot_path: Optional[str] = None
 
 
 @dataclass
@@ -51,12 +97,19 @@ class DeidentificationResult:
     anonymized_text: str
     mapping: Dict[str, Dict[str, str]]
     config: DeidentificationConfig
+    # 每处替换的原文/脱敏后坐标、类型、置信度和来源层；LLM 润色新增的映射没有对应位置
+    spans: SpanTable = field(default_factory=SpanTable)
+    # 本文档跨层冲突消解的计数 {消解方式: 次数}
+    conflicts: Dict[str, int] = field(default_factory=dict)
 
     def __post_init__(self):
         """初始化后处理"""
         # 如果配置了保存路径，自动保存映射表
         if self.config.mapping_file_path:
             self.save_mapping(self.config.mapping_file_path)
+        # 如果配置了语料级映射表，追加写入本文档的映射
+        if self.config.mapping_stream_path:
+            self.append_mapping(self.config.mapping_stream_path, document=self.config.document_id)
 
     @property
     def mapping_json(self) -> str:
@@ -76,42 +129,52 @@ class DeidentificationResult:
         Returns:
             CSV 格式的映射表
         """
-        if pd is None:
-            raise ImportError("pandas is required for CSV export. Install it with: pip install pandas")
-
-        # 将嵌套字典转换为扁平列表
-        rows = []
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(FIELDNAMES)
         for entity_type, mappings in self.mapping.items():
             for original_value, anonymized_value in mappings.items():
-                rows.append(
-                    {
-                        "entity_type": entity_type,
-                        "original_value": original_value,
-                        "anonymized_value": anonymized_value,
-                    }
-                )
+                writer.writerow([entity_type, original_value, anonymized_value])
+        return buffer.getvalue()
+
+    def verify_leaks(self):
+        """
+        校验脱敏后的文本中是否残留原始值
+
+        Returns:
+            LeakReport: 泄漏校验报告
+        """
+        from contract_deid.core.leak_verifier import LeakVerifier
+
+        return LeakVerifier().verify(self.anonymized_text, self.mapping)
 
-        df = pd.DataFrame(rows)
-        return df.to_csv(index=False, encoding="utf-8-sig")
+    def append_mapping(self, file_path: str, document: Optional[str] = None):
+        """
+        将映射表追加写入语料级映射表文件（带 document 列）
+
+        Args:
+            file_path: 文件路径，支持 .csv 和 .jsonl 格式（可加 .gz 或 .zst 压缩）
+            document: 文档标识
+        """
+        with MappingWriter(file_path, append=True, include_document=True) as writer:
+            writer.write_mapping(self.mapping, document=document)
 
     def save_mapping(self, file_path: str):
         """
         保存映射表到文件
 
         Args:
-            file_path: 文件路径，支持 .json 和 .csv 格式
+            file_path: 文件路径，支持 .json、.csv 和 .jsonl 格式（.csv/.jsonl 可加 .gz 或 .zst 压缩）
         """
-        path = Path(file_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
-
-        if path.suffix.lower() == ".json":
+        file_format, compression = detect_format(file_path)
+        if file_format == ".json":
+            if compression:
+                raise ValueError("Compressed output is only supported for .csv and .jsonl mappings")
+            path = Path(file_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
             with open(path, "w", encoding="utf-8") as f:
                 json.dump(self.mapping, f, ensure_ascii=False, indent=2)
-        elif path.suffix.lower() == ".csv":
-            if pd is None:
-                raise ImportError("pandas is required for CSV export")
-            csv_content = self.mapping_csv
-            with open(path, "w", encoding="utf-8-sig") as f:
-                f.write(csv_content)
-        else:
-            raise ValueError(f"Unsupported file format: {path.suffix}. Use .json or .csv")
+            return
+
+        with MappingWriter(file_path) as writer:
+            writer.write_mapping(self.mapping)
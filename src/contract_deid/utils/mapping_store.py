@@ -0,0 +1,226 @@
+"""
+语料级列式映射表存储（Parquet）
+
+批量处理时把每个文档的映射行（文档、实体类型、原始值、虚拟值、偏移、置信度、来源层）
+累积为按实体类型分区的 Parquet 文件，每个行组大小有上限，内存占用与语料规模无关。
+结果目录可以直接用 pyarrow.dataset / DuckDB / pandas 查询，例如：
+
+    SELECT document, pseudonym FROM read_parquet('store/**/*.parquet', hive_partitioning = 1)
+    WHERE entity_type = 'ORGANIZATION' AND original = '腾讯科技（深圳）有限公司'
+
+需要安装 pyarrow：pip install pyarrow
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# 分区目录名中不允许出现的字符
+_UNSAFE_PARTITION = re.compile(r"[^0-9A-Za-z_\-]")
+
+# 列名（entity_type 由分区目录表示，不写入文件）
+COLUMNS = ["document", "original", "pseudonym", "start", "end", "score", "layer"]
+
+
+def _schema():
+    return pa.schema(
+        [
+            ("document", pa.string()),
+            ("original", pa.string()),
+            ("pseudonym", pa.string()),
+            # 没有出现位置的映射（如 LLM 润色新增）偏移、置信度、来源层为空值
+            ("start", pa.int32()),
+            ("end", pa.int32()),
+            ("score", pa.float32()),
+            ("layer", pa.dictionary(pa.int8(), pa.string())),
+        ]
+    )
+
+
+class _Partition:
+    """单个实体类型分区：列缓冲区 + 当前打开的 Parquet 文件"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.columns: Dict[str, list] = {name: [] for name in COLUMNS}
+        self.writer = None
+        self.file_rows = 0
+
+    def __len__(self) -> int:
+        return len(self.columns["document"])
+
+
+class ParquetMappingStore:
+    """
+    按实体类型分区的 Parquet 映射表存储
+
+    Example:
+        >>> with ParquetMappingStore("audit/mappings") as store:
+        ...     for path in paths:
+        ...         store.add(path.name, deidentify(path.read_text(), config=config))
+        >>> dataset = open_mapping_dataset("audit/mappings")
+    """
+
+    def __init__(
+        self,
+        root: str,
+        row_group_size: int = 65536,
+        max_rows_per_file: int = 4_000_000,
+        compression: str = "zstd",
+    ):
+        """
+        初始化存储
+
+        Args:
+            root: 存储根目录，按 entity_type=<类型>/part-<序号>.parquet 组织
+            row_group_size: 每个分区缓冲的行数上限，达到后写出一个行组
+            max_rows_per_file: 单个 Parquet 文件的行数上限，超出后开始新文件
+            compression: Parquet 列压缩算法
+        """
+        if pa is None:
+            raise ImportError("pyarrow is required for the Parquet mapping store. Install it with: pip install pyarrow")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = row_group_size
+        self.max_rows_per_file = max_rows_per_file
+        self.compression = compression
+        self.rows = 0
+        self._schema = _schema()
+        self._partitions: Dict[str, _Partition] = {}
+
+    def _partition(self, entity_type: str) -> _Partition:
+        partition = self._partitions.get(entity_type)
+        if partition is None:
+            name = _UNSAFE_PARTITION.sub("_", entity_type)
+            partition = _Partition(self.root / f"entity_type={name}")
+            self._partitions[entity_type] = partition
+        return partition
+
+    def add_row(
+        self,
+        document: str,
+        entity_type: str,
+        original: str,
+        pseudonym: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        score: Optional[float] = None,
+        layer: Optional[str] = None,
+    ):
+        """
+        追加一行映射
+
+        Args:
+            document: 文档标识
+            entity_type: 实体类型
+            original: 原始值
+            pseudonym: 虚拟值
+            start: 原文起始偏移
+            end: 原文结束偏移
+            score: 识别置信度
+            layer: 来源层
+        """
+        partition = self._partition(entity_type)
+        columns = partition.columns
+        columns["document"].append(document)
+        columns["original"].append(original)
+        columns["pseudonym"].append(pseudonym)
+        columns["start"].append(start)
+        columns["end"].append(end)
+        columns["score"].append(score)
+        columns["layer"].append(layer)
+        self.rows += 1
+        if len(partition) >= self.row_group_size:
+            self._flush_partition(partition)
+
+    def add(self, document: str, result) -> int:
+        """
+        追加一个文档的脱敏结果
+
+        有出现位置的映射逐个位置写一行；没有出现位置的映射（如 LLM 润色新增）写一行，
+        偏移、置信度和来源层都为空值（映射表本身不记录来源层）。
+
+        Args:
+            document: 文档标识
+            result: DeidentificationResult
+
+        Returns:
+            写入的行数
+        """
+        before = self.rows
+        located = set()
+        for span in result.spans:
+            pseudonym = result.mapping.get(span.entity_type, {}).get(span.original)
+            if pseudonym is None:
+                continue
+            located.add((span.entity_type, span.original))
+            self.add_row(
+                document, span.entity_type, span.original, pseudonym,
+                span.orig_start, span.orig_end, span.score, span.layer,
+            )
+        for entity_type, values in result.mapping.items():
+            for original, pseudonym in values.items():
+                if (entity_type, original) not in located:
+                    self.add_row(document, entity_type, original, pseudonym)
+        return self.rows - before
+
+    def _flush_partition(self, partition: _Partition):
+        """把分区缓冲区写出为一个行组"""
+        if not len(partition):
+            return
+        table = pa.Table.from_pydict(partition.columns, schema=self._schema)
+        if partition.writer is None or partition.file_rows >= self.max_rows_per_file:
+            if partition.writer is not None:
+                partition.writer.close()
+            partition.directory.mkdir(parents=True, exist_ok=True)
+            # 续写已有目录时从下一个序号开始，不覆盖之前批次的文件
+            index = len(list(partition.directory.glob("part-*.parquet")))
+            path = partition.directory / f"part-{index:05d}.parquet"
+            partition.writer = pq.ParquetWriter(str(path), self._schema, compression=self.compression)
+            partition.file_rows = 0
+        partition.writer.write_table(table, row_group_size=self.row_group_size)
+        partition.file_rows += len(partition)
+        partition.columns = {name: [] for name in COLUMNS}
+
+    def flush(self):
+        """写出所有分区缓冲的行"""
+        for partition in self._partitions.values():
+            self._flush_partition(partition)
+
+    def close(self):
+        """写出缓冲区并关闭所有文件"""
+        self.flush()
+        for partition in self._partitions.values():
+            if partition.writer is not None:
+                partition.writer.close()
+                partition.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_mapping_dataset(root: str):
+    """
+    以 pyarrow Dataset 打开映射表存储（entity_type 作为分区列）
+
+    Args:
+        root: 存储根目录
+
+    Returns:
+        pyarrow.dataset.Dataset
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for the Parquet mapping store. Install it with: pip install pyarrow")
+    import pyarrow.dataset as ds
+
+    return ds.dataset(root, format="parquet", partitioning="hive")
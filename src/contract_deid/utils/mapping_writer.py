@@ -0,0 +1,166 @@
+"""
+流式映射表写入
+
+使用标准库直接逐行写出 CSV / JSONL，不构建中间 DataFrame 或整表字符串。
+支持追加写入语料级映射表文件，以及 gzip（.gz）和 zstd（.zst，需要 zstandard）压缩输出。
+"""
+
+import csv
+import gzip
+import io
+import json
+from pathlib import Path
+from typing import IO, Dict, Iterable, Optional, Tuple
+
+# 映射表列
+FIELDNAMES = ["entity_type", "original_value", "anonymized_value"]
+DOCUMENT_FIELD = "document"
+
+_FORMATS = (".csv", ".jsonl", ".json")
+_COMPRESSIONS = (".gz", ".zst")
+
+
+def detect_format(path: str) -> Tuple[str, Optional[str]]:
+    """
+    根据文件后缀判断格式与压缩方式
+
+    Args:
+        path: 文件路径，如 mapping.csv、corpus.jsonl.gz、corpus.csv.zst
+
+    Returns:
+        (格式后缀, 压缩后缀或 None)
+    """
+    suffixes = [s.lower() for s in Path(path).suffixes]
+    compression = suffixes.pop() if suffixes and suffixes[-1] in _COMPRESSIONS else None
+    file_format = suffixes[-1] if suffixes else ""
+    if file_format not in _FORMATS:
+        raise ValueError(f"Unsupported file format: {path}. Use .json, .csv or .jsonl (optionally .gz/.zst)")
+    return file_format, compression
+
+
+def open_text(path: str, mode: str = "w", compression: Optional[str] = None) -> IO[str]:
+    """
+    打开（可能压缩的）文本文件
+
+    Args:
+        path: 文件路径
+        mode: "w"（覆盖）或 "a"（追加）；压缩文件追加时写入新的压缩帧
+        compression: None、".gz" 或 ".zst"
+
+    Returns:
+        文本文件对象
+    """
+    if compression == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    if compression == ".zst":
+        try:
+            import zstandard  # type: ignore
+        except ImportError:
+            raise ImportError("zstandard is required for .zst output. Install it with: pip install zstandard")
+        raw = open(path, mode + "b")
+        writer = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(writer, encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+class MappingWriter:
+    """
+    流式映射表写入器
+
+    Example:
+        >>> with MappingWriter("corpus_mapping.csv.gz", append=True, include_document=True) as writer:
+        ...     writer.write_mapping(result.mapping, document="contract_001.txt")
+    """
+
+    def __init__(self, path: str, append: bool = False, include_document: bool = False):
+        """
+        初始化写入器
+
+        Args:
+            path: 输出路径，后缀决定格式（.csv / .jsonl）与压缩方式（.gz / .zst）
+            append: 是否追加到已有文件（CSV 只在新文件中写表头）
+            include_document: 是否输出 document 列（语料级映射表）
+        """
+        self.path = path
+        self.format, self.compression = detect_format(path)
+        if self.format == ".json":
+            raise ValueError("MappingWriter streams rows; use .csv or .jsonl instead of .json")
+        self.include_document = include_document
+        self.rows = 0
+
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not append or not target.exists() or target.stat().st_size == 0
+        self._file = open_text(path, "a" if append else "w", self.compression)
+
+        fieldnames = ([DOCUMENT_FIELD] if include_document else []) + FIELDNAMES
+        self._csv = None
+        if self.format == ".csv":
+            if is_new and self.compression is None:
+                # 未压缩的 CSV 带 BOM，便于 Excel 正确识别编码
+                self._file.write("\ufeff")
+            self._csv = csv.writer(self._file, lineterminator="\n")
+            if is_new:
+                self._csv.writerow(fieldnames)
+
+    def write(self, entity_type: str, original_value: str, anonymized_value: str, document: Optional[str] = None):
+        """
+        写入一行映射
+
+        Args:
+            entity_type: 实体类型
+            original_value: 原始值
+            anonymized_value: 替换值
+            document: 文档标识（include_document 为 True 时写入）
+        """
+        if self._csv is not None:
+            row = [entity_type, original_value, anonymized_value]
+            if self.include_document:
+                row.insert(0, document or "")
+            self._csv.writerow(row)
+        else:
+            record = {
+                "entity_type": entity_type,
+                "original_value": original_value,
+                "anonymized_value": anonymized_value,
+            }
+            if self.include_document:
+                record = {DOCUMENT_FIELD: document, **record}
+            self._file.write(json.dumps(record, ensure_ascii=False))
+            self._file.write("\n")
+        self.rows += 1
+
+    def write_mapping(self, mapping: Dict[str, Dict[str, str]], document: Optional[str] = None):
+        """
+        写入整个映射表
+
+        Args:
+            mapping: {entity_type: {original: anonymized}}
+            document: 文档标识
+        """
+        for entity_type, values in mapping.items():
+            for original_value, anonymized_value in values.items():
+                self.write(entity_type, original_value, anonymized_value, document)
+
+    def write_rows(self, rows: Iterable[Tuple[str, str, str]], document: Optional[str] = None):
+        """
+        写入 (entity_type, original, anonymized) 行序列
+
+        Args:
+            rows: 行序列
+            document: 文档标识
+        """
+        for entity_type, original_value, anonymized_value in rows:
+            self.write(entity_type, original_value, anonymized_value, document)
+
+    def close(self):
+        """关闭文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
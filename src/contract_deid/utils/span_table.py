@@ -0,0 +1,237 @@
+"""
+实体位置表（Span Table）
+
+以并行数组（array 模块）存储每处替换的原文坐标、脱敏后坐标、实体类型、置信度和来源层，
+避免为每个实体保留一个对象。下游的标注投影和审计可以直接按位置取值，不必重新搜索文本。
+序列化为一段紧凑的二进制（JSON 头 + 原始数组字节），可选转换为 NumPy 数组。
+"""
+
+import json
+import struct
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Sequence, Tuple
+
+# 来源层编码
+LAYERS = ("rule", "ner", "propagation", "llm")
+
+# 数组字段及其类型码：坐标为 int32，置信度为 float32，类型/来源层/原始值为编号
+_ARRAYS = (
+    ("orig_start", "i"),
+    ("orig_end", "i"),
+    ("anon_start", "i"),
+    ("anon_end", "i"),
+    ("type_id", "H"),
+    ("value_id", "I"),
+    ("score", "f"),
+    ("layer_id", "B"),
+)
+
+_MAGIC = b"CDSPAN1\n"
+
+
+class SpanRow(NamedTuple):
+    """单条记录的只读视图"""
+
+    entity_type: str
+    original: str
+    orig_start: int
+    orig_end: int
+    anon_start: int
+    anon_end: int
+    score: float
+    layer: str
+
+
+class SpanTable:
+    """
+    并行数组形式的实体位置表
+
+    脱敏后坐标为 -1 表示该位置已被第四层整段改写，无法再定位。
+
+    Example:
+        >>> for row in result.spans:
+        ...     print(row.entity_type, row.orig_start, row.anon_start)
+        >>> data = result.spans.to_bytes()
+        >>> spans = SpanTable.from_bytes(data)
+    """
+
+    def __init__(self):
+        """初始化空表"""
+        self.orig_start = array("i")
+        self.orig_end = array("i")
+        self.anon_start = array("i")
+        self.anon_end = array("i")
+        self.type_id = array("H")
+        self.value_id = array("I")
+        self.score = array("f")
+        self.layer_id = array("B")
+        # 实体类型与原始值按编号去重存储
+        self.types: List[str] = []
+        self.values: List[str] = []
+        self._type_index: Dict[str, int] = {}
+        self._value_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.orig_start)
+
+    def __iter__(self) -> Iterator[SpanRow]:
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def append(
+        self,
+        entity_type: str,
+        original: str,
+        orig_start: int,
+        orig_end: int,
+        anon_start: int,
+        anon_end: int,
+        score: float,
+        layer: str = "rule",
+    ):
+        """
+        追加一条记录
+
+        Args:
+            entity_type: 实体类型
+            original: 原始值
+            orig_start: 原文起始偏移
+            orig_end: 原文结束偏移
+            anon_start: 脱敏后文本起始偏移
+            anon_end: 脱敏后文本结束偏移
+            score: 识别置信度
+            layer: 来源层（rule / ner / propagation / llm）
+        """
+        type_id = self._type_index.get(entity_type)
+        if type_id is None:
+            type_id = self._type_index[entity_type] = len(self.types)
+            self.types.append(entity_type)
+        value_id = self._value_index.get(original)
+        if value_id is None:
+            value_id = self._value_index[original] = len(self.values)
+            self.values.append(original)
+
+        self.orig_start.append(orig_start)
+        self.orig_end.append(orig_end)
+        self.anon_start.append(anon_start)
+        self.anon_end.append(anon_end)
+        self.type_id.append(type_id)
+        self.value_id.append(value_id)
+        self.score.append(score)
+        self.layer_id.append(LAYERS.index(layer) if layer in LAYERS else 0)
+
+    def row(self, index: int) -> SpanRow:
+        """
+        获取第 index 条记录
+
+        Args:
+            index: 记录序号
+
+        Returns:
+            SpanRow
+        """
+        return SpanRow(
+            self.types[self.type_id[index]],
+            self.values[self.value_id[index]],
+            self.orig_start[index],
+            self.orig_end[index],
+            self.anon_start[index],
+            self.anon_end[index],
+            self.score[index],
+            LAYERS[self.layer_id[index]],
+        )
+
+    def apply_changes(self, changes: Sequence[Tuple[int, int, int]]):
+        """
+        文本在替换之后又被修改时（第四层润色），同步调整脱敏后坐标
+
+        Args:
+            changes: 按起始位置排序、互不重叠的修改 [(start, end, 新长度), ...]，坐标基于修改前的文本；
+                     与修改区域重叠的记录坐标置为 -1
+        """
+        if not changes:
+            return
+        order = sorted(range(len(self)), key=self.anon_start.__getitem__)
+        shift = 0
+        cursor = 0
+        for index in order:
+            start, end = self.anon_start[index], self.anon_end[index]
+            if start < 0:
+                continue
+            # 累加完全位于当前记录之前的修改带来的位移
+            while cursor < len(changes) and changes[cursor][1] <= start:
+                change_start, change_end, new_length = changes[cursor]
+                shift += new_length - (change_end - change_start)
+                cursor += 1
+            if cursor < len(changes) and changes[cursor][0] < end:
+                self.anon_start[index] = self.anon_end[index] = -1
+            else:
+                self.anon_start[index] = start + shift
+                self.anon_end[index] = end + shift
+
+    def to_bytes(self) -> bytes:
+        """
+        序列化为二进制：魔数 + JSON 头长度 + JSON 头（类型表、原始值表）+ 各数组原始字节
+
+        Returns:
+            bytes
+        """
+        header = json.dumps(
+            {"count": len(self), "types": self.types, "values": self.values},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        parts = [_MAGIC, struct.pack("<I", len(header)), header]
+        for name, _ in _ARRAYS:
+            parts.append(getattr(self, name).tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SpanTable":
+        """
+        从 to_bytes() 的输出恢复
+
+        Args:
+            data: 二进制数据
+
+        Returns:
+            SpanTable
+        """
+        if not data.startswith(_MAGIC):
+            raise ValueError("Not a span table")
+        offset = len(_MAGIC)
+        (header_length,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        header = json.loads(data[offset : offset + header_length].decode("utf-8"))
+        offset += header_length
+
+        table = cls()
+        table.types = header["types"]
+        table.values = header["values"]
+        table._type_index = {name: index for index, name in enumerate(table.types)}
+        table._value_index = {value: index for index, value in enumerate(table.values)}
+        count = header["count"]
+        for name, typecode in _ARRAYS:
+            column = array(typecode)
+            size = column.itemsize * count
+            column.frombytes(data[offset : offset + size])
+            offset += size
+            setattr(table, name, column)
+        return table
+
+    def __reduce__(self):
+        """pickle 时使用紧凑的二进制格式"""
+        return (SpanTable.from_bytes, (self.to_bytes(),))
+
+    def to_numpy(self) -> Dict[str, "object"]:
+        """
+        转换为 NumPy 数组字典（零拷贝视图，需要 numpy）
+
+        Returns:
+            {字段名: numpy.ndarray}
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("numpy is required for to_numpy(). Install it with: pip install numpy")
+        return {name: np.frombuffer(getattr(self, name), dtype=np.dtype(typecode)) for name, typecode in _ARRAYS}
+
@@ -0,0 +1,69 @@
+"""
+文本分窗工具
+
+将长文本切分为不超过指定长度的窗口，尽量在换行或句末标点处断开，
+避免把一个实体切到两个窗口中。
+"""
+
+from typing import List, Tuple
+
+# 优先作为窗口边界的字符（按优先级从高到低）
+DEFAULT_BOUNDARIES = ("\n", "。", "；", ";", "！", "？", "，")
+
+
+def split_windows(
+    text: str,
+    window_size: int,
+    boundaries: Tuple[str, ...] = DEFAULT_BOUNDARIES,
+) -> List[Tuple[int, int]]:
+    """
+    将文本切分为首尾相接、互不重叠的窗口
+
+    Args:
+        text: 待切分的文本
+        window_size: 窗口最大长度（字符数）
+        boundaries: 可作为断点的字符，按优先级排列
+
+    Returns:
+        [(start, end), ...]，覆盖整个文本
+    """
+    if window_size <= 0:
+        raise ValueError(f"window_size must be positive, got {window_size}")
+
+    windows = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + window_size, length)
+        if end < length:
+            end = find_boundary(text, start, end, boundaries)
+        windows.append((start, end))
+        start = end
+    return windows
+
+
+def find_boundary(
+    text: str,
+    start: int,
+    end: int,
+    boundaries: Tuple[str, ...] = DEFAULT_BOUNDARIES,
+) -> int:
+    """
+    在 text[start:end] 中寻找最靠后的断点
+
+    Args:
+        text: 文本
+        start: 搜索起点
+        end: 搜索终点（不含）
+        boundaries: 可作为断点的字符，按优先级排列
+
+    Returns:
+        断点位置（断点字符之后）；找不到断点时返回 end
+    """
+    # 只在窗口后半段寻找断点，避免窗口过小
+    lower = start + (end - start) // 2
+    for boundary in boundaries:
+        position = text.rfind(boundary, lower, end)
+        if position != -1:
+            return position + 1
+    return end
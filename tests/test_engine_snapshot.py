@@ -0,0 +1,83 @@
+"""
+引擎快照测试
+"""
+
+from contract_deid import DeidentificationConfig
+from contract_deid.core.analyzer import DeidentificationEngine
+from contract_deid.core.consistency import ConsistencyProvider
+from contract_deid.core.snapshot import compute_fingerprint, load_snapshot, save_snapshot
+
+
+class _FakeProvider:
+    def __init__(self):
+        self.mapping = {"PERSON": {"马化腾": "张三"}}
+
+    def clear(self):
+        self.mapping.clear()
+
+
+class _FakeEngine:
+    """最小化的引擎替身，只包含快照所需的接口"""
+
+    def __init__(self, config):
+        self.config = config
+        self.consistency_provider = _FakeProvider()
+        self.ner_engine = None
+        self.tables = [bytearray(b"x" * 1000)]
+        self.warmed = False
+
+    def warm_up(self):
+        self.warmed = True
+
+    def reseed(self):
+        pass
+
+
+def test_fingerprint_changes_with_config():
+    """测试配置变化时指纹随之变化"""
+    base = compute_fingerprint(DeidentificationConfig())
+    assert base == compute_fingerprint(DeidentificationConfig())
+    assert base != compute_fingerprint(DeidentificationConfig(amount_noise_range=(0.5, 1.5)))
+    # 运行时输出路径不影响指纹
+    assert base == compute_fingerprint(DeidentificationConfig(mapping_file_path="out.json"))
+
+
+def test_snapshot_roundtrip_and_invalidation(tmp_path):
+    """测试快照保存、恢复与失效"""
+    config = DeidentificationConfig(enable_ner=False)
+    path = str(tmp_path / "engine.snap")
+
+    engine = _FakeEngine(config)
+    save_snapshot(engine, path)
+
+    restored = load_snapshot(path, config)
+    assert restored is not None
+    assert restored.warmed
+    assert restored.consistency_provider.mapping == {}
+    assert bytes(restored.tables[0]) == b"x" * 1000
+
+    # 配置变化后快照失效
+    assert load_snapshot(path, DeidentificationConfig(enable_ner=True)) is None
+
+
+def test_snapshot_real_engine_reseeds(tmp_path):
+    """测试真实引擎的快照：识别结果与原引擎一致，每次恢复使用新的噪声系数"""
+    config = DeidentificationConfig(enable_ner=False)
+    path = str(tmp_path / "engine.snap")
+    text = "联系电话：13812345678，合同金额为¥1,000,000元。"
+
+    engine = DeidentificationEngine(config=config, consistency_provider=ConsistencyProvider())
+    save_snapshot(engine, path)
+    expected = engine.process(text)
+    assert len(expected.spans) == 2
+
+    factors = set()
+    for _ in range(4):
+        restored = load_snapshot(path, config)
+        assert restored is not None
+        result = restored.process(text)
+        assert [(row.entity_type, row.original, row.orig_start, row.orig_end) for row in result.spans] == [
+            (row.entity_type, row.original, row.orig_start, row.orig_end) for row in expected.spans
+        ]
+        factors.add(restored.amount_recognizer.get_noise_factor())
+    assert len(factors) == 4
@@ -0,0 +1,436 @@
+"""
+NER 适配器与推理服务测试
+
+使用不依赖真实模型的假适配器验证组合逻辑。
+"""
+
+import os
+import threading
+import time
+
+from contract_deid.core.ner_adapters.base import BaseNERAdapter
+from contract_deid.core.ner_engine import NEREngine
+from contract_deid.utils.text_windows import split_windows
+
+
+class KeywordAdapter(BaseNERAdapter):
+    """按关键字识别实体的假适配器"""
+
+    def __init__(self, keywords, score=0.9, **kwargs):
+        super().__init__(model_name="keyword", **kwargs)
+        self.keywords = keywords
+        self.score = score
+        self.batch_sizes = []
+
+    def _load_model(self):
+        return self.keywords
+
+    def _extract_entities(self, text):
+        entities = {}
+        for keyword, entity_type in self.keywords.items():
+            start = text.find(keyword)
+            while start != -1:
+                entities.setdefault(entity_type, []).append(
+                    {"text": keyword, "start": start, "end": start + len(keyword), "probability": self._score(keyword)}
+                )
+                start = text.find(keyword, start + 1)
+        return entities
+
+    def _score(self, keyword):
+        return self.score[keyword] if isinstance(self.score, dict) else self.score
+
+    def _extract_entities_batch(self, texts):
+        self.batch_sizes.append(len(texts))
+        return [self._extract_entities(text) for text in texts]
+
+    def _map_entity_type(self, raw_type):
+        return raw_type
+
+
+def test_ner_server_micro_batching(tmp_path):
+    """测试推理服务将多个客户端的请求合并为微批"""
+    from contract_deid.core.ner_server import NERServer
+
+    address = os.path.join(str(tmp_path), "ner.sock")
+    adapter = KeywordAdapter({"腾讯": "ORGANIZATION"})
+    server = NERServer(address, adapter=adapter, max_batch_size=8, max_latency_ms=200)
+    server.start()
+    try:
+        results = {}
+
+        def client(i):
+            engine = NEREngine(adapter_type="remote", address=address)
+            results[i] = engine.analyze(f"甲方{i}：腾讯")
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for i in range(4):
+            assert [(r.entity_type, r.start, r.end) for r in results[i]] == [("ORGANIZATION", 4, 6)]
+        assert server.stats.items == 4
+        assert server.stats.batches < 4
+    finally:
+        server.stop()
+
+
+def test_ner_server_requires_authkey(tmp_path):
+    """测试推理服务的认证：TCP 地址必须显式指定密钥，Unix socket 生成 0600 密钥文件"""
+    import pytest
+    from contract_deid.core.ner_server import NERServer
+
+    adapter = KeywordAdapter({})
+    with pytest.raises(ValueError, match="authkey"):
+        NERServer("0.0.0.0:8765", adapter=adapter)
+
+    address = os.path.join(str(tmp_path), "ner.sock")
+    server = NERServer(address, adapter=adapter)
+    server.start()
+    try:
+        assert os.stat(address + ".key").st_mode & 0o777 == 0o600
+        # 密钥错误的客户端无法连接，服务端继续接受正确密钥的客户端
+        from multiprocessing import AuthenticationError
+        from contract_deid.core.ner_adapters.remote_adapter import RemoteNERAdapter
+
+        with pytest.raises(AuthenticationError):
+            _ = RemoteNERAdapter(address=address, authkey=b"wrong").model
+        assert RemoteNERAdapter(address=address)._request(["甲方：腾讯"]) == [[]]
+    finally:
+        server.stop()
+
+
+def test_remote_adapter_times_out_on_silent_server(tmp_path):
+    """测试服务端不响应时客户端超时而不是一直阻塞"""
+    from multiprocessing.connection import Listener
+
+    import pytest
+    from contract_deid.core.ner_adapters.remote_adapter import RemoteNERAdapter
+
+    address = os.path.join(str(tmp_path), "silent.sock")
+    listener = Listener(address, authkey=b"secret")
+    accepted = []
+    thread = threading.Thread(target=lambda: accepted.append(listener.accept()), daemon=True)
+    thread.start()
+    try:
+        adapter = RemoteNERAdapter(address=address, authkey=b"secret", timeout=0.2)
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            adapter._request(["甲方：腾讯"])
+        assert time.monotonic() - started < 5
+        assert adapter._model is None
+    finally:
+        listener.close()
+
+
+def test_trigger_gate_skips_clause_text():
+    """测试门控只把触发词附近的片段送入模型"""
+    from contract_deid.core.ner_gate import NERGate
+
+    clause = "双方应当遵守本合同约定的各项条款，任何一方不得擅自变更或解除本合同。" * 10
+    text = clause + "甲方：腾讯科技有限公司" + clause
+    adapter = KeywordAdapter({"腾讯科技有限公司": "ORGANIZATION"})
+    engine = NEREngine(adapter=adapter, gate=NERGate(margin=16))
+
+    results = engine.analyze(text)
+
+    start = text.index("腾讯科技有限公司")
+    assert [(r.start, r.end) for r in results] == [(start, start + len("腾讯科技有限公司"))]
+    assert engine.last_gate_report.skipped_ratio > 0.8
+
+
+def test_trigger_gate_ignores_single_character_admin_units():
+    """测试"市场""区别""城镇化"等词不触发门控，带道路或门牌号的地址仍被选中"""
+    from contract_deid.core.ner_gate import NERGate
+
+    clause = "本合同项下的市场推广费用按照区别对待原则计算，适用于城镇化建设项目。" * 10
+    gate = NERGate(margin=8)
+
+    segments, report = gate.select_segments(clause)
+    assert segments == [] and report.trigger_hits == 0
+
+    text = clause + "项目位于余杭县良渚镇美丽村" + clause
+    segments, report = gate.select_segments(text)
+    start = text.index("余杭县")
+    assert len(segments) == 1
+    assert segments[0][0] <= start and segments[0][1] >= start + len("余杭县良渚镇")
+    assert report.skipped_ratio > 0.8
+
+
+def test_cascade_escalates_low_confidence_regions():
+    """测试级联适配器只把低置信度区域交给强模型"""
+    from contract_deid.core.ner_adapters import CascadeNERAdapter
+
+    clause = "双方应当遵守本合同约定的各项条款。" * 10
+    text = "甲方：腾讯科技有限公司" + clause + "联系人：张三"
+    # 张三置信度高，只有腾讯所在区域会被升级
+    fast = KeywordAdapter(
+        {"腾讯": "ORGANIZATION", "张三": "PERSON"}, score={"腾讯": 0.5, "张三": 0.9}
+    )
+    strong = KeywordAdapter({"腾讯科技有限公司": "ORGANIZATION", "张三": "PERSON"}, score=0.95)
+
+    cascade = CascadeNERAdapter(fast, strong, confidence_threshold=0.8, context_margin=8)
+    results = sorted(cascade.analyze(text), key=lambda r: r.start)
+
+    assert [(r.entity_type, text[r.start:r.end], r.score) for r in results] == [
+        ("ORGANIZATION", "腾讯科技有限公司", 0.95),
+        ("PERSON", "张三", 0.9),
+    ]
+    assert strong.batch_sizes == [1]
+    assert 0 < cascade.stats.escalated_ratio < 0.2
+
+
+def test_ensemble_merges_backends_by_vote():
+    """测试集成适配器按投票合并多个后端的结果"""
+    from contract_deid.core.ner_adapters import EnsembleNERAdapter
+
+    text = "甲方：腾讯科技有限公司，地址：深圳市南山区"
+    first = KeywordAdapter({"腾讯科技有限公司": "ORGANIZATION", "深圳市": "LOCATION"}, score=0.8)
+    second = KeywordAdapter({"腾讯科技": "ORGANIZATION", "深圳市南山区": "LOCATION"}, score=0.9)
+    third = KeywordAdapter({"腾讯科技有限公司": "PERSON"}, score=0.99)
+
+    ensemble = EnsembleNERAdapter([first, second, third], strategy="vote")
+    results = sorted(ensemble.analyze(text), key=lambda r: r.start)
+    # "有限公司"不在胜出的"腾讯科技"之内，单独投票后与之合并
+    assert [(r.entity_type, text[r.start:r.end]) for r in results] == [
+        ("ORGANIZATION", "腾讯科技有限公司"),
+        ("LOCATION", "深圳市南山区"),
+    ]
+
+    ensemble = EnsembleNERAdapter([first, second, third], strategy="max_score")
+    results = sorted(ensemble.analyze(text), key=lambda r: r.start)
+    assert [(r.entity_type, text[r.start:r.end]) for r in results] == [
+        ("PERSON", "腾讯科技有限公司"),
+        ("LOCATION", "深圳市南山区"),
+    ]
+    assert set(ensemble.stats.backends) == {"KeywordAdapter", "KeywordAdapter#1", "KeywordAdapter#2"}
+    assert all(stats.calls == 1 for stats in ensemble.stats.backends.values())
+    assert ensemble.stats.agreement_ratio == 0.0
+
+
+def test_ensemble_keeps_uncovered_parts_of_chained_overlaps():
+    """测试传递重叠的簇不会只剩一个结果：落选结果未被覆盖的部分仍然保留"""
+    from contract_deid.core.ner_adapters import EnsembleNERAdapter
+
+    text = "甲方腾讯科技有限公司的代表马化腾"
+    first = KeywordAdapter({"腾讯科技有限公司": "ORGANIZATION", "马化腾": "PERSON"}, score=0.8)
+    second = KeywordAdapter({"腾讯科技有限公司的代表马": "ORGANIZATION"}, score=0.9)
+
+    for strategy in ("vote", "max_score"):
+        ensemble = EnsembleNERAdapter([first, second], strategy=strategy)
+        results = sorted(ensemble.analyze(text), key=lambda r: r.start)
+        assert [(r.entity_type, text[r.start:r.end]) for r in results] == [
+            ("ORGANIZATION", "腾讯科技有限公司的代表马"),
+            ("PERSON", "化腾"),
+        ]
+
+    # 只有一个后端标记的位置达不到 min_votes=2，不采纳
+    ensemble = EnsembleNERAdapter([first, second], strategy="vote", min_votes=2)
+    results = sorted(ensemble.analyze(text), key=lambda r: r.start)
+    assert [(r.entity_type, text[r.start:r.end]) for r in results] == [
+        ("ORGANIZATION", "腾讯科技有限公司的代表马"),
+    ]
+
+
+def test_llm_adapter_chunks_and_realigns_offsets():
+    """测试 LLM 适配器分块并发调用，并根据实体文本校正偏移"""
+    import json
+
+    from contract_deid.core.ner_adapters import LLMNERAdapter
+
+    clause = "双方应当遵守本合同约定的各项条款。\n"
+    text = (clause * 5 + "甲方：腾讯科技有限公司，联系人：张三。\n") * 4
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_llm(chunk, prompt):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.pop()
+        # 偏移故意给错，并夹带一个原文中不存在的实体
+        entities = {"组织机构": [], "人名": [{"text": "李四", "start": 3, "end": 5}]}
+        if "腾讯科技有限公司" in chunk:
+            entities["组织机构"].append({"text": "腾讯科技有限公司", "start": 999, "end": 1007})
+            entities["人名"].append({"text": "张三", "start": 0, "end": 2})
+        return "结果：" + json.dumps(entities, ensure_ascii=False)
+
+    adapter = LLMNERAdapter(llm_call_func=fake_llm, chunk_size=120, max_concurrency=4)
+    results = adapter.analyze(text)
+
+    assert len(results) == 8
+    assert all(text[r.start:r.end] in ("腾讯科技有限公司", "张三") for r in results)
+    assert len({(r.start, r.end) for r in results}) == 8
+    assert max(peak) > 1
+
+
+def test_llm_response_cache_shared_and_bounded(tmp_path):
+    """测试 LLM 响应缓存在适配器与润色器之间共享，并按容量淘汰"""
+    import json
+
+    from contract_deid.core.llm_cache import get_shared_cache
+    from contract_deid.core.llm_refine import LLMRefiner
+    from contract_deid.core.ner_adapters import LLMNERAdapter
+
+    calls = []
+
+    def fake_llm(chunk, prompt):
+        calls.append(chunk)
+        return json.dumps({"组织机构": [{"text": "腾讯", "start": 0, "end": 2}]}, ensure_ascii=False)
+
+    cache = get_shared_cache(str(tmp_path / "llm.sqlite"), max_entries=2)
+    adapter = LLMNERAdapter(llm_call_func=fake_llm, llm_cache=cache)
+    for _ in range(3):
+        assert [(r.start, r.end) for r in adapter.analyze("甲方：腾讯")] == [(3, 5)]
+    assert len(calls) == 1
+    assert (cache.stats.hits, cache.stats.misses) == (2, 1)
+
+    refiner = LLMRefiner(
+        cache=cache,
+        backend=lambda paragraph, prompt: paragraph.replace("Acme Holdings", "[公司_B]"),
+        mode="text",
+    )
+    assert refiner.refine("乙方：Acme Holdings", {}) == "乙方：[公司_B]"
+    assert refiner.refine("乙方：Acme Holdings", {}) == "乙方：[公司_B]"
+    assert cache.stats.hits == 3
+
+    # 超出容量后淘汰最久未访问的条目
+    adapter.analyze("乙方：腾讯")
+    assert cache.stats.evictions == 1
+    assert get_shared_cache(str(tmp_path / "llm.sqlite"), max_entries=2) is cache
+    assert get_shared_cache(str(tmp_path / "llm.sqlite")) is cache
+
+    # 设置不一致时报错而不是静默沿用或改写
+    import pytest
+
+    with pytest.raises(ValueError, match="max_entries"):
+        get_shared_cache(str(tmp_path / "llm.sqlite"), max_entries=5)
+
+
+def test_llm_response_cache_overwrite_does_not_count(tmp_path):
+    """测试覆盖已有键不增加条目数，不会提前触发淘汰"""
+    from contract_deid.core.llm_cache import LLMResponseCache
+
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), max_entries=2)
+    for _ in range(5):
+        cache.put("a", "response")
+    cache.put("b", "response")
+    assert cache.stats.evictions == 0
+    assert cache.get("a") is not None and cache.get("b") is not None
+
+
+def test_llm_refiner_requires_backend(monkeypatch):
+    """测试未配置后端时润色器在构造时报错"""
+    import pytest
+
+    from contract_deid.core.llm_refine import LLMRefiner
+
+    monkeypatch.delenv("LLM_CALL_FUNC_MODULE", raising=False)
+    with pytest.raises(ValueError, match="backend"):
+        LLMRefiner()
+
+
+def test_llm_adapter_uses_batched_backend():
+    """测试支持 call_batch 的后端一次生成所有分块，且提示词共享固定前缀"""
+    import json
+
+    from contract_deid.core.ner_adapters import LLMNERAdapter
+    from contract_deid.core.ner_adapters.transformers_backend import JSONStopTracker
+
+    class FakeBackend:
+        def __init__(self):
+            self.batches = []
+
+        def call_batch(self, texts, prompts):
+            self.batches.append(len(texts))
+            assert all(prompt.startswith(adapter.prompt_prefix()) for prompt in prompts)
+            return [
+                json.dumps({"人名": [{"text": "张三"}] if "张三" in text else []}, ensure_ascii=False)
+                + "\n多余的输出"
+                for text in texts
+            ]
+
+        def __call__(self, text, prompt):
+            return self.call_batch([text], [prompt])[0]
+
+    backend = FakeBackend()
+    adapter = LLMNERAdapter(llm_call_func=backend, chunk_size=40)
+    text = ("双方应当遵守本合同约定的各项条款。\n联系人：张三。\n" * 3)
+    results = adapter.analyze(text)
+
+    assert backend.batches == [len(split_windows(text, 40))]
+    assert [text[r.start:r.end] for r in results] == ["张三"] * 3
+
+    tracker = JSONStopTracker()
+    assert not tracker.feed('{"人名": [{"text": "}')
+    assert tracker.feed('张三"}]}')
+    assert tracker.feed(" trailing")
+
+
+def test_llm_refiner_only_sends_flagged_paragraphs():
+    """测试润色器只把残留风险段落及相关映射送入模型"""
+    from contract_deid.core.llm_refine import LLMRefiner
+
+    prompts = []
+
+    def backend(paragraph, prompt):
+        prompts.append(prompt)
+        return paragraph.replace("张先生", "李某").replace("腾讯", "星辰科技")
+
+    mapping = {
+        "ORGANIZATION": {"腾讯科技有限公司": "星辰科技有限公司", "阿里巴巴有限公司": "远航有限公司"},
+        "PERSON": {"马化腾": "王伟"},
+    }
+    text = "\n".join([
+        "甲方：星辰科技有限公司，法定代表人：王伟",
+        "第一条 双方应当遵守本合同约定的各项条款。",
+        "联系人：张先生，乙方：远航有限公司",
+        "本合同由腾讯负责解释。",
+    ])
+    refiner = LLMRefiner(backend=backend, mode="text")
+    refined = refiner.refine(text, mapping)
+
+    assert refined.split("\n") == [
+        "甲方：星辰科技有限公司，法定代表人：王伟",
+        "第一条 双方应当遵守本合同约定的各项条款。",
+        "联系人：李某，乙方：远航有限公司",
+        "本合同由腾讯负责解释。",
+    ]
+    # 只有第三段命中"姓氏 + 称谓"规则，且只附带该段出现的映射条目
+    assert len(prompts) == 1
+    assert "阿里巴巴有限公司 -> 远航有限公司" in prompts[0]
+    assert "腾讯科技有限公司" not in prompts[0]
+    assert refiner.stats.flagged_paragraphs == 1
+    assert refiner.stats.sent_ratio < 0.5
+
+
+def test_llm_refiner_applies_validated_edits():
+    """测试 edits 模式校验编辑列表，复用映射表并一次扫描应用到全文"""
+    import json
+
+    from contract_deid.core.llm_refine import LLMRefiner
+
+    def backend(paragraph, prompt):
+        return json.dumps([
+            {"original": "张先生", "type": "人名", "replacement": "赵先生"},
+            {"original": "腾讯", "type": "组织机构", "replacement": "某公司"},
+            {"original": "不存在的公司", "type": "组织机构", "replacement": "某公司"},
+            {"original": "星辰", "type": "组织机构", "replacement": "某公司"},
+        ], ensure_ascii=False)
+
+    mapping = {"ORGANIZATION": {"腾讯": "星辰科技有限公司"}, "PERSON": {}}
+    text = "甲方：星辰科技有限公司\n联系人：张先生，腾讯员工\n张先生负责验收。"
+    refiner = LLMRefiner(backend=backend)
+    refined = refiner.refine(text, mapping, value_provider=lambda original, entity_type: "王伟")
+
+    # 腾讯复用已有映射，张先生由 value_provider 生成并写入映射表，全文替换
+    assert refined == "甲方：星辰科技有限公司\n联系人：王伟，星辰科技有限公司员工\n王伟负责验收。"
+    assert mapping["PERSON"] == {"张先生": "王伟"}
+    # 两个段落各自校验：不存在的原文、虚拟值的片段，以及第三段中不存在的"腾讯"被丢弃
+    assert refiner.stats.flagged_paragraphs == 2
+    assert refiner.stats.rejected == 5
+    assert refiner.stats.applied_edits == 3
@@ -0,0 +1,357 @@
+"""
+工具模块测试
+"""
+
+import pytest
+
+from contract_deid.utils.text_windows import split_windows
+
+
+def test_split_windows_prefers_line_boundaries():
+    """测试分窗优先在换行处断开且完整覆盖文本"""
+    text = "甲方：腾讯科技有限公司\n乙方：阿里巴巴网络技术有限公司\n" * 20
+    windows = split_windows(text, 50)
+
+    assert windows[0][0] == 0
+    assert windows[-1][1] == len(text)
+    for (_, end), (next_start, _) in zip(windows, windows[1:]):
+        assert end == next_start
+        assert text[end - 1] == "\n"
+    assert all(end - start <= 50 for start, end in windows)
+
+
+def test_entity_propagation_marks_missed_mentions():
+    """测试实体传播覆盖 NER 漏识别的后续出现"""
+    from presidio_analyzer import RecognizerResult
+
+    from contract_deid.core.propagation import EntityPropagator
+
+    company = "腾讯科技（深圳）有限公司"
+    text = f"甲方：{company}。\n……\n{company}应于签约后付款，{company}盖章。"
+    first = text.index(company)
+    ner_results = [RecognizerResult("ORGANIZATION", first, first + len(company), 0.85)]
+
+    propagated = EntityPropagator().propagate(text, ner_results)
+
+    starts = sorted(r.start for r in propagated)
+    assert len(propagated) == 2
+    assert all(text[r.start : r.end] == company for r in propagated)
+    assert first not in starts
+
+
+def test_gazetteer_recognizer_incremental_updates(tmp_path):
+    """测试词典识别器的加载、增量添加/移除与合并"""
+    from contract_deid.recognizers.gazetteer import GazetteerRecognizer, build_gazetteer
+
+    path = str(tmp_path / "gazetteer.bin")
+    build_gazetteer(
+        [("ORGANIZATION", "腾讯科技有限公司"), ("ORGANIZATION", "腾讯"), ("PERSON", "马化腾")],
+        path,
+    )
+    text = "甲方：腾讯科技有限公司，法定代表人：马化腾，乙方：阿里巴巴有限公司"
+
+    recognizer = GazetteerRecognizer(path)
+    found = [(r.entity_type, text[r.start : r.end]) for r in recognizer.analyze(text)]
+    assert found == [("ORGANIZATION", "腾讯科技有限公司"), ("PERSON", "马化腾")]
+
+    recognizer.add(["阿里巴巴有限公司"])
+    recognizer.remove(["马化腾"])
+    found = [text[r.start : r.end] for r in recognizer.analyze(text)]
+    assert found == ["腾讯科技有限公司", "阿里巴巴有限公司"]
+
+    # 增量日志在重新加载后依然生效，合并后结果不变
+    reloaded = GazetteerRecognizer(path)
+    assert [text[r.start : r.end] for r in reloaded.analyze(text)] == found
+    reloaded.compact()
+    assert [text[r.start : r.end] for r in GazetteerRecognizer(path).analyze(text)] == found
+
+
+def test_leak_verifier_finds_partial_and_reformatted_values():
+    """测试泄漏校验发现原始值、组织核心字号和改变格式的数字"""
+    from contract_deid.core.leak_verifier import LeakVerifier
+
+    mapping = {
+        "ORGANIZATION": {"腾讯科技（深圳）有限公司": "星辰科技有限公司"},
+        "PHONE_NUMBER": {"13800138000": "13912345678"},
+        "AMOUNT": {"1,000,000": "1,000,000"},
+    }
+    text = "甲方：星辰科技有限公司（原腾讯科技），电话 138 0013 8000，金额 1,000,000 元，2024 年 138001 号"
+    report = LeakVerifier().verify(text, mapping)
+
+    assert [(hit.entity_type, hit.matched) for hit in report.hits] == [
+        ("ORGANIZATION", "腾讯科技"),
+        ("PHONE_NUMBER", "138 0013 8000"),
+    ]
+    assert all(text[hit.start:hit.end] == hit.matched for hit in report.hits)
+    assert not LeakVerifier().verify("甲方：星辰科技有限公司", mapping).leaked
+
+
+def test_mapping_writer_appends_compressed_corpus_file(tmp_path):
+    """测试流式映射表写入：CSV 表头只写一次，压缩 JSONL 追加后可完整读回"""
+    import csv
+    import gzip
+    import json
+
+    from contract_deid.utils.mapping_writer import MappingWriter
+
+    csv_path = tmp_path / "corpus.csv"
+    for document, mapping in [("a.txt", {"PERSON": {"张三": "李四"}}), ("b.txt", {"PHONE_NUMBER": {"13800138000": "13912345678"}})]:
+        with MappingWriter(str(csv_path), append=True, include_document=True) as writer:
+            writer.write_mapping(mapping, document=document)
+    with open(csv_path, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [
+        ["document", "entity_type", "original_value", "anonymized_value"],
+        ["a.txt", "PERSON", "张三", "李四"],
+        ["b.txt", "PHONE_NUMBER", "13800138000", "13912345678"],
+    ]
+
+    jsonl_path = tmp_path / "corpus.jsonl.gz"
+    for document in ("a.txt", "b.txt"):
+        with MappingWriter(str(jsonl_path), append=True, include_document=True) as writer:
+            writer.write("ORGANIZATION", "腾讯科技有限公司", "星辰科技有限公司", document=document)
+    with gzip.open(jsonl_path, "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [record["document"] for record in records] == ["a.txt", "b.txt"]
+    assert records[0]["original_value"] == "腾讯科技有限公司"
+
+
+def test_parquet_mapping_store_partitions_and_null_offsets(tmp_path):
+    """测试 Parquet 映射表按实体类型分区，润色新增的映射偏移为空"""
+    pytest.importorskip("pyarrow")
+    from contract_deid.utils.mapping_export import DeidentificationConfig, DeidentificationResult
+    from contract_deid.utils.mapping_store import ParquetMappingStore, open_mapping_dataset
+    from contract_deid.utils.span_table import SpanTable
+
+    spans = SpanTable()
+    spans.append("PERSON", "张三", 0, 2, 0, 2, 0.9, "ner")
+    result = DeidentificationResult(
+        anonymized_text="李四与星辰科技有限公司",
+        mapping={"PERSON": {"张三": "李四"}, "ORGANIZATION": {"腾讯科技有限公司": "星辰科技有限公司"}},
+        config=DeidentificationConfig(),
+        spans=spans,
+    )
+    with ParquetMappingStore(str(tmp_path), row_group_size=1) as store:
+        assert store.add("a.txt", result) == 2
+        store.add("b.txt", result)
+
+    rows = open_mapping_dataset(str(tmp_path)).to_table().to_pylist()
+    people = sorted((row["document"], row["start"]) for row in rows if row["entity_type"] == "PERSON")
+    assert people == [("a.txt", 0), ("b.txt", 0)]
+    organizations = [row for row in rows if row["entity_type"] == "ORGANIZATION"]
+    assert all(row["start"] is None and row["layer"] is None for row in organizations)
+
+
+def test_span_table_roundtrip_and_refinement_shift():
+    """测试实体位置表的序列化，以及润色修改文本后脱敏坐标的同步"""
+    import pickle
+
+    from contract_deid.utils.span_table import SpanTable
+
+    spans = SpanTable()
+    spans.append("PERSON", "张三", 3, 5, 3, 6, 0.85, "ner")
+    spans.append("PHONE_NUMBER", "13800138000", 10, 21, 11, 22, 1.0)
+    spans.append("PERSON", "张三", 30, 32, 31, 34, 0.85, "propagation")
+
+    restored = pickle.loads(pickle.dumps(spans))
+    assert list(restored) == list(spans)
+    assert restored.values == ["张三", "13800138000"]
+
+    # 第 0-2 个字符被替换为 4 个字符（位移 +2），第 25-33 个字符被整段改写
+    spans.apply_changes([(0, 2, 4), (25, 33, 5)])
+    assert [(row.anon_start, row.anon_end) for row in spans] == [(5, 8), (13, 24), (-1, -1)]
+    assert spans.row(1).orig_start == 10
+
+
+def test_conflict_resolver_priorities_and_counters():
+    """测试跨层冲突消解：类型优先级、同类型合并与计数"""
+    from contract_deid.core.conflict import ConflictResolver
+    from contract_deid.core.span import Span
+
+    spans = [
+        # 电话号码中的数字片段被误识别为金额
+        Span("PHONE_NUMBER", 5, 16, 0.9),
+        Span("AMOUNT", 5, 8, 0.9),
+        # 组织机构包含地名
+        Span("ORGANIZATION", 20, 32, 0.8, "ner"),
+        Span("LOCATION", 20, 22, 0.95, "ner"),
+        # NER 分窗边界处被切开的同一个人名
+        Span("PERSON", 40, 42, 0.7, "ner"),
+        Span("PERSON", 41, 43, 0.9, "ner"),
+        # 规则与 NER 重复识别
+        Span("PERSON", 50, 52, 0.8, "ner"),
+        Span("PERSON", 50, 52, 0.8, "propagation"),
+    ]
+    resolver = ConflictResolver()
+    resolved = resolver.resolve(spans)
+
+    assert [(s.entity_type, s.start, s.end) for s in resolved] == [
+        ("PHONE_NUMBER", 5, 16),
+        ("ORGANIZATION", 20, 32),
+        ("PERSON", 40, 43),
+        ("PERSON", 50, 52),
+    ]
+    assert resolved[3].layer == "ner"
+    assert dict(resolver.stats.resolved) == {"type_priority": 2, "merged": 1, "duplicate": 1}
+
+    # 提高地名优先级后结果随之改变
+    resolver = ConflictResolver(type_priority={"LOCATION": 99})
+    resolved = resolver.resolve([Span("ORGANIZATION", 20, 32, 0.8, "ner"), Span("LOCATION", 20, 22, 0.95, "ner")])
+    assert [(s.entity_type, s.start, s.end) for s in resolved] == [("LOCATION", 20, 22), ("ORGANIZATION", 22, 32)]
+
+
+def test_conflict_resolver_trims_partial_overlaps():
+    """测试部分重叠的低优先级区间裁剪为未覆盖部分，而不是整体丢弃"""
+    from contract_deid.core.conflict import ConflictResolver
+    from contract_deid.core.span import Span
+
+    text = "甲方北京腾讯科技有限公司海淀区分部"
+    resolver = ConflictResolver()
+    resolved = resolver.resolve([Span("ORGANIZATION", 2, 14, 0.8, "ner"), Span("LOCATION", 12, 19, 0.9, "ner")])
+
+    assert [(s.entity_type, text[s.start:s.end]) for s in resolved] == [
+        ("ORGANIZATION", "北京腾讯科技有限公司海淀"),
+        ("LOCATION", "区分部"),
+    ]
+    assert resolver.stats.resolved["trimmed"] == 1
+
+    # 两侧都被更高优先级区间覆盖时保留中间部分
+    resolved = resolver.resolve([
+        Span("LOCATION", 0, 10, 0.9, "ner"),
+        Span("PHONE_NUMBER", 0, 3, 0.9),
+        Span("ID_CARD", 7, 12, 0.9),
+    ])
+    assert [(s.entity_type, s.start, s.end) for s in resolved] == [
+        ("PHONE_NUMBER", 0, 3), ("LOCATION", 3, 7), ("ID_CARD", 7, 12),
+    ]
+
+
+def test_conflict_resolver_keeps_structured_identifiers_whole():
+    """测试结构化标识不被裁剪：包含所有重叠区间时整体保留，否则整体丢弃"""
+    from contract_deid.core.conflict import ConflictResolver
+    from contract_deid.core.span import Span
+
+    # 19 位账号的前 18 位同时匹配信用代码与身份证号的格式
+    text = "收款账号：6222021234567890123"
+    resolver = ConflictResolver()
+    resolved = resolver.resolve([
+        Span("CREDIT_CODE", 5, 23, 0.9),
+        Span("ID_CARD", 5, 23, 0.9),
+        Span("BANK_ACCOUNT", 5, 24, 0.9),
+    ])
+    assert [(s.entity_type, text[s.start:s.end]) for s in resolved] == [("BANK_ACCOUNT", "6222021234567890123")]
+    assert resolver.stats.resolved["contained"] == 1
+    assert "trimmed" not in resolver.stats.resolved
+
+    # 部分重叠的结构化标识整体丢弃
+    resolved = resolver.resolve([Span("PHONE_NUMBER", 0, 11, 0.9), Span("AMOUNT", 8, 14, 0.9)])
+    assert [(s.entity_type, s.start, s.end) for s in resolved] == [("PHONE_NUMBER", 0, 11)]
+
+
+def test_conflict_resolver_prefers_id_card_over_credit_code():
+    """测试校验位有效的 18 位身份证号优先于只做格式校验的信用代码"""
+    from contract_deid.core.conflict import ConflictResolver
+    from contract_deid.core.span import Span
+
+    resolved = ConflictResolver().resolve([Span("CREDIT_CODE", 0, 18, 0.9), Span("ID_CARD", 0, 18, 0.9)])
+    assert [(s.entity_type, s.start, s.end) for s in resolved] == [("ID_CARD", 0, 18)]
+
+
+def test_chinese_amounts_parse_and_rewrite_consistently():
+    from decimal import Decimal
+
+    from contract_deid.anonymizers.amount_rewriter import AmountRewriter
+    from contract_deid.utils.chinese_numerals import format_chinese_amount, parse_chinese_amount
+
+    assert parse_chinese_amount("壹佰万元整") == Decimal(1000000)
+    assert parse_chinese_amount("壹万贰仟叁佰肆拾伍元陆角柒分") == Decimal("12345.67")
+    assert parse_chinese_amount("一百二十万元") == Decimal(1200000)
+    assert parse_chinese_amount("1.5亿元") == Decimal(150000000)
+    assert parse_chinese_amount("元整") is None
+    assert format_chinese_amount(Decimal(1050000)) == "壹佰零伍万元整"
+    assert format_chinese_amount(Decimal("10.05")) == "壹拾元零伍分"
+
+    # 同一数值的小写与大写改写为同一个新数值，并保留各自的格式
+    rewritten = AmountRewriter(1.05).rewrite(["¥1,000,000.00", "壹佰万元整", "100万元", "3,500 元"])
+    assert rewritten == {
+        "¥1,000,000.00": "¥1,050,000.00",
+        "壹佰万元整": "壹佰零伍万元整",
+        "100万元": "105万元",
+        "3,500 元": "3,675 元",
+    }
+
+    # 带单位的写法只能表示到 0.01 亿/万，大写按同一粒度取整，两种写法解析回同一个数
+    pairs = [("1.5亿元", "壹亿伍仟万元整"), ("100万元", "壹佰万元整")]
+    rewritten = AmountRewriter(0.9205).rewrite([amount for pair in pairs for amount in pair])
+    for arabic, chinese in pairs:
+        assert parse_chinese_amount(rewritten[arabic]) == parse_chinese_amount(rewritten[chinese])
+    assert rewritten["1.5亿元"] == "1.38亿元"
+    assert rewritten["壹佰万元整"] == "玖拾贰万零伍佰元整"
+
+
+def test_chinese_integers_roundtrip_above_trillion():
+    from decimal import Decimal
+
+    from contract_deid.utils.chinese_numerals import integer_to_chinese, parse_chinese_amount
+
+    assert integer_to_chinese(12 * 10**11) == "壹万贰仟亿"
+    assert integer_to_chinese(10**12 + 5 * 10**6) == "壹万亿零伍佰万"
+    for value in (10**12, 12 * 10**11 + 3 * 10**7, 10**16 + 5, 5 * 10**15, 123456789012345678):
+        for uppercase in (True, False):
+            assert parse_chinese_amount(integer_to_chinese(value, uppercase)) == Decimal(value)
+
+
+def test_length_fitter_and_in_place_patch():
+    from contract_deid.anonymizers.length_fitter import LengthFitter
+    from contract_deid.utils.inplace import encode_replacements, patch_in_place
+
+    fitter = LengthFitter(unit="byte")
+    names = iter(["欧阳娜娜", "李四", "王"])
+    assert fitter.fit("张三", "PERSON", lambda: next(names)) == "李四"
+    # 没有等长候选时补齐：1 个汉字 + 全角空格 = 6 字节
+    assert fitter.fit("张三", "PERSON", lambda: "王") == "王　"
+    assert fitter.pad_or_truncate("ab", 4) == "ab  "
+
+    phone = fitter.reshape("010-62345678")
+    assert phone.startswith("0") and phone[3] == "-" and len(phone) == 12
+    assert fitter.fit("壹佰万元整", "AMOUNT", lambda: "", first="捌拾壹万元整")[1:] == "佰万元整"
+    # 形状替换的每个字符都与原文不同，不会原样输出原文
+    assert all(fitter.reshape("壹佰万元整") != "壹佰万元整" for _ in range(100))
+    assert all(fitter.reshape("1.5亿元") != "1.5亿元" for _ in range(100))
+    # 较短的金额补齐而不是按形状替换；与原文相同的候选值不能使用
+    assert fitter.fit("1,000,000 元", "AMOUNT", lambda: "", first="900,000 元") == "900,000 元  "
+    assert fitter.fit("1,000,000 元", "AMOUNT", lambda: "", first="1,000,000 元") != "1,000,000 元"
+
+    text = "甲方张三，电话 13812345678"
+    buffer = bytearray(text.encode("utf-8"))
+    replacements = [(2, 4, "李四"), (8, 19, "13900000000")]
+    assert patch_in_place(buffer, encode_replacements(text, replacements)) == 2
+    assert buffer.decode("utf-8") == "甲方李四，电话 13900000000"
+
+    with pytest.raises(ValueError):
+        patch_in_place(buffer, encode_replacements(text, [(2, 4, "Li")]))
+    assert buffer.decode("utf-8") == "甲方李四，电话 13900000000"
+
+
+def test_text_profile_prerequisites_and_stats():
+    from contract_deid.core.text_profile import PrefilterStats, TextProfile
+    from contract_deid.recognizers.amount import AmountRecognizer
+    from contract_deid.recognizers.phone import PhoneRecognizer
+
+    narrative = TextProfile.from_text("双方应当遵守本合同约定的各项条款。")
+    assert not narrative.satisfies(PhoneRecognizer.PREREQUISITES)
+    assert not narrative.satisfies(AmountRecognizer.PREREQUISITES)
+    assert narrative.satisfies(None)
+
+    # 全角数字与正则 \d 一致视为数字；小写中文数字需要与"元"同时出现
+    assert TextProfile.from_text("电话：１３８").satisfies(PhoneRecognizer.PREREQUISITES)
+    assert TextProfile.from_text("邮箱 a@b.cn").satisfies(PhoneRecognizer.PREREQUISITES)
+    assert not TextProfile.from_text("第一条 总则").satisfies(AmountRecognizer.PREREQUISITES)
+    assert TextProfile.from_text("总价一百万元").satisfies(AmountRecognizer.PREREQUISITES)
+    assert TextProfile.from_text("大写：壹佰万元整").satisfies(AmountRecognizer.PREREQUISITES)
+
+    stats = PrefilterStats()
+    stats.record("PhoneRecognizer", skipped=True)
+    stats.record("AmountRecognizer", skipped=False)
+    assert stats.skip_rate == 0.5
+    assert "PhoneRecognizer=1" in stats.summary()
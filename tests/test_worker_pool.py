@@ -0,0 +1,55 @@
+"""
+Fork 工作进程池测试
+"""
+
+import multiprocessing
+import os
+import signal
+
+import pytest
+
+from contract_deid import DeidentificationConfig
+from contract_deid.core.worker_pool import ForkWorkerPool
+
+pytestmark = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="requires the fork start method"
+)
+
+
+def _texts(count: int, base: int = 0) -> list:
+    return [f"联系电话：1381234{base + i:04d}。" for i in range(count)]
+
+
+def _phones(results) -> list:
+    return [next(iter(result.spans)).original for result in results]
+
+
+def test_map_preserves_order():
+    """测试结果顺序与输入一致"""
+    texts = _texts(20)
+    with ForkWorkerPool(DeidentificationConfig(enable_ner=False), processes=3) as pool:
+        results = pool.map(texts)
+    assert _phones(results) == [text[5:16] for text in texts]
+
+
+def test_abandoned_imap_does_not_leak_into_next_call():
+    """测试提前停止迭代后，遗留的在途结果不会混入下一次调用"""
+    with ForkWorkerPool(DeidentificationConfig(enable_ner=False), processes=2) as pool:
+        first = next(pool.imap(_texts(10)))
+        assert _phones([first]) == ["13812340000"]
+
+        texts = _texts(6, base=100)
+        assert _phones(pool.map(texts)) == [text[5:16] for text in texts]
+
+
+def test_dead_worker_raises_instead_of_hanging():
+    """测试工作进程被杀死时抛出异常而不是一直阻塞"""
+    pool = ForkWorkerPool(DeidentificationConfig(enable_ner=False), processes=1)
+    pool.start()
+    try:
+        os.kill(pool._workers[0].pid, signal.SIGKILL)
+        with pytest.raises(RuntimeError, match="died"):
+            pool.map(_texts(3))
+        assert pool._workers == []
+    finally:
+        pool.close()